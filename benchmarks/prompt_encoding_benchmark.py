@@ -0,0 +1,62 @@
+"""
+Compares the size of the network state in the prompt of the IntentProcessor, as the repr of the network
+state against its compact encoding, for generated fabrics of growing size served by the Ryu stand-in.
+
+Usage:
+    python -m benchmarks.prompt_encoding_benchmark --switches 10 60 200 --flows-per-switch 20
+"""
+
+import argparse
+
+from prettytable import PrettyTable
+
+from otto.intent_utils.network_state_encoder import encode_network_state, measure_encodings
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def create_fabric(switch_count: int, flows_per_switch: int) -> SyntheticFabric:
+    fabric = SyntheticFabric(switch_count)
+
+    for switch_id in range(1, switch_count + 1):
+        for flow in range(flows_per_switch):
+            fabric.add_flow({
+                "dpid": switch_id,
+                "priority": 100,
+                "match": {"eth_type": 2048, "ipv4_dst": f"10.0.{flow // 256}.{flow % 256}"},
+                "actions": [{"type": "OUTPUT", "port": flow % 3 + 1}]
+            })
+
+    return fabric
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(prog="Prompt encoding benchmark")
+    arg_parser.add_argument('--switches', type=int, nargs="+", default=[10, 60, 200])
+    arg_parser.add_argument('--flows-per-switch', type=int, default=20)
+    arg_parser.add_argument('--model', default="gpt-4o", help="Model whose tokenizer is used to count tokens")
+    args = arg_parser.parse_args()
+
+    results = PrettyTable()
+    results.field_names = ["Switches", "Flows", "repr (chars)", "compact (chars)", "repr (tokens)",
+                           "compact (tokens)", "Saved"]
+
+    for switch_count in args.switches:
+        with RyuStandIn(create_fabric(switch_count, args.flows_per_switch)) as stand_in:
+            transport = RyuTransport(base_url=stand_in.url)
+            network_state = NetworkStateFinder(max_workers=16, transport=transport).get_network_state()
+            transport.close()
+
+        measured_tokens = measure_encodings(network_state, args.model)
+
+        results.add_row([switch_count, switch_count * (args.flows_per_switch + 1), len(str(network_state)),
+                         len(encode_network_state(network_state)), measured_tokens["repr"],
+                         measured_tokens["compact"],
+                         f"{1 - measured_tokens['compact'] / measured_tokens['repr']:.0%}"])
+
+    print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compares the networkx and sparse matrix backends of the PathIndex on generated fabrics of growing size: the
+time taken to build the index of a topology, and to answer shortest path and reachability queries on it.
+
+Every fabric is a ring of switches with random chords between them, and a host connected to every switch.
+The networkx backend searches the whole topology when it is built, so it is skipped for the fabrics larger
+than --max-networkx-switches.
+
+Usage:
+    python -m benchmarks.topology_benchmark --switches 100 1000 10000 --queries 200
+"""
+
+import argparse
+import random
+import time
+from typing import Optional
+
+import networkx as nx
+from prettytable import PrettyTable
+
+from otto.ryu.intent_engine.path_index import NetworkxPathIndex, PathIndex, SparsePathIndex
+
+
+def dpid(switch_id: int) -> str:
+    return format(switch_id, '016x')
+
+
+def create_fabric(switch_count: int, chords_per_switch: int, seed: int) -> tuple[dict, dict, dict]:
+    """Returns the switch links, switch port mappings and host switches of a generated fabric"""
+    rng = random.Random(seed)
+    switch_links = {dpid(switch_id): set() for switch_id in range(1, switch_count + 1)}
+
+    links = [(switch_id, switch_id % switch_count + 1) for switch_id in range(1, switch_count + 1)]
+    links += [(rng.randint(1, switch_count), rng.randint(1, switch_count))
+              for _ in range(switch_count * chords_per_switch)]
+
+    switch_port_mappings, host_switches, next_ports = {}, {}, {}
+
+    for switch_id, remote_switch_id in links:
+        switch, remote_switch = dpid(switch_id), dpid(remote_switch_id)
+
+        if switch == remote_switch or remote_switch in switch_links[switch]:
+            continue
+
+        switch_links[switch].add(remote_switch)
+        switch_links[remote_switch].add(switch)
+
+        port, remote_port = (f"s{node_id}-eth{next_ports.setdefault(node_id, 2)}"
+                             for node_id in (switch_id, remote_switch_id))
+        next_ports[switch_id] += 1
+        next_ports[remote_switch_id] += 1
+
+        switch_port_mappings[(switch, remote_switch)] = (port, remote_port)
+        switch_port_mappings[(remote_switch, switch)] = (remote_port, port)
+
+    for switch_id in range(1, switch_count + 1):
+        host_id = f"host-{switch_id}-1"
+        host_switches[host_id] = dpid(switch_id)
+
+        switch_port_mappings[(dpid(switch_id), host_id)] = (f"s{switch_id}-eth1", host_id)
+        switch_port_mappings[(host_id, dpid(switch_id))] = (host_id, f"s{switch_id}-eth1")
+
+    return switch_links, switch_port_mappings, host_switches
+
+
+def build_path_index(backend: str, switch_links: dict, switch_port_mappings: dict,
+                     host_switches: dict) -> PathIndex:
+    if backend == "sparse":
+        return SparsePathIndex(switch_links, switch_port_mappings, host_switches)
+
+    network_graph = nx.Graph()
+
+    for switch, linked_switches in switch_links.items():
+        network_graph.add_edges_from((switch, linked_switch) for linked_switch in linked_switches)
+
+    network_graph.add_edges_from(host_switches.items())
+
+    return NetworkxPathIndex(network_graph, switch_port_mappings, host_switches)
+
+
+def time_backend(backend: str, fabric: tuple[dict, dict, dict],
+                 queries: list[tuple[str, str]]) -> tuple[float, float, float, Optional[int]]:
+    """Returns the build time, time per path query and time per reachability query, in milliseconds"""
+    start = time.perf_counter()
+    path_index = build_path_index(backend, *fabric)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    path_length = sum(len(path_index.port_path(source, destination)) for source, destination in queries)
+    path_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for source, destination in queries:
+        path_index.is_reachable(source, destination)
+    reachability_time = time.perf_counter() - start
+
+    return build_time * 1000, path_time * 1000 / len(queries), reachability_time * 1000 / len(queries), path_length
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(prog="Topology benchmark")
+    arg_parser.add_argument('--switches', type=int, nargs="+", default=[100, 1000, 10000])
+    arg_parser.add_argument('--chords-per-switch', type=int, default=1)
+    arg_parser.add_argument('--queries', type=int, default=200)
+    arg_parser.add_argument('--max-networkx-switches', type=int, default=1000)
+    arg_parser.add_argument('--seed', type=int, default=1734289230)
+    args = arg_parser.parse_args()
+
+    results = PrettyTable()
+    results.field_names = ["Switches", "Backend", "Build (ms)", "Path query (ms)", "Reachability query (ms)"]
+
+    for switch_count in args.switches:
+        fabric = create_fabric(switch_count, args.chords_per_switch, args.seed)
+
+        rng = random.Random(args.seed)
+        hosts = sorted(fabric[2])
+        queries = [(rng.choice(hosts), rng.choice(hosts)) for _ in range(args.queries)]
+
+        path_lengths = set()
+
+        for backend in ["networkx", "sparse"]:
+            if backend == "networkx" and switch_count > args.max_networkx_switches:
+                results.add_row([switch_count, backend, "skipped", "-", "-"])
+                continue
+
+            build_time, path_time, reachability_time, path_length = time_backend(backend, fabric, queries)
+            path_lengths.add(path_length)
+
+            results.add_row([switch_count, backend, f"{build_time:.1f}", f"{path_time:.3f}",
+                             f"{reachability_time:.4f}"])
+
+        if len(path_lengths) > 1:
+            print(f"Warning: the backends found paths of different lengths for {switch_count} switches")
+
+    print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares the pooled RyuTransport against opening a new connection for every Ryu API call
+(the behaviour of a bare requests.get/requests.post). Both collect the full network state of a
+generated fabric served by the Ryu stand-in.
+
+Usage:
+    python -m benchmarks.transport_benchmark --switches 60 --rounds 5
+"""
+
+import argparse
+import time
+
+import requests
+from prettytable import PrettyTable
+
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+class UnpooledTransport(RyuTransport):
+    """Opens and closes a TCP connection on every call, like a bare requests.get"""
+
+    def request(self, method: str, path: str, timeout=None, **kwargs) -> requests.Response:
+        return requests.request(method, self.url(path), timeout=self._timeout(timeout), **kwargs)
+
+
+def run_benchmark(stand_in: RyuStandIn, transport: RyuTransport, max_workers: int, rounds: int) -> tuple[float, int]:
+    finder = NetworkStateFinder(max_workers=max_workers, transport=transport)
+
+    finder.get_network_state()  # warm up
+
+    connections_before = stand_in.connections_opened
+    start = time.perf_counter()
+
+    for _ in range(rounds):
+        finder.get_network_state()
+
+    elapsed = (time.perf_counter() - start) / rounds
+
+    return elapsed, stand_in.connections_opened - connections_before
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(prog="Ryu transport benchmark")
+    arg_parser.add_argument('--switches', type=int, default=60)
+    arg_parser.add_argument('--rounds', type=int, default=5)
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every stand-in response")
+    args = arg_parser.parse_args()
+
+    results = PrettyTable()
+    results.field_names = ["Transport", "Workers", "Calls per sweep", "Mean sweep (ms)", "New connections"]
+
+    with RyuStandIn(SyntheticFabric(args.switches), latency=args.latency) as stand_in:
+        calls_per_sweep = 1 + 3 + 2 * args.switches  # bulk topology, then flows and groups per switch
+
+        for max_workers in [1, 16]:
+            for name, transport in [("new connection per call", UnpooledTransport(base_url=stand_in.url)),
+                                    ("pooled keep-alive", RyuTransport(base_url=stand_in.url))]:
+                elapsed, connections = run_benchmark(stand_in, transport, max_workers, args.rounds)
+
+                results.add_row([name, max_workers, calls_per_sweep, f"{elapsed * 1000:.1f}",
+                                 connections])
+
+                transport.close()
+
+    print(results)
+
+
+if __name__ == "__main__":
+    main()
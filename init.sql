@@ -11,4 +11,38 @@ CREATE TABLE IF NOT EXISTS users (
     password VARCHAR(255) NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS entities (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(255) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    entity_type ENUM('USER', 'APPLICATION') NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS processed_intents (
+    agent_run VARCHAR(255) NOT NULL PRIMARY KEY,
+    declared_by_id INT NOT NULL,
+    intent TEXT,
+    timestamp DATETIME NOT NULL,
+    model VARCHAR(255) NOT NULL,
+    cookie BIGINT NULL,
+    cookie_mask BIGINT NULL,
+    FOREIGN KEY (declared_by_id) REFERENCES entities(id)
+);
+
+CREATE TABLE IF NOT EXISTS tool_calls (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(200) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS called_tools (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    agent_run VARCHAR(255) NOT NULL,
+    run_order INT NOT NULL,
+    tool_call_id INT NOT NULL,
+    arguments JSON NOT NULL,
+    FOREIGN KEY (agent_run) REFERENCES processed_intents(agent_run),
+    FOREIGN KEY (tool_call_id) REFERENCES tool_calls(id),
+    CONSTRAINT uq_agent_run_step_order UNIQUE (agent_run, run_order)
+);
+
 INSERT INTO users(name, username, password) VALUES('admin', 'admin');
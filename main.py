@@ -25,9 +25,9 @@ def main():
     main_arg_parser.add_argument('--api', action='store_true', help="Turn REST APIs on. Must be enabled to use OttoGui")
     main_arg_parser.add_argument('--gui', action='store_true', help="Turn on OttoGui")
 
-    main_arg_parser.add_argument('--api-pool-size', required=False,
+    main_arg_parser.add_argument('--api-pool-size', required=False, type=int,
                                  help="IntentProcessor Pool Size to use for Otto REST APIs")
-    main_arg_parser.add_argument('--pool-models', required=False,
+    main_arg_parser.add_argument('--pool-models', required=False, nargs="+",
                                  help="Models to be used in REST API IntentProcessor Pool")
 
     main_arg_parser.add_argument('--shell', action='store_true', help="Enable shell mode")
@@ -55,7 +55,12 @@ def main():
     if args.api:
         otto_flask_api = OttoApi()
 
-        gm = GunicornManager(otto_flask_api.app)
+        if args.api_pool_size:
+            otto_flask_api.intent_processor_pool.pool_size = args.api_pool_size
+        if args.pool_models:
+            otto_flask_api.intent_processor_pool.models = args.pool_models
+
+        gm = GunicornManager(otto_flask_api.app, on_worker_start=otto_flask_api.intent_processor_pool.create_pool)
 
     if args.gui:
         if not args.api:
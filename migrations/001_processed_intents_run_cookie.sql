@@ -0,0 +1,8 @@
+-- Adds the cookie stamped on the flows of every agent run to processed_intents.
+-- Applied automatically when the API starts (see ProcessedIntents.add_missing_columns), or by hand with:
+--   mysql -u root -p authentication_db < migrations/001_processed_intents_run_cookie.sql
+USE authentication_db;
+
+ALTER TABLE processed_intents
+    ADD COLUMN cookie BIGINT NULL,
+    ADD COLUMN cookie_mask BIGINT NULL;
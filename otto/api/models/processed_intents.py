@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, Text, DateTime, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import relationship
 
 from otto.api.models.base import Base
 
+# columns added to processed_intents after its first release, see migrations/
+ADDED_COLUMNS = {"cookie": "BIGINT", "cookie_mask": "BIGINT"}
+
 
 class ProcessedIntents(Base):
     __tablename__ = "processed_intents"
@@ -12,6 +16,28 @@ class ProcessedIntents(Base):
     intent = Column(Text)
     timestamp = Column(DateTime, nullable=False)
     model = Column(String(255), nullable=False)
+    # cookie stamped on the flows installed by the agent run, selected under cookie_mask
+    cookie = Column(BigInteger)
+    cookie_mask = Column(BigInteger)
 
     declared_user = relationship("Entities", back_populates="user_intent")
     outcomes = relationship('CalledTools', back_populates='intent', cascade='all, delete-orphan')
+
+    @staticmethod
+    def add_missing_columns(engine: Engine) -> list[str]:
+        """
+        Method to bring a processed_intents table created before ADDED_COLUMNS existed up to date, as
+        create_all only creates missing tables. Returns the names of the columns added.
+        """
+        if not inspect(engine).has_table(ProcessedIntents.__tablename__):
+            return []
+
+        existing_columns = {column["name"] for column in inspect(engine).get_columns(ProcessedIntents.__tablename__)}
+        missing_columns = [column for column in ADDED_COLUMNS if column not in existing_columns]
+
+        with engine.begin() as connection:
+            for column in missing_columns:
+                connection.execute(text(f"ALTER TABLE {ProcessedIntents.__tablename__} "
+                                        f"ADD COLUMN {column} {ADDED_COLUMNS[column]} NULL"))
+
+        return missing_columns
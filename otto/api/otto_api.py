@@ -9,11 +9,10 @@ from langchain_core.runnables.config import RunnableConfig
 
 from otto.api.flask_db import db
 from otto.api.models.entities import Entities
-from otto.intent_utils.agent_prompt import intent_processor_prompt
 from otto.intent_utils.model_factory import ModelFactory
 from otto.otto_logger.logger_config import logger
-from otto.ryu.intent_engine.intent_processor_agent import IntentProcessor
-from otto.ryu.intent_engine.intent_processor_agent_tools import create_tool_list
+from otto.ryu.intent_engine.intent_processor_pool import IntentProcessorPool
+from otto.ryu.intent_engine.run_cookie import find_run_flows, rollback_run
 from otto.ryu.network_state_db.processed_intents_db_operator import ProcessedIntentsDbOperator
 
 
@@ -39,6 +38,7 @@ class OttoApi:
 
         self._processed_intents_db_conn = ProcessedIntentsDbOperator()
         self._model_factory = ModelFactory()
+        self.intent_processor_pool = IntentProcessorPool()
 
         self._create_routes()
 
@@ -69,6 +69,12 @@ class OttoApi:
 
             return wrapped
 
+        def request_username() -> str:
+            """Returns the user/app the JWT token of the request was given to, once validated by validate_token"""
+            token = request.headers['Authorization'].split(" ")[1]
+
+            return jwt.decode(token, self.app.config['SECRET_KEY'], algorithms=['HS256'])['app']
+
         @self.app.route('/login', methods=['POST'])
         def app_login():
             """
@@ -126,17 +132,16 @@ class OttoApi:
             if 'model' not in intent_request or not intent_request['model']:
                 return jsonify({'message': 'No model provided'}), 403
 
-            else:
-                chosen_model = ModelFactory.get_model(intent_request['model'])
-
-                designated_processor = IntentProcessor(chosen_model, create_tool_list(), intent_processor_prompt,
-                                                       token_data['app'])
-
             intent = intent_request['intent']
 
             messages, config = [HumanMessage(content=intent)], RunnableConfig(recursion_limit=300)
 
-            result = designated_processor.graph.invoke({"messages": messages}, config)
+            try:
+                with self.intent_processor_pool.processor(intent_request['model']) as designated_processor:
+                    result = designated_processor.invoke({"messages": messages, "username": token_data['app']},
+                                                         config)
+            except ValueError as e:
+                return jsonify({'message': str(e)}), 403
 
             resp = ""
 
@@ -148,9 +153,11 @@ class OttoApi:
                         resp += m.content[0].get("text", "") + " "
 
             if 'stream_type' in intent_request and 'stream_type' == 'AgentMessages':
-                return jsonify({'message': resp, 'operations': result['operations']})
+                return jsonify({'message': resp, 'operations': result['operations'],
+                                'token_usage': result.get('token_usage', {})})
             else:
-                return jsonify({'message': resp, 'operations': result['operations']})
+                return jsonify({'message': resp, 'operations': result['operations'],
+                                'token_usage': result.get('token_usage', {})})
 
         @self.app.route('/latest-activity', methods=['GET'])
         @validate_token
@@ -180,5 +187,37 @@ class OttoApi:
 
             return jsonify({'message': response})
 
+        @self.app.route('/intent-flows/<agent_run>', methods=['GET'])
+        @validate_token
+        def get_intent_flows(agent_run):
+            """Lists the flows still installed by a processed intent, found by the cookie of its agent run"""
+            # only the user/app which declared the intent can see or roll back its flows
+            intent_cookie = self._processed_intents_db_conn.get_intent_cookie(agent_run, request_username())
+
+            if intent_cookie is None:
+                return jsonify({'message': f"No flows recorded for agent run {agent_run}"}), 404
+
+            cookie, cookie_mask = intent_cookie
+            response = find_run_flows(cookie, cookie_mask=cookie_mask)
+
+            return jsonify({'message': response})
+
+        @self.app.route('/rollback-intent/<agent_run>', methods=['POST'])
+        @validate_token
+        def rollback_intent(agent_run):
+            """Deletes the flows installed by a processed intent, with one call per switch"""
+            # only the user/app which declared the intent can see or roll back its flows
+            intent_cookie = self._processed_intents_db_conn.get_intent_cookie(agent_run, request_username())
+
+            if intent_cookie is None:
+                return jsonify({'message': f"No flows recorded for agent run {agent_run}"}), 404
+
+            cookie, cookie_mask = intent_cookie
+            response = rollback_run(cookie, cookie_mask=cookie_mask)
+
+            logger.info(f"Rolled back the flows of agent run {agent_run}: {response}")
+
+            return jsonify({'message': response})
+
     def run(self):
         self.app.run()
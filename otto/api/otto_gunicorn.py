@@ -1,14 +1,17 @@
 import multiprocessing
+from typing import Callable, Optional
 
 from gunicorn.app.base import BaseApplication
 
 from otto.api.flask_db import db
-from otto.otto_logger.logger_config import logger
+from otto.api.models.processed_intents import ProcessedIntents
 from otto.api.models.tool_calls import ToolCalls
+from otto.otto_logger.logger_config import logger
 class GunicornManager(BaseApplication):
 
-    def __init__(self, flask_app):
+    def __init__(self, flask_app, on_worker_start: Optional[Callable[[], None]] = None):
         self._app = flask_app
+        self._on_worker_start = on_worker_start
         self.host = "0.0.0.0"
         self.port = 5000
         self.options = {
@@ -17,7 +20,7 @@ class GunicornManager(BaseApplication):
             "timeout": 3000,
             "loglevel": "critical",
             "on_starting": self._before_fork,
-            "post_fork": self._log_worker_pid
+            "post_fork": self._start_worker
         }
 
         self.process = None
@@ -28,6 +31,11 @@ class GunicornManager(BaseApplication):
         with self._app.app_context():
             try:
                 db.create_all()
+                added_columns = ProcessedIntents.add_missing_columns(db.engine)
+
+                if added_columns:
+                    logger.info(f"Added columns {added_columns} to processed_intents")
+
                 ToolCalls.populate_tool_calls()
                 logger.info("Otto Database Initialised")
             except Exception as e:
@@ -78,6 +86,19 @@ class GunicornManager(BaseApplication):
         """
         logger.info(f"Gunicorn Master started with PID {server.pid}")
 
+    def _start_worker(self, server, worker):
+        """
+        Called in each worker after it is forked from the Gunicorn Master. Runs on_worker_start, e.g. to
+        create the IntentProcessorPool of the worker before it serves its first request.
+        """
+        self._log_worker_pid(server, worker)
+
+        if self._on_worker_start is not None:
+            try:
+                self._on_worker_start()
+            except Exception as e:
+                logger.warn(f"Could not prepare Gunicorn Worker {worker.pid}: {e}")
+
     def _log_worker_pid(self, server, worker):
         """
         Log the PID of a worker forked from Gunicorn Master process.
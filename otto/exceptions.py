@@ -46,4 +46,7 @@ class AuthenticationError(Exception):
     pass
 
 class ApiRequestError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class NetworkStatePublisherException(Exception):
+    pass
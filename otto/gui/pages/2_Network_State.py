@@ -4,6 +4,7 @@ import networkx as nx
 import streamlit as st
 
 from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.port_dpid_index import PortDpidIndex
 
 if st.session_state.user_token is None:
     st.info('Please Login from the Home page and try again.')
@@ -31,12 +32,18 @@ def create_network_graph(network_state: dict):
 
     images = {k: PIL.Image.open(fname) for k, fname in icons.items()}
 
+    port_dpids = PortDpidIndex(network_state)
+
     for switch, switch_data in network_state.items():
-        switch_decimal = f"switch-{format(int(switch), 'd')}"
+        switch_decimal = f"switch-{int(switch, 16)}"
         if switch_decimal not in network_graph.nodes():
             network_graph.add_node(switch_decimal, image=images["switch"])
         for switch_port, remote_port in switch_data.get('portMappings', {}).items():
-            remote_switch = f"switch-{int(remote_port.split('-')[0][1])}"
+            remote_dpid = port_dpids.remote_switch(switch_port, remote_port)
+            if remote_dpid is None:
+                continue
+
+            remote_switch = f"switch-{int(remote_dpid, 16)}"
             if remote_switch not in network_graph.nodes():
                 print(f"{remote_switch} not in graph. adding..")
                 network_graph.add_node(remote_switch, image=images["switch"])
@@ -1,19 +1,30 @@
 import operator
 from typing import Annotated, TypedDict
 
-import networkx as nx
 from langchain_core.messages import AnyMessage
 
+from otto.ryu.intent_engine.path_index import PathIndex
+
+
+def add_token_usage(token_usage: dict, call_usage: dict) -> dict:
+    """Adds the tokens used by one model call to the tokens used so far by the agent run"""
+    return {key: token_usage.get(key, 0) + call_usage.get(key, 0) for key in token_usage.keys() | call_usage.keys()}
+
 
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], operator.add]
 
     agent_run_id: str
+    username: str
 
     network_state: dict
+    encoded_network_state: str
     switch_port_mappings: dict
     host_mappings: dict
-    network_graph: nx.Graph
+    path_index: PathIndex
+
+    notified_switches: list[str]
+    token_usage: Annotated[dict, add_token_usage]
 
     operations: list[str]
     intent_understanding: str
@@ -0,0 +1,100 @@
+"""
+Narrows the network state given to the IntentProcessor in its prompt down to the part of the network an intent
+is concerned with. The hosts, IP and MAC addresses and switches named in the intent are resolved to nodes of the
+network topology. The scope is made up of the switches on the shortest paths between these nodes, along with the
+switches neighbouring them, so the model can still reason about detours and the reverse path.
+
+When nothing in the intent can be resolved, or the intent refers to the whole network (e.g. "all hosts"),
+no scope is found and the full network state is used.
+"""
+
+import re
+from itertools import combinations
+from typing import Optional
+
+from otto.ryu.intent_engine.path_index import PathIndex
+
+MAX_CANDIDATE_PATHS = 4
+
+HOST_PATTERN = re.compile(r"\bhost-\d+-\d+\b", re.IGNORECASE)
+IPV4_PATTERN = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+MAC_PATTERN = re.compile(r"\b(?:[0-9a-f]{2}:){5}[0-9a-f]{2}\b", re.IGNORECASE)
+DPID_PATTERN = re.compile(r"\b[0-9a-f]{16}\b", re.IGNORECASE)
+SWITCH_PATTERN = re.compile(r"\b(?:s|sw|switch\s*)(\d+)\b", re.IGNORECASE)
+WHOLE_NETWORK_PATTERN = re.compile(r"\b(?:all|every|each)\s+(?:hosts?|switch(?:es)?|nodes?|devices?)\b|"
+                                   r"\b(?:entire|whole)\s+(?:network|fabric|topology)\b", re.IGNORECASE)
+
+
+def resolve_intent_nodes(intent: str, network_elements: dict) -> set[str]:
+    """
+    Returns the nodes of the network topology named in an intent: hosts by ID, IPv4 or MAC address, and switches
+    by DPID, switch ID (e.g. s1, switch 1) or port name (e.g. s1-eth2).
+    Args:
+        intent: the intent declared by the user
+        network_elements: {switch DPID: switch info} of the network state
+    """
+    hosts_by_address, host_ids = {}, set()
+
+    for switch_info in network_elements.values():
+        for host in (switch_info.get("connectedHosts") or {}).values():
+            host_ids.add(host["id"])
+            hosts_by_address[host.get("mac", "").lower()] = host["id"]
+
+            for address in host.get("ipv4") or []:
+                hosts_by_address[address] = host["id"]
+
+    resolved_nodes = {host_id for host_id in (match.lower() for match in HOST_PATTERN.findall(intent))
+                      if host_id in host_ids}
+
+    for address in IPV4_PATTERN.findall(intent) + [mac.lower() for mac in MAC_PATTERN.findall(intent)]:
+        if address in hosts_by_address:
+            resolved_nodes.add(hosts_by_address[address])
+
+    for dpid in DPID_PATTERN.findall(intent):
+        if dpid.lower() in network_elements:
+            resolved_nodes.add(dpid.lower())
+
+    for switch_id in SWITCH_PATTERN.findall(intent):
+        dpid = format(int(switch_id), '016x')
+
+        if dpid in network_elements:
+            resolved_nodes.add(dpid)
+
+    return resolved_nodes
+
+
+def find_scope(intent_nodes: set[str], path_index: PathIndex) -> set[str]:
+    """
+    Returns the nodes on up to MAX_CANDIDATE_PATHS shortest paths between every pair of intent nodes,
+    together with the neighbours of these nodes.
+    """
+    scope = {node for node in intent_nodes if node in path_index}
+
+    for source, target in combinations(sorted(scope), 2):
+        if path_index.is_reachable(source, target):
+            for path in path_index.equal_cost_paths(source, target, MAX_CANDIDATE_PATHS):
+                scope.update(path)
+
+    return scope.union(*(path_index.neighbours(node) for node in scope))
+
+
+def scope_network_state(intent: str, network_state: dict, path_index: PathIndex) -> Optional[dict]:
+    """
+    Returns the network state narrowed down to the switches an intent is concerned with, keyed by the same
+    state ID as network_state. Returns None when the scope of the intent cannot be found, in which case the
+    full network state should be used.
+    """
+    state_id = next(iter(network_state), None)
+
+    if state_id is None or not isinstance(intent, str) or WHOLE_NETWORK_PATTERN.search(intent):
+        return None
+
+    network_elements = network_state[state_id]
+    intent_nodes = resolve_intent_nodes(intent, network_elements)
+
+    if not intent_nodes:
+        return None
+
+    scope = find_scope(intent_nodes, path_index) | intent_nodes
+
+    return {state_id: {switch: switch_info for switch, switch_info in network_elements.items() if switch in scope}}
@@ -0,0 +1,237 @@
+"""
+Compact, deterministic encoding of the network state given to the IntentProcessor in its prompt.
+
+The network state is stored as nested dictionaries, whose repr repeats every field name for every port,
+host and flow, and keys each flow on a 32 character MD5 hash. The encoding lists the switches one after the
+other and every element of a switch as a table: the fields of the table are named once in its header and
+each element is written as one row. Switches, ports, hosts, flows and groups are sorted, so the same network
+state is always encoded the same way, e.g.:
+
+    network state 3f1c9a2e (flow counters omitted)
+    switch 0000000000000001
+     ports[no|name|mac]
+      1|s1-eth1|02:00:00:00:01:01
+     links[port|remote port]
+      s1-eth2|s2-eth2
+     hosts[port|id|mac|ipv4|ipv6]
+      s1-eth1|host-1-1|00:00:00:00:00:01|10.0.0.1|-
+     flows[id|table|priority|cookie|idle|hard|match|actions]
+      0e61a5f4|0|65535|0|0|0|dl_dst=01:80:c2:00:00:0e,dl_type=35020|OUTPUT:CONTROLLER
+
+Flow counters and protocol fields which do not describe the configuration of a flow are left out, flow
+hashes are shortened to their first FLOW_ID_LENGTH characters and port numbers are written in decimal.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+from otto.otto_logger.logger_config import logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+FLOW_ID_LENGTH = 8
+DEFAULT_ENCODING = "o200k_base"
+CHARACTERS_PER_TOKEN = 4
+
+EMPTY_VALUE = "-"
+
+PORT_FIELDS = ["no", "name", "mac"]
+LINK_FIELDS = ["port", "remote port"]
+HOST_FIELDS = ["port", "id", "mac", "ipv4", "ipv6"]
+FLOW_FIELDS = ["id", "table", "priority", "cookie", "idle", "hard", "match", "actions"]
+GROUP_FIELDS = ["id", "type", "buckets"]
+
+
+def encode_network_state(network_state: dict) -> str:
+    """
+    Returns the compact encoding of a network state.
+    Args:
+        network_state: {state ID: {switch DPID: switch info}}, as provided by the NetworkStateBroker
+    """
+    state_id = next(iter(network_state), None)
+
+    if state_id is None:
+        return "network state unavailable"
+
+    lines = [f"network state {state_id[:FLOW_ID_LENGTH]} (flow counters omitted)"]
+
+    for switch in sorted(network_state[state_id]):
+        lines.extend(encode_switch(switch, network_state[state_id][switch]))
+
+    return "\n".join(lines)
+
+
+def encode_switch(switch: str, switch_info: dict) -> list[str]:
+    """Returns the lines encoding one switch of the network state"""
+    lines = [f"switch {switch}"]
+
+    port_rows = [[port_number(port.get("port_no")), port.get("name"), port.get("hw_addr")]
+                 for port in sorted(switch_info.get("ports") or [], key=lambda port: str(port.get("port_no")))]
+
+    link_rows = [[switch_port, remote_port]
+                 for switch_port, remote_port in sorted((switch_info.get("portMappings") or {}).items())]
+
+    lines.extend(encode_table("ports", PORT_FIELDS, port_rows))
+    lines.extend(encode_table("links", LINK_FIELDS, link_rows))
+    lines.extend(encode_table("hosts", HOST_FIELDS, host_rows(switch_info.get("connectedHosts"))))
+    lines.extend(encode_table("flows", FLOW_FIELDS, flow_rows(switch_info.get("installedFlows"))))
+    lines.extend(encode_table("groups", GROUP_FIELDS, group_rows(switch_info.get("installedGroups"))))
+
+    return lines
+
+
+def encode_topology_summary(network_state: dict) -> str:
+    """
+    Returns a summary of the topology of a network state: one row per switch, with its links and the number
+    of hosts, flows and groups it holds, leaving the details to be looked up by the read tools of the agent.
+    """
+    state_id = next(iter(network_state), None)
+
+    if state_id is None:
+        return "network state unavailable"
+
+    switch_rows = [[switch, len(switch_info.get("connectedHosts") or {}),
+                    len(switch_info.get("installedFlows") or {}), len(switch_info.get("installedGroups") or []),
+                    [f"{switch_port}>{remote_port}" for switch_port, remote_port in
+                     sorted((switch_info.get("portMappings") or {}).items())]]
+                   for switch, switch_info in sorted(network_state[state_id].items())]
+
+    lines = [f"topology summary of network state {state_id[:FLOW_ID_LENGTH]}"]
+    lines.extend(encode_table("switches", ["dpid", "hosts", "flows", "groups", "links"], switch_rows))
+
+    return "\n".join(lines)
+
+
+def host_rows(connected_hosts: Optional[dict]) -> list[list]:
+    """Returns one row of HOST_FIELDS per host connected to a switch, sorted by switch port"""
+    return [[switch_port, host.get("id"), host.get("mac"), host.get("ipv4"), host.get("ipv6")]
+            for switch_port, host in sorted((connected_hosts or {}).items())]
+
+
+def flow_rows(installed_flows: Optional[dict]) -> list[list]:
+    """Returns one row of FLOW_FIELDS per flow installed on a switch, sorted by table and priority"""
+    flow_ids = shorten_flow_ids(installed_flows or {})
+
+    return [[flow_ids[flow_hash], flow.get("table_id"), flow.get("priority"), flow.get("cookie"),
+             flow.get("idle_timeout"), flow.get("hard_timeout"), flow.get("match"), flow.get("actions")]
+            for flow_hash, flow in sorted((installed_flows or {}).items(), key=lambda item: flow_order(*item))]
+
+
+def group_rows(installed_groups: Optional[list]) -> list[list]:
+    """Returns one row of GROUP_FIELDS per group installed on a switch, sorted by group ID"""
+    return [[group.get("group_id"), group.get("type"),
+             [encode_bucket(bucket) for bucket in group.get("buckets", [])]]
+            for group in sorted(installed_groups or [], key=lambda group: group.get("group_id", 0))]
+
+
+def encode_table(name: str, fields: list[str], rows: list[list]) -> list[str]:
+    """Returns a table header naming its fields followed by one line per row. Empty tables are left out."""
+    if not rows:
+        return []
+
+    return [f" {name}[{'|'.join(fields)}]"] + [f"  {'|'.join(encode_value(value) for value in row)}"
+                                               for row in rows]
+
+
+def encode_value(value) -> str:
+    """Encodes one cell of a table: dictionaries as key=value pairs and lists as comma separated values"""
+    if value is None or value == "" or value == [] or value == {}:
+        return EMPTY_VALUE
+
+    if isinstance(value, dict):
+        return ",".join(f"{key}={encode_value(value[key])}" for key in sorted(value))
+
+    if isinstance(value, (list, tuple)):
+        return ",".join(encode_value(item) for item in value)
+
+    return str(value)
+
+
+def encode_bucket(bucket: dict) -> str:
+    """Encodes a group bucket as e.g. w50:OUTPUT:2+SET_FIELD:{ipv4_dst:10.0.0.2}"""
+    bucket_fields = [f"w{bucket['weight']}" if bucket.get("weight") else None,
+                     f"watch{bucket['watch_port']}" if isinstance(bucket.get("watch_port"), int)
+                                                       and bucket["watch_port"] < 0xffffff00 else None,
+                     "+".join(encode_action(action) for action in bucket.get("actions", []))]
+
+    return ":".join(field for field in bucket_fields if field)
+
+
+def encode_action(action) -> str:
+    if isinstance(action, dict):
+        return ":".join(str(value) for value in action.values())
+
+    return str(action)
+
+
+def port_number(port_no) -> int | str:
+    """Converts a port number reported by Ryu (e.g. 00000002) to decimal. Reserved ports are kept as named."""
+    try:
+        return int(port_no, 16) if isinstance(port_no, str) else port_no
+    except ValueError:
+        return port_no
+
+
+def flow_order(flow_hash: str, flow: dict) -> tuple:
+    """Flows are listed per table, from the highest to the lowest priority"""
+    return flow.get("table_id", 0), -flow.get("priority", 0), flow_hash
+
+
+def shorten_flow_ids(installed_flows: dict) -> dict[str, str]:
+    """
+    Returns the shortened ID of every flow of a switch, as {flow hash: flow ID}. IDs are the first
+    FLOW_ID_LENGTH characters of the hash, lengthened for the flows whose prefixes would collide.
+    """
+    flow_ids, id_length = {}, FLOW_ID_LENGTH
+    flow_hashes = sorted(installed_flows)
+
+    while id_length < max(map(len, flow_hashes), default=0) and \
+            len({flow_hash[:id_length] for flow_hash in flow_hashes}) < len(flow_hashes):
+        id_length += FLOW_ID_LENGTH
+
+    for flow_hash in flow_hashes:
+        flow_ids[flow_hash] = flow_hash[:id_length]
+
+    return flow_ids
+
+
+@lru_cache(maxsize=None)
+def _token_encoding(model_name: Optional[str]):
+    if tiktoken is None:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model_name) if model_name else tiktoken.get_encoding(DEFAULT_ENCODING)
+    except KeyError:
+        return _token_encoding(None)  # model unknown to tiktoken, e.g. a Claude or DeepSeek model
+    except Exception as e:
+        logger.debug(f"Could not load a tiktoken encoding, approximating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Returns the number of tokens in text, counted with the tiktoken encoding of model_name (or
+    DEFAULT_ENCODING for models tiktoken does not know). Without tiktoken, or when its encoding cannot be
+    loaded, the count is approximated as one token per CHARACTERS_PER_TOKEN characters.
+    """
+    encoding = _token_encoding(model_name)
+
+    if encoding is None:
+        return -(-len(text) // CHARACTERS_PER_TOKEN)
+
+    return len(encoding.encode(text))
+
+
+def measure_encodings(network_state: dict, model_name: Optional[str] = None) -> dict[str, int]:
+    """
+    Returns the number of tokens taken by the network state in the prompt, as its repr (how the
+    IntentProcessor used to include it) and as its compact encoding.
+    """
+    return {
+        "repr": count_tokens(str(network_state), model_name),
+        "compact": count_tokens(encode_network_state(network_state), model_name)
+    }
@@ -0,0 +1,133 @@
+"""
+Validation and execution of the flow and group operations of the apply_flow_batch tool. All the operations of
+a batch are validated before any is sent to Ryu, so a batch with a mistake in it is not half applied. The
+operations of a switch are sent in the order they were given, while the switches are programmed concurrently
+over the pooled connections of the RyuTransport.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from otto.ryu.ryu_transport import RyuTransport
+
+FLOW_FIELDS = {"table_id", "match", "actions", "priority"}
+GROUP_FIELDS = {"group_id", "bucket_type", "buckets"}
+
+# operation: (Ryu API, required fields, optional fields)
+BATCH_OPERATIONS = {
+    "add_rule": ("/stats/flowentry/add", {"table_id", "match", "actions"}, {"priority"}),
+    "delete_rule_strict": ("/stats/flowentry/delete_strict", FLOW_FIELDS, set()),
+    "modify_rule_strict": ("/stats/flowentry/modify_strict", FLOW_FIELDS, set()),
+    "add_group": ("/stats/groupentry/add", GROUP_FIELDS, set()),
+    "modify_group": ("/stats/groupentry/modify", {"group_id"}, {"bucket_type", "buckets"}),
+    "delete_group": ("/stats/groupentry/delete", {"group_id"}, set())
+}
+
+FIELD_TYPES = {"table_id": int, "priority": int, "group_id": int, "match": dict, "actions": list,
+               "buckets": list, "bucket_type": str}
+
+DEFAULT_PRIORITY = 32768
+STATUS_NOT_APPLIED = "not applied"
+STATUS_SKIPPED = "skipped"
+
+
+def validate_operation(operation: dict, network_elements: dict) -> tuple[Optional[str], Optional[str]]:
+    """
+    Returns the DPID of the switch an operation applies to, and the reason the operation is invalid (None if
+    it is valid).
+    Args:
+        operation: {"operation": name of the operation, "switch_id": ID of the switch, ...fields}
+        network_elements: {switch DPID: switch info} of the network state
+    """
+    if not isinstance(operation, dict):
+        return None, "operation must be an object"
+
+    name = operation.get("operation")
+
+    if name not in BATCH_OPERATIONS:
+        return None, f"unknown operation {name}, expected one of {', '.join(BATCH_OPERATIONS)}"
+
+    switch_id = str(operation.get("switch_id", "")).strip().lower()
+    dpid = switch_id if len(switch_id) == 16 else format(int(switch_id), '016x') if switch_id.isdigit() else None
+
+    if dpid not in network_elements:
+        return None, f"switch {operation.get('switch_id')} is not in the network"
+
+    _, required_fields, optional_fields = BATCH_OPERATIONS[name]
+    fields = set(operation) - {"operation", "switch_id"}
+
+    if required_fields - fields:
+        return dpid, f"missing {', '.join(sorted(required_fields - fields))}"
+
+    if fields - required_fields - optional_fields:
+        return dpid, f"unexpected {', '.join(sorted(fields - required_fields - optional_fields))}"
+
+    for field in sorted(fields):
+        if not isinstance(operation[field], FIELD_TYPES[field]) or isinstance(operation[field], bool):
+            return dpid, f"{field} must be of type {FIELD_TYPES[field].__name__}"
+
+    if not 0 <= operation.get("priority", DEFAULT_PRIORITY) <= 65535:
+        return dpid, "priority must be between 0 and 65535"
+
+    return dpid, None
+
+
+def create_request(operation: dict, dpid: str, cookie: int = 0) -> dict:
+    """Returns the body of the Ryu API call made for an operation, with the flows stamped with a cookie"""
+    data = {"dpid": int(dpid, 16)}
+
+    if operation["operation"] in ["add_rule", "delete_rule_strict", "modify_rule_strict"]:
+        data.update({"cookie": cookie, "table_id": operation["table_id"],
+                     "priority": operation.get("priority", DEFAULT_PRIORITY),
+                     "match": operation["match"], "actions": operation["actions"]})
+    else:
+        data.update({"group_id": operation["group_id"], "type": operation.get("bucket_type"),
+                     "buckets": operation.get("buckets")})
+
+    return {field: value for field, value in data.items() if value is not None}
+
+
+def apply_operations(operations: list[dict], network_elements: dict,
+                     transport: Optional[RyuTransport] = None, cookie: int = 0) -> list[dict]:
+    """
+    Validates a batch of operations, then sends them to Ryu if they are all valid. Returns the status of every
+    operation, in the order they were given: the HTTP status code of its call, or why it was not applied.
+    Once an operation on a switch fails, the operations which follow it on that switch are skipped, as they
+    may depend on it. The flows are stamped with the cookie given, e.g. the cookie of the agent run.
+    """
+    transport = transport or RyuTransport.get_instance()
+    validated = [validate_operation(operation, network_elements) for operation in operations]
+
+    results = [{"operation": operation.get("operation") if isinstance(operation, dict) else None,
+                "switch": dpid, "status": f"invalid: {error}" if error else STATUS_NOT_APPLIED}
+               for operation, (dpid, error) in zip(operations, validated)]
+
+    if not operations or any(error for _, error in validated):
+        return results
+
+    switch_operations: dict[str, list[int]] = {}
+
+    for index, (dpid, _) in enumerate(validated):
+        switch_operations.setdefault(dpid, []).append(index)
+
+    def apply_switch_operations(indexes: list[int]):
+        for position, index in enumerate(indexes):
+            api = BATCH_OPERATIONS[operations[index]["operation"]][0]
+
+            try:
+                status_code = transport.post(api, json=create_request(operations[index], validated[index][0], cookie)) \
+                    .status_code
+            except Exception as e:
+                status_code = f"error: {e}"
+
+            results[index]["status"] = status_code
+
+            if status_code != 200:
+                for skipped_index in indexes[position + 1:]:
+                    results[skipped_index]["status"] = STATUS_SKIPPED
+                return
+
+    with ThreadPoolExecutor(max_workers=min(len(switch_operations), transport.pool_size)) as executor:
+        list(executor.map(apply_switch_operations, switch_operations.values()))
+
+    return results
@@ -0,0 +1,126 @@
+"""
+Verification of the flows installed by an agent run. Instead of reading every flow of a switch, each expected
+flow is looked up with a filtered /stats/flow/{dpid} query (table, priority and match), so the controller only
+sends back the flows which could be it. The flow is then verified by comparing the hash of the expected flow,
+computed as for installedFlows, with the hashes of the flows found.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.network_state_format import format_actions, format_match, hash_flow
+from otto.ryu.ryu_transport import RyuTransport
+
+DEFAULT_PRIORITY = 32768
+STATUS_PASS = "pass"
+STATUS_MISSING = "missing"
+STATUS_STILL_INSTALLED = "still installed"
+
+# operations of apply_flow_batch which leave the flow installed or removed
+INSTALLING_OPERATIONS = {"add_rule", "modify_rule_strict"}
+REMOVING_OPERATIONS = {"delete_rule_strict"}
+
+
+def normalise_expected_flow(expected_flow: dict) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Returns the flow to look for, and the reason it cannot be verified (None if it can).
+    Args:
+        expected_flow: {"switch_id": ID of the switch (in decimal) or its DPID, "table_id", "priority", "match",
+        "actions"} as given to add_rule, or an apply_flow_batch operation on a flow. The flow of a
+        delete_rule_strict operation, or one with "absent" set, is expected not to be installed.
+    """
+    if not isinstance(expected_flow, dict):
+        return None, "flow must be an object"
+
+    operation = expected_flow.get("operation")
+
+    if operation is not None and operation not in INSTALLING_OPERATIONS | REMOVING_OPERATIONS:
+        return None, f"cannot verify operation {operation}"
+
+    switch_id = str(expected_flow.get("switch_id", "")).strip().lower()
+
+    if len(switch_id) == 16:
+        try:
+            switch_id = str(int(switch_id, 16))
+        except ValueError:
+            pass
+
+    if not switch_id.isdigit():
+        return None, f"unknown switch {expected_flow.get('switch_id')}"
+
+    flow = {
+        "switch_id": switch_id,
+        "table_id": expected_flow.get("table_id", 0),
+        "priority": expected_flow.get("priority", DEFAULT_PRIORITY),
+        "match": expected_flow.get("match") or {},
+        "actions": format_actions(expected_flow.get("actions") or []),
+        "absent": bool(expected_flow.get("absent")) or operation in REMOVING_OPERATIONS
+    }
+
+    if not isinstance(flow["table_id"], int) or not isinstance(flow["priority"], int):
+        return None, "table_id and priority must be of type int"
+
+    if not isinstance(flow["match"], dict):
+        return None, "match must be of type dict"
+
+    # compared with the flows found in the format Ryu returns them, e.g. ipv4_dst as nw_dst
+    flow["match"] = format_match(flow["match"])
+
+    return flow, None
+
+
+def verify_flow(flow: dict, nw_state_finder: NetworkStateFinder) -> str:
+    """Returns the status of one normalised expected flow, see verify_flows"""
+    flow_filter = {"table_id": flow["table_id"], "priority": flow["priority"], "match": flow["match"]}
+
+    try:
+        flows_found = nw_state_finder.get_matching_flows(flow["switch_id"], flow_filter)
+    except Exception as e:
+        return f"error: {e}"
+
+    # the query also returns flows with more match criteria than the ones asked for
+    same_match = [found_flow for found_flow in flows_found.values() if found_flow.get("match", {}) == flow["match"]]
+
+    if flow["absent"]:
+        return STATUS_STILL_INSTALLED if same_match else STATUS_PASS
+
+    expected_hash = hash_flow(flow["switch_id"], {field: flow[field]
+                                                  for field in ["priority", "table_id", "match", "actions"]})
+
+    if expected_hash in flows_found:
+        return STATUS_PASS
+
+    if same_match:
+        return f"actions differ: {', '.join(same_match[0].get('actions', [])) or 'DROP'}"
+
+    return STATUS_MISSING
+
+
+def verify_flows(expected_flows: list[dict], transport: Optional[RyuTransport] = None) -> list[dict]:
+    """
+    Verifies that flows are installed (or removed) exactly as expected. Returns one result per flow, in the
+    order given, with the switch, priority and match of the flow and its status: "pass", "missing",
+    "actions differ: <installed actions>", "still installed" for a flow expected to be removed,
+    "invalid: <reason>" or "error: <reason>" when the controller could not be queried.
+    """
+    transport = transport or RyuTransport.get_instance()
+    nw_state_finder = NetworkStateFinder(transport=transport)
+
+    normalised = [normalise_expected_flow(expected_flow) for expected_flow in expected_flows]
+
+    def run_verification(flow_and_error: tuple[Optional[dict], Optional[str]]) -> str:
+        flow, error = flow_and_error
+
+        return f"invalid: {error}" if error else verify_flow(flow, nw_state_finder)
+
+    if not expected_flows:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(expected_flows), transport.pool_size)) as executor:
+        statuses = list(executor.map(run_verification, normalised))
+
+    return [{"switch": flow["switch_id"] if flow else None,
+             "priority": flow["priority"] if flow else None,
+             "match": flow["match"] if flow else None,
+             "status": status} for (flow, _), status in zip(normalised, statuses)]
@@ -1,47 +1,78 @@
+import os
 import uuid
 from datetime import datetime
-from typing import Union
+from typing import Iterator, Optional, Union
 
-import networkx as nx
 from langchain_anthropic import ChatAnthropic
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import SystemMessage, merge_message_runs, AIMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph import END, StateGraph
-from langgraph.prebuilt import ToolNode
 
 from otto.intent_utils.agent_state import AgentState
+from otto.intent_utils.intent_scope import scope_network_state
 from otto.intent_utils.model_factory import ModelFactory
+from otto.intent_utils.network_state_encoder import count_tokens, encode_network_state, encode_topology_summary
+from otto.ryu.intent_engine.intent_processor_agent_tools import create_read_tool_list
+from otto.ryu.intent_engine.path_index import PathIndex
+from otto.ryu.intent_engine.run_cookie import RUN_COOKIE_MASK, run_cookie
+from otto.ryu.intent_engine.run_state_overlay import RunStateOverlay
+from otto.ryu.intent_engine.switch_ordered_tool_node import SwitchOrderedToolNode
+from otto.ryu.intent_engine.topology_cache import TopologyCache
+from otto.otto_logger.logger_config import logger
 from otto.ryu.network_state_db.network_state_broker import NetworkStateBroker
+from otto.ryu.network_state_db.network_state_publisher import RemoteNetworkStateBroker
 from otto.ryu.network_state_db.processed_intents_db_operator import ProcessedIntentsDbOperator
+from otto.ryu.ryu_environment import RyuEnvironment
 
 
 class IntentProcessor:
     def __init__(self, model: Union[BaseChatOpenAI, BaseChatModel],
                  tools: list, system_prompt: str,
-                 username: str):
+                 username: Optional[str] = None,
+                 network_state_broker: Optional[Union[NetworkStateBroker, RemoteNetworkStateBroker]] = None,
+                 lazy_network_state: Optional[bool] = None, topology_cache: Optional[TopologyCache] = None,
+                 tool_concurrency: Optional[int] = None):
 
         self.system = system_prompt
         self.tool_list = tools
         self.username = username
 
-        self.tool_node = ToolNode(self.tool_list)
+        # in the lazy mode, the prompt only carries a summary of the topology and the agent looks up hosts,
+        # flows and groups in the network state of its run through the read tools
+        self.lazy_network_state = lazy_network_state if lazy_network_state is not None else \
+            os.getenv("OTTO_LAZY_STATE", "0") == "1"
+
+        if self.lazy_network_state:
+            tool_names = {tool.name for tool in tools}
+            tools = tools + [tool for tool in create_read_tool_list() if tool.name not in tool_names]
+            self.tool_list = tools
+
+        # tool calls made in the same turn run concurrently, but calls on the same switch keep their order
+        self.tool_node = SwitchOrderedToolNode(self.tool_list, max_concurrency=tool_concurrency)
         self.tools = {tool.name: tool for tool in tools}
 
         self.model = model.bind_tools(tools, tool_choice="auto")
         self.model_name = model.model_name if not isinstance(model,
                                                              ChatAnthropic) else model.model  # silly ChatAnthropic shenanigans
+        # Anthropic only caches prompt prefixes which end on a block marked with cache_control, other
+        # providers (OpenAI, DeepSeek) cache long prefixes automatically
+        self.mark_cache_breakpoints = isinstance(model, ChatAnthropic)
 
         self.model_factory = ModelFactory()
 
         self.processed_intents_db_conn = ProcessedIntentsDbOperator()
-        self.network_state_broker = NetworkStateBroker()
+        # shared with every other IntentProcessor (and with every process, see shared_network_state_broker),
+        # so concurrent intents are given the same cached snapshot
+        self.network_state_broker = network_state_broker or RyuEnvironment.shared_network_state_broker()
+        self.topology_cache = topology_cache or TopologyCache.get_instance()
 
         graph = StateGraph(AgentState)
 
         graph.add_node("construct_network_state", self.construct_network_state)
         graph.add_node("reason_intent", self.reason_intent)
-        graph.add_node("execute_action", self.tool_node)
+        graph.add_node("execute_action", self.execute_action)
         graph.add_node("save_intent", self.save_intent)
 
         graph.set_entry_point("construct_network_state")
@@ -57,64 +88,180 @@ class IntentProcessor:
 
         self.graph = graph.compile()
 
+    def invoke(self, agent_input: dict, config: Optional[RunnableConfig] = None) -> dict:
+        """
+        Method to fulfil an intent, running the graph as a single agent run. The agent run is registered with
+        the NetworkStateBroker before the graph runs, and terminated once it returns or raises (see
+        start_agent_run and end_agent_run), so a failed or interrupted run is not left registered.
+
+        Args:
+            agent_input: input of the graph, i.e. the messages of the intent and the username of its author
+            config: config of the graph
+        """
+        agent_run_input = self.start_agent_run(agent_input)
+
+        try:
+            return self.graph.invoke(agent_run_input, config)
+        finally:
+            self.end_agent_run(agent_run_input['agent_run_id'])
+
+    def stream(self, agent_input: dict, config: Optional[RunnableConfig] = None) -> Iterator[dict]:
+        """
+        Method to fulfil an intent as invoke does, yielding the output of each step of the graph. The agent run
+        is terminated once the graph finishes, raises, or the output stops being consumed.
+        """
+        agent_run_input = self.start_agent_run(agent_input)
+
+        try:
+            yield from self.graph.stream(agent_run_input, config)
+        finally:
+            self.end_agent_run(agent_run_input['agent_run_id'])
+
+    def start_agent_run(self, agent_input: dict) -> dict:
+        """
+        Method to register a new agent run with the NetworkStateBroker, which provides the network state
+        of the run. Returns the input of the graph for the run.
+        """
+        agent_run_id = str(uuid.uuid4())
+
+        network_state = self.network_state_broker.provide_network_state(agent_run_id)
+
+        try:
+            self.network_state_broker.subscribe(agent_run_id, self.network_state_changed)
+        except Exception:
+            self.end_agent_run(agent_run_id)
+            raise
+
+        return {**agent_input, 'agent_run_id': agent_run_id, 'network_state': network_state}
+
+    def end_agent_run(self, agent_run_id: str) -> None:
+        """Method to unregister an agent run from the NetworkStateBroker and discard its view of the network"""
+        RunStateOverlay.get_instance().discard(agent_run_id)
+
+        try:
+            self.network_state_broker.terminate_agent_run(agent_run_id)
+        except Exception as e:
+            logger.warn(f"Could not terminate agent run {agent_run_id}: {e}")
+
     def construct_network_state(self, state: AgentState):
         """
         Method to construct the network state to be used by a single agent during an intent fulfilment operation.
-        This is entrypoint to the graph, and constructs three important items to be added to the agent's state:
-            network_state: full dictionary of documents registered in otto_network_state_db
-            network_graph: links between hosts and switches modelled in a nx.Graph object
+        This is entrypoint to the graph, and adds the following items to the agent's state:
             switch_port_mappings: dictionary which follows the structure: {(s1, s2): (s1-eth1: s2-eth2)}
             which describes the interfaces used to connect two nodes.
+            path_index: precomputed paths between every two nodes of the network
+        switch_port_mappings and path_index are taken from the TopologyCache, which builds them once per topology,
+        with a sparse matrix backend for large fabrics (see build_topology).
 
         The network_state will be used as a reference to the agent as to how the current network looks,
-        and network_graph and switch_port_mappings is utilised in the get_path_between_nodes tool to find a path
-        between two nodes in the network.
+        and path_index is utilised in the get_path_between_nodes and get_alternative_paths tools to find paths
+        between two nodes in the network. The network_state is the one provided to the agent run when it was
+        started (see start_agent_run), and is given to the model in its compact encoding
+        (see encode_network_state), which is built once per agent run as encoded_network_state. Only the
+        switches the intent is concerned with are encoded (see scope_network_state), unless they cannot be found.
+        In the lazy mode, only a summary of the topology is encoded (see encode_topology_summary).
         """
 
-        agent_run_id = str(uuid.uuid4())
+        agent_run_id, network_state = state['agent_run_id'], state['network_state']
 
-        network_state = self.network_state_broker.provide_network_state(agent_run_id)
+        # shared with every other agent run given the same network state, so must not be modified
+        topology = self.topology_cache.get_topology(network_state)
 
-        network_graph, switch_port_mappings = nx.Graph(), {}
+        if self.lazy_network_state:
+            encoded_network_state = (f"{encode_topology_summary(network_state)}\n"
+                                     f"Use list_hosts, find_host, get_flows and get_groups to look up the hosts, "
+                                     f"flows and groups of this network state, and check_switch for their "
+                                     f"current configuration.")
+        else:
+            encoded_network_state = self.encode_intent_network_state(agent_run_id, state['messages'][0].content,
+                                                                     network_state, topology.path_index)
 
-        state_id = next(iter(network_state), None)
+        logger.debug(f"Network state for agent run {agent_run_id} encoded in "
+                     f"{count_tokens(encoded_network_state, self.model_name)} tokens")
 
-        for switch, switch_data in network_state[state_id].items():
-            for switch_port, remote_port in switch_data.get('portMappings', {}).items():
-                remote_switch = format(int(remote_port.split('-')[0][1]), '016x')
-                network_graph.add_edge(switch, remote_switch, port_info=(switch_port, remote_port))
+        return {
+            'encoded_network_state': encoded_network_state,
+            'switch_port_mappings': topology.switch_port_mappings,
+            'path_index': topology.path_index
+        }
+
+    def encode_intent_network_state(self, agent_run_id: str, intent: str, network_state: dict,
+                                    path_index: PathIndex) -> str:
+        """Method to encode the part of the network state an intent is concerned with, or all of it"""
+        scoped_network_state = scope_network_state(intent, network_state, path_index)
+
+        if scoped_network_state is None:
+            return encode_network_state(network_state)
+
+        state_id = next(iter(network_state))
+        scoped_switches, all_switches = len(scoped_network_state[state_id]), len(network_state[state_id])
+
+        logger.debug(f"Network state for agent run {agent_run_id} scoped to {scoped_switches} of "
+                     f"{all_switches} switches")
+
+        return (f"Showing the {scoped_switches} of {all_switches} switches concerned with the intent. "
+                f"Use check_switch to see any other switch.\n"
+                f"{encode_network_state(scoped_network_state)}")
+
+    def reason_intent(self, state: AgentState):
+        """
+        LLM decides next action based on intent and state.
+
+        The messages are laid out so that providers can cache their prefix: the system prompt (preceded by
+        the tool schemas) never changes, and is followed by the intent and the network state of the agent run,
+        which stay the same for the whole run. Everything after is only ever appended to: when switches change
+        during the run, a short message naming them is added to the messages of the run instead of the network
+        state being sent again.
+        """
+        messages = [self.cacheable(SystemMessage(content=self.system)), state['messages'][0],
+                    self.cacheable(HumanMessage(content=f"Current Network State:\n{state['encoded_network_state']}"))]
 
-                switch_port_mappings[(switch, remote_switch)] = (switch_port, remote_port)
-                switch_port_mappings[(remote_switch, switch)] = (remote_port, switch_port)
+        changed_switches = self.network_state_broker.changed_switches(state['agent_run_id'])
+        new_changed_switches = changed_switches - set(state.get('notified_switches') or [])
 
-            for switch_port, remote_host in switch_data.get('connectedHosts', {}).items():
-                host_id = remote_host['id']
-                network_graph.add_edge(switch, host_id)
+        state_delta = []
 
-                switch_port_mappings[(switch, host_id)] = (switch_port, host_id)
-                switch_port_mappings[(host_id, switch)] = (host_id, switch_port)
+        if new_changed_switches:
+            state_delta.append(HumanMessage(
+                content=f"Network state update: the following switches changed since the network state above was "
+                        f"collected: {', '.join(sorted(new_changed_switches))}. "
+                        f"Use check_switch with confirmed set on them before changing their configuration."
+            ))
+
+        response = self.model.invoke(messages + state['messages'][1:] + state_delta)
 
         return {
-            'agent_run_id': agent_run_id,
-            'network_state': network_state,
-            'network_graph': network_graph,
-            'switch_port_mappings': switch_port_mappings
+            'messages': state_delta + [response],
+            'notified_switches': sorted(changed_switches),
+            'token_usage': token_usage_of(response)
         }
 
-    def reason_intent(self, state: AgentState):
-        """LLM decides next action based on intent and state"""
+    def cacheable(self, message: BaseMessage) -> BaseMessage:
+        """Method to mark the end of a stable prefix of the messages as a cache breakpoint, for Anthropic models"""
+        if not self.mark_cache_breakpoints:
+            return message
+
+        return message.__class__(content=[{"type": "text", "text": message.content,
+                                           "cache_control": {"type": "ephemeral"}}])
 
-        messages = state['messages']
+    def network_state_changed(self, agent_run_id: str, changed_switches: set[str]):
+        """Callback of the NetworkStateBroker, called when switches change during an agent run"""
+        logger.warn(f"Network state changed during agent run {agent_run_id} on switches {sorted(changed_switches)}")
 
-        # need to reformat this way so that ChatAnthropic doesn't complain
-        messages = [SystemMessage(content=self.system)] + [
-            SystemMessage(content=f"Current Network State:\n{state['network_state']}")] + messages
+    def execute_action(self, state: AgentState, config: RunnableConfig):
+        """
+        Method to run the tool calls of the last model response (see SwitchOrderedToolNode). The switches changed
+        by the calls are reported to the NetworkStateBroker, so the agent run is not notified of its own changes.
+        Only the changes Ryu accepted (with a 200 status code) are reported, as recorded in the RunStateOverlay.
+        """
+        result = self.tool_node.invoke(state, config)
 
-        messages = merge_message_runs(messages)
+        written_switches = RunStateOverlay.get_instance().take_written_switches(state['agent_run_id'])
 
-        response = self.model.invoke(messages)
+        if written_switches:
+            self.network_state_broker.record_writes(state['agent_run_id'], written_switches)
 
-        return {'messages': [response]}
+        return result
 
     def needs_action(self, state: AgentState):
         """Check if any actions are needed"""
@@ -125,27 +272,47 @@ class IntentProcessor:
     def save_intent(self, state: AgentState):
         """ Register processed intent into processed_intents_db"""
 
-        def get_tool_calls(message) -> dict:
-            for tool in message.tool_calls:
-                return {tool['name']: tool['args']}
-
         agent_messages = [message for message in state['messages'] if
                           isinstance(message, AIMessage) and len(message.tool_calls)]
 
-        operations = list(map(get_tool_calls, agent_messages))
+        # every call of every turn, in the order the model made them
+        operations = [{tool['name']: tool['args']} for message in agent_messages for tool in message.tool_calls]
 
         self.processed_intents_db_conn.save_intent(agent_run=state['agent_run_id'],
-                                                   username=self.username,
+                                                   username=state.get('username') or self.username,
                                                    intent=state['messages'][0].content,
                                                    timestamp=datetime.now(),
                                                    called_tools=operations,
-                                                   model = self.model_name)
+                                                   model = self.model_name,
+                                                   cookie=run_cookie(state['agent_run_id']),
+                                                   cookie_mask=RUN_COOKIE_MASK)
 
-        self.network_state_broker.terminate_agent_run(state['agent_run_id'])
+        logger.info(f"Agent run {state['agent_run_id']} token usage: {state.get('token_usage') or {}}")
 
-        # return {'save_intent': processed_intent, 'operations': operations}
+        return {'operations': operations}
 
 def change_model(self, model):
     """Change the language model used by IntentProcessor"""
     chosen_model = self.model_factory.get_model(model)
     self.model = chosen_model.bind_tools(self.tool_list, tool_choice="auto")
+
+
+def token_usage_of(response: AIMessage) -> dict:
+    """
+    Returns the tokens used by a model call as reported by the provider, including the input tokens read from
+    and written to its prompt cache. Empty if the provider did not report its usage.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+
+    if not usage:
+        return {}
+
+    input_token_details = usage.get('input_token_details') or {}
+
+    return {
+        'calls': 1,
+        'input_tokens': usage.get('input_tokens', 0),
+        'output_tokens': usage.get('output_tokens', 0),
+        'cache_read_tokens': input_token_details.get('cache_read') or 0,
+        'cache_creation_tokens': input_token_details.get('cache_creation') or 0
+    }
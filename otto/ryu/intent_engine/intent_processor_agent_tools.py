@@ -1,30 +1,55 @@
 from typing import Annotated, Optional
 
-import networkx as nx
-import requests
 from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
 
+from otto.intent_utils.network_state_encoder import (FLOW_FIELDS, GROUP_FIELDS, HOST_FIELDS, encode_table,
+                                                     encode_value, flow_rows, group_rows, host_rows)
+from otto.ryu.intent_engine.flow_batch import BATCH_OPERATIONS, apply_operations, create_request
+from otto.ryu.intent_engine.flow_verification import verify_flows as verify_expected_flows
+from otto.ryu.intent_engine.path_index import PathIndex
+from otto.ryu.intent_engine.run_cookie import cookie_filter, find_run_flows, rollback_run, run_cookie
+from otto.ryu.intent_engine.run_state_overlay import RunStateOverlay
 from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.network_state_format import OFPTT_ALL, format_match
+from otto.ryu.ryu_transport import RyuTransport
 
 
 @tool
-def check_switch(switch_id: str) -> dict:
+def check_switch(switch_id: str, confirmed: bool = False,
+                 network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                 agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> dict:
     """
-    Function to check the current configuration of a current switch.
+    Function to check the current configuration of a current switch. The configuration includes every change
+    made to the switch during this intent fulfilment operation.
     Args:
         switch_id: ID of the switch (in decimal)
+        confirmed: Optional -> re-read the flows and groups of the switch from the controller, e.g. when the
+        switch was changed outside of this intent fulfilment operation
     """
+    try:
+        dpid, _ = find_switch(network_state, switch_id)
+    except (TypeError, StopIteration, ValueError):
+        # not in the network state of the agent run (or called outside of one)
+        return NetworkStateFinder().get_switch_details(switch_id)
 
-    nw_state_finder = NetworkStateFinder()
-    return nw_state_finder.get_switch_details(switch_id)
+    run_state_overlay = RunStateOverlay.get_instance()
+
+    if confirmed:
+        nw_state_finder = NetworkStateFinder()
+        decimal_switch_id = str(int(dpid, 16))
+
+        return run_state_overlay.confirm_switch(agent_run_id, network_state, dpid,
+                                                nw_state_finder.get_installed_flows(decimal_switch_id),
+                                                nw_state_finder.get_installed_groups(decimal_switch_id))
+
+    return run_state_overlay.view_switch(agent_run_id, network_state, dpid)
 
 
 @tool
 def get_path_between_nodes(source: str,
                            destination: str,
-                           network_graph: Annotated[nx.Graph, InjectedState("network_graph")],
-                           switch_port_mappings: Annotated[dict, InjectedState("switch_port_mappings")],
+                           path_index: Annotated[PathIndex, InjectedState("path_index")],
                            ) -> list[tuple[str, str]]:
     """
     Function to get a path between nodes in the network. The nodes can either be a switch or a host.
@@ -45,18 +70,155 @@ def get_path_between_nodes(source: str,
     Switch3 is connected to host3 via port 3 (eth3)
     """
 
-    shortest_path = nx.shortest_path(network_graph, source, destination)
+    return path_index.port_path(source, destination)
+
 
-    full_path = []
+@tool
+def get_alternative_paths(source: str,
+                          destination: str,
+                          path_index: Annotated[PathIndex, InjectedState("path_index")],
+                          count: int = 3,
+                          equal_cost_only: bool = False) -> list[list[tuple[str, str]]]:
+    """
+    Function to get several paths between two nodes in the network, from the shortest to the longest, e.g. to
+    find a backup path or to spread traffic over several paths. Each path is given in the same format as
+    the get_path_between_nodes tool.
+    Args:
+        source: source of the paths, a switch (16 HEX DPID) or a host
+        destination: destination of the paths, a switch (16 HEX DPID) or a host
+        count: maximum number of paths to return
+        equal_cost_only: only return the paths which are as short as the shortest path
+    """
+    paths = path_index.equal_cost_paths(source, destination, count) if equal_cost_only else \
+        path_index.k_shortest_paths(source, destination, count)
+
+    return [path_index.expand_ports(path) for path in paths]
+
+
+def record_change(api: str, data: dict, status_code: int, network_state: Optional[dict],
+                  agent_run_id: Optional[str]) -> None:
+    """Applies a change accepted by Ryu to the view of the agent run which check_switch is served from"""
+    if status_code == 200 and network_state and agent_run_id:
+        RunStateOverlay.get_instance().record_change(agent_run_id, network_state, api, data)
+
+
+def find_switch(network_state: dict, switch_id: str) -> tuple[str, dict]:
+    """
+    Returns the DPID and the information of a switch in the network state of an agent run. The switch can be
+    given by its ID in decimal or its 16 HEX DPID. Raises a ValueError if the switch is not in the network state.
+    """
+    network_elements = network_state[next(iter(network_state))]
+    switch_id = str(switch_id).strip()
 
-    for i in range(len(shortest_path) - 1):
-        full_path.append(switch_port_mappings[(shortest_path[i], shortest_path[i + 1])])
+    candidate_dpids = [switch_id.lower()] if len(switch_id) == 16 else []
 
-    return full_path
+    if switch_id.isdigit():
+        candidate_dpids.append(format(int(switch_id), '016x'))
+
+    for dpid in candidate_dpids:
+        if dpid in network_elements:
+            return dpid, network_elements[dpid]
+
+    raise ValueError(f"Switch {switch_id} is not in the network state")
+
+
+def find_run_switch(network_state: dict, agent_run_id: Optional[str], switch_id: str) -> tuple[str, dict]:
+    """Returns the DPID and the information of a switch as seen by an agent run, see find_switch"""
+    dpid, switch_info = find_switch(network_state, switch_id)
+
+    if agent_run_id is None:
+        return dpid, switch_info
+
+    return dpid, RunStateOverlay.get_instance().view_switch(agent_run_id, network_state, dpid)
+
+
+@tool
+def list_hosts(network_state: Annotated[dict, InjectedState("network_state")]) -> str:
+    """
+    Function to list every host in the network, along with the switch and switch port it is connected to,
+    its MAC address and its IPv4 and IPv6 addresses. Answered from the network state collected at the
+    start of the intent fulfilment operation.
+    """
+    network_elements = network_state[next(iter(network_state))]
+
+    rows = [[switch] + row for switch, switch_info in sorted(network_elements.items())
+            for row in host_rows(switch_info.get("connectedHosts"))]
+
+    return "\n".join(encode_table("hosts", ["switch"] + HOST_FIELDS, rows)) or "No hosts found"
 
 
 @tool
-def add_rule(switch_id: str, table_id: int, match: dict, actions: list, priority: int = 32768) -> int:
+def find_host(address: str, network_state: Annotated[dict, InjectedState("network_state")]) -> str:
+    """
+    Function to find the host using an IP or MAC address, and the switch and switch port it is connected to.
+    Args:
+        address: IPv4, IPv6 or MAC address of the host
+    """
+    network_elements = network_state[next(iter(network_state))]
+    address = address.strip().lower()
+
+    rows = [[switch, switch_port, host.get("id"), host.get("mac"), host.get("ipv4"), host.get("ipv6")]
+            for switch, switch_info in sorted(network_elements.items())
+            for switch_port, host in sorted((switch_info.get("connectedHosts") or {}).items())
+            if address == str(host.get("mac", "")).lower() or
+            address in [str(host_address).lower() for host_address in
+                        (host.get("ipv4") or []) + (host.get("ipv6") or [])]]
+
+    return "\n".join(encode_table("hosts", ["switch"] + HOST_FIELDS, rows)) or f"No host found with address {address}"
+
+
+@tool
+def get_flows(switch_id: str, network_state: Annotated[dict, InjectedState("network_state")],
+              table_id: Optional[int] = None, match: Optional[dict] = None,
+              agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> str:
+    """
+    Function to get the flows installed on a switch, answered from the network state collected at the
+    start of the intent fulfilment operation and the changes made since by this operation. Use check_switch
+    with confirmed set to see flows changed by anything else.
+    Args:
+        switch_id: ID of the switch (in decimal)
+        table_id: Optional -> only return the flows of this table
+        match: Optional -> only return the flows whose match criteria contain all of these fields
+        and values, e.g. {"dl_type": 2048, "nw_dst": "10.0.0.2"}. The flows are stored with the names
+        the controller reports (dl_type, nw_dst, tp_dst, ...), OpenFlow 1.3 names such as ipv4_dst are
+        accepted as well.
+    """
+    dpid, switch_info = find_run_switch(network_state, agent_run_id, switch_id)
+
+    match = format_match(match or {})
+
+    installed_flows = {
+        flow_hash: flow for flow_hash, flow in (switch_info.get("installedFlows") or {}).items()
+        if (table_id is None or flow.get("table_id") == table_id) and
+           all(encode_value(format_match(flow.get("match", {})).get(field)) == encode_value(value)
+               for field, value in match.items())
+    }
+
+    return "\n".join([f"switch {dpid}"] + encode_table("flows", FLOW_FIELDS, flow_rows(installed_flows))) \
+        if installed_flows else f"No matching flows found on switch {dpid}"
+
+
+@tool
+def get_groups(switch_id: str, network_state: Annotated[dict, InjectedState("network_state")],
+               agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> str:
+    """
+    Function to get the groups installed on a switch, answered from the network state collected at the
+    start of the intent fulfilment operation and the changes made since by this operation.
+    Args:
+        switch_id: ID of the switch (in decimal)
+    """
+    dpid, switch_info = find_run_switch(network_state, agent_run_id, switch_id)
+
+    rows = group_rows(switch_info.get("installedGroups"))
+
+    return "\n".join([f"switch {dpid}"] + encode_table("groups", GROUP_FIELDS, rows)) \
+        if rows else f"No groups found on switch {dpid}"
+
+
+@tool
+def add_rule(switch_id: str, table_id: int, match: dict, actions: list, priority: int = 32768,
+             network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+             agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to add an OpenFlow rule to a switch.
     Args:
@@ -73,26 +235,25 @@ def add_rule(switch_id: str, table_id: int, match: dict, actions: list, priority
     "actions":[{"type":"OUTPUT", "port": 2}]
     """
 
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
         "dpid": switch_id,
-        "cookie": 0,
+        "cookie": run_cookie(agent_run_id),
         "table_id": table_id,
         "priority": priority,
         "match": match,
         "actions": actions
     }
 
-    resp = requests.post('http://localhost:8080/stats/flowentry/add', headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/flowentry/add", json=data)
+    record_change("/stats/flowentry/add", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
 @tool
-def delete_rule_strict(switch_id: str, table_id: int, match: dict, actions: list, priority: int) -> int:
+def delete_rule_strict(switch_id: str, table_id: int, match: dict, actions: list, priority: int,
+                       network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                       agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to remove a specific OpenFlow rule on a switch.
     Args:
@@ -108,26 +269,25 @@ def delete_rule_strict(switch_id: str, table_id: int, match: dict, actions: list
     the switch.
     """
 
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
         "dpid": switch_id,
-        "cookie": 0,
+        "cookie": run_cookie(agent_run_id),
         "table_id": table_id,
         "priority": priority,
         "match": match,
         "actions": actions
     }
 
-    resp = requests.post('http://localhost:8080/stats/flowentry/delete_strict', headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/flowentry/delete_strict", json=data)
+    record_change("/stats/flowentry/delete_strict", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
 @tool
-def modify_rule_strict(switch_id: str, table_id: int, match: dict, actions: list, priority: int) -> int:
+def modify_rule_strict(switch_id: str, table_id: int, match: dict, actions: list, priority: int,
+                       network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                       agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to modify a specific OpenFlow rule on a switch.
     Args:
@@ -143,27 +303,26 @@ def modify_rule_strict(switch_id: str, table_id: int, match: dict, actions: list
     should be an empty list, but if it is to output on a port, use the format:
     "actions":[{"type":"OUTPUT", "port": 2}]
     """
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
         "dpid": switch_id,
-        "cookie": 0,
+        "cookie": run_cookie(agent_run_id),
         "table_id": table_id,
         "priority": priority,
         "match": match,
         "actions": actions
     }
 
-    resp = requests.post('http://localhost:8080/stats/flowentry/modify_strict', headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/flowentry/modify_strict", json=data)
+    record_change("/stats/flowentry/modify_strict", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
 @tool
 def modify_all_matching_rules(switch_id: str, table_id: Optional[int] = None, match: Optional[dict] = None,
-                              actions: Optional[list] = None, priority: Optional[int] = None) -> int:
+                              actions: Optional[list] = None, priority: Optional[int] = None,
+                              network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                              agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to modify all matching rules based on the inputted arguments on a switch.
     Args:
@@ -179,13 +338,9 @@ def modify_all_matching_rules(switch_id: str, table_id: Optional[int] = None, ma
     should be an empty list, but if it is to output on a port, use the format:
     "actions":[{"type":"OUTPUT", "port": 2}]
     """
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
         "dpid": switch_id,
-        "cookie": 0,
+        "cookie": run_cookie(agent_run_id),
         "table_id": table_id,
         "priority": priority,
         "match": match,
@@ -194,14 +349,16 @@ def modify_all_matching_rules(switch_id: str, table_id: Optional[int] = None, ma
 
     data = {k: v for k, v in data.items() if v is not None}  # clean
 
-    resp = requests.post('http://localhost:8080/stats/flowentry/modify_strict', headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/flowentry/modify_strict", json=data)
+    record_change("/stats/flowentry/modify_strict", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
 @tool
-def add_group_entry(switch_id: int, bucket_type: str, group_id: int,
-                    buckets: list[dict]) -> int:
+def add_group_entry(switch_id: int, bucket_type: str, group_id: int, buckets: list[dict],
+                    network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                    agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to add an OpenFlow group to a switch.
     Args:
@@ -247,10 +404,6 @@ def add_group_entry(switch_id: int, bucket_type: str, group_id: int,
 
     # definitions for the OpenFlow groups taken from:
     # https://floodlight.atlassian.net/wiki/spaces/floodlightcontroller/pages/7995427/How+to+Work+with+Fast-Failover+OpenFlow+Groups
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
 
         "dpid": switch_id,
@@ -259,14 +412,17 @@ def add_group_entry(switch_id: int, bucket_type: str, group_id: int,
         "buckets": buckets
     }
 
-    resp = requests.post("http://localhost:8080/stats/groupentry/add", headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/groupentry/add", json=data)
+    record_change("/stats/groupentry/add", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
 @tool
 def modify_group_entry(switch_id: int, group_id: int, bucket_type: Optional[str] = None,
-                       buckets: Optional[list[dict]] = None) -> int:
+                       buckets: Optional[list[dict]] = None,
+                       network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                       agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to modify an existing group entry on a switch.
     Args:
@@ -275,10 +431,6 @@ def modify_group_entry(switch_id: int, group_id: int, bucket_type: Optional[str]
         group_id: ID of the group
         buckets: Optional -> New bucket values for the group
     """
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
         "dpid": switch_id,
         "type": bucket_type,
@@ -288,35 +440,167 @@ def modify_group_entry(switch_id: int, group_id: int, bucket_type: Optional[str]
 
     data = {k: v for k, v in data.items() if v is not None}  # clean
 
-    resp = requests.post("http://localhost:8080/stats/groupentry/add", headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/groupentry/add", json=data)
+    record_change("/stats/groupentry/add", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
 @tool
-def delete_group_entry(switch_id: int, group_id: int) -> int:
+def delete_group_entry(switch_id: int, group_id: int,
+                       network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                       agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> int:
     """
     Function to delete a group entry on a switch.
     Args:
         switch_id: ID of the switch (in decimal),
         group_id: ID for the group to be deleted
     """
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     data = {
         "dpid": switch_id,
         "group_id": group_id,
     }
 
-    resp = requests.post("http://localhost:8080/stats/groupentry/delete", headers=headers, json=data)
+    resp = RyuTransport.get_instance().post("/stats/groupentry/delete", json=data)
+    record_change("/stats/groupentry/delete", data, resp.status_code, network_state, agent_run_id)
 
     return resp.status_code
 
 
+@tool
+def apply_flow_batch(operations: list[dict], network_state: Annotated[dict, InjectedState("network_state")],
+                     agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> str:
+    """
+    Function to apply many flow and group operations, across any number of switches, in one call. Use it instead
+    of calling add_rule, delete_rule_strict, modify_rule_strict or the group functions once per rule, e.g. to
+    install the forward and reverse rules on every switch of a path. All operations are validated first: if any
+    is invalid, none is applied. The operations of a switch are applied in the order given.
+    Args:
+        operations: list of operations, each a dictionary with an "operation" key, the "switch_id" of the switch
+        (in decimal), and the arguments of the operation:
+            add_rule: table_id, match, actions, priority (optional)
+            delete_rule_strict / modify_rule_strict: table_id, match, actions, priority
+            add_group: group_id, bucket_type, buckets
+            modify_group: group_id, bucket_type (optional), buckets (optional)
+            delete_group: group_id
+        These arguments follow the same format as in add_rule and add_group_entry, e.g.
+        {"operation": "add_rule", "switch_id": "1", "table_id": 0, "priority": 100,
+         "match": {"dl_type": 2048, "nw_dst": "10.0.0.2"}, "actions": [{"type": "OUTPUT", "port": 2}]}
+
+    Returns a table with the status of every operation, in the order given: the HTTP status code returned by
+    the controller, why the operation is invalid, or "skipped" when an earlier operation on the same switch failed.
+    """
+    if not operations:
+        return "No operations given"
+
+    state_id = next(iter(network_state), None)
+    cookie = run_cookie(agent_run_id)
+    results = apply_operations(operations, network_state.get(state_id) or {}, cookie=cookie)
+
+    for operation, result in zip(operations, results):
+        api = BATCH_OPERATIONS[result["operation"]][0] if result["status"] == 200 else None
+
+        if api is not None:
+            record_change(api, create_request(operation, result["switch"], cookie), 200, network_state, agent_run_id)
+
+    applied = sum(result["status"] == 200 for result in results)
+    rows = [[index, result["operation"], result["switch"], result["status"]] for index, result in enumerate(results)]
+
+    return "\n".join([f"{applied} of {len(results)} operations applied"] +
+                     encode_table("operations", ["#", "operation", "switch", "status"], rows))
+
+
+@tool
+def verify_flows(flows: list[dict]) -> str:
+    """
+    Function to verify that flows are installed on the switches exactly as expected, without reading every
+    flow of the switches. Use it after adding, modifying or deleting flows, with the flows just changed.
+    Args:
+        flows: list of the expected flows, each a dictionary with the "switch_id" of the switch (in decimal),
+        table_id, priority, match and actions, in the same format as in add_rule, e.g.
+        {"switch_id": "1", "table_id": 0, "priority": 100,
+         "match": {"dl_type": 2048, "nw_dst": "10.0.0.2"}, "actions": [{"type": "OUTPUT", "port": 2}]}
+        Set "absent" to true on a flow which must no longer be installed. The operations given to
+        apply_flow_batch can be passed as they are.
+
+    Returns a table with the status of every flow, in the order given: "pass", "missing",
+    "actions differ: <installed actions>", or "still installed" for a flow which must no longer be installed.
+    """
+    if not flows:
+        return "No flows given"
+
+    results = verify_expected_flows(flows)
+
+    verified = sum(result["status"] == "pass" for result in results)
+    rows = [[index, result["switch"], result["priority"], result["match"], result["status"]]
+            for index, result in enumerate(results)]
+
+    return "\n".join([f"{verified} of {len(results)} flows verified"] +
+                     encode_table("verification", ["#", "switch", "priority", "match", "status"], rows))
+
+
+def run_switch_ids(network_state: Optional[dict]) -> Optional[list[str]]:
+    """Returns the IDs (in decimal) of the switches of the network state of an agent run, None outside of one"""
+    if not network_state:
+        return None
+
+    return [str(int(dpid, 16)) for dpid in network_state[next(iter(network_state))]]
+
+
+@tool
+def get_run_flows(network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                  agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> str:
+    """
+    Function to list every flow installed during this intent fulfilment operation, on every switch. The flows
+    are found on the controller by the cookie stamped on them when they were added.
+    """
+    if agent_run_id is None:
+        return "No intent fulfilment operation in progress"
+
+    run_flows = find_run_flows(run_cookie(agent_run_id), run_switch_ids(network_state))
+
+    lines = [f"{sum(len(flows) for flows in run_flows.values())} flows installed during this operation"]
+
+    for switch_id, flows in run_flows.items():
+        lines.append(f"switch {format(int(switch_id), '016x')}")
+        lines.extend(encode_table("flows", FLOW_FIELDS, flow_rows(flows)))
+
+    return "\n".join(lines)
+
+
+@tool
+def rollback_run_flows(network_state: Annotated[Optional[dict], InjectedState("network_state")] = None,
+                       agent_run_id: Annotated[Optional[str], InjectedState("agent_run_id")] = None) -> str:
+    """
+    Function to delete every flow added during this intent fulfilment operation, on every switch, with a
+    single call per switch. Use it to undo the operation instead of deleting its flows one by one.
+    Flows which existed before the operation and were modified by it, and groups, are not rolled back.
+    """
+    if agent_run_id is None:
+        return "No intent fulfilment operation in progress"
+
+    cookie = run_cookie(agent_run_id)
+    statuses = rollback_run(cookie, run_switch_ids(network_state))
+
+    for switch_id, status_code in statuses.items():
+        record_change("/stats/flowentry/delete", {"dpid": switch_id, "table_id": OFPTT_ALL, **cookie_filter(cookie)},
+                      status_code, network_state, agent_run_id)
+
+    rolled_back = sum(status_code == 200 for status_code in statuses.values())
+    rows = [[format(int(switch_id), '016x'), status_code] for switch_id, status_code in statuses.items()]
+
+    return "\n".join([f"Flows rolled back on {rolled_back} of {len(statuses)} switches"] +
+                     encode_table("rollback", ["switch", "status"], rows))
+
+
+def create_read_tool_list() -> list:
+    """Returns the tools which read the network state of the agent run, without calling the controller"""
+    return [list_hosts, find_host, get_flows, get_groups]
+
+
 def create_tool_list(extra_funcs=None) -> list:
     return [add_rule, delete_rule_strict,
             modify_rule_strict, modify_all_matching_rules,
-            check_switch, get_path_between_nodes,
-            add_group_entry, modify_group_entry, delete_group_entry]
+            check_switch, get_path_between_nodes, get_alternative_paths,
+            add_group_entry, modify_group_entry, delete_group_entry, apply_flow_batch, verify_flows,
+            get_run_flows, rollback_run_flows]
@@ -0,0 +1,112 @@
+import os
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Iterator, Optional
+
+from otto.intent_utils.agent_prompt import intent_processor_prompt
+from otto.intent_utils.model_factory import ModelFactory
+from otto.otto_logger.logger_config import logger
+from otto.ryu.intent_engine.intent_processor_agent import IntentProcessor
+from otto.ryu.intent_engine.intent_processor_agent_tools import create_tool_list
+
+
+def create_intent_processor(model: str) -> IntentProcessor:
+    """Builds an IntentProcessor for the given model, with the default tools and system prompt"""
+    chosen_model = ModelFactory.get_model(model)
+
+    if chosen_model is None:
+        raise ValueError(f"Model {model} cannot be used with Otto.")
+
+    return IntentProcessor(chosen_model, create_tool_list(), intent_processor_prompt)
+
+
+class IntentProcessorPool:
+    """
+    Object pool of IntentProcessors, keyed by model. Building an IntentProcessor creates a model client,
+    binds the tools, compiles the LangGraph graph and opens a database session, so processors are checked
+    out for one intent and returned to the pool afterwards instead of being built for every request.
+
+    The user declaring an intent is passed in the state of each graph invocation, so a processor can serve
+    any user. A pool is never shared across processes: when used after a fork (e.g. in a Gunicorn worker),
+    the processors inherited from the parent are dropped and new ones are built in the worker.
+
+    Args:
+        models: models to build processors for when the pool is created. Processors for other models
+        are built on their first checkout.
+        pool_size: number of processors kept in the pool, split evenly between the models. Defaults to
+        one processor per model.
+        processor_factory: function building an IntentProcessor for a model
+    """
+
+    def __init__(self, models: Optional[list[str]] = None, pool_size: Optional[int] = None,
+                 processor_factory: Callable[[str], IntentProcessor] = create_intent_processor):
+        self.models = models or []
+        self.pool_size = pool_size
+
+        self._processor_factory = processor_factory
+        self._idle_processors: dict[str, list[IntentProcessor]] = {}
+        self._lock = Lock()
+        self._owner_pid = os.getpid()
+
+    @property
+    def processors_per_model(self) -> int:
+        if not self.pool_size:
+            return 1
+
+        return max(1, self.pool_size // max(1, len(self.models)))
+
+    def create_pool(self) -> None:
+        """Builds the processors of every model in the pool, up to processors_per_model each"""
+        for model in self.models:
+            missing_processors = self.processors_per_model - self.idle_count(model)
+
+            for _ in range(max(0, missing_processors)):
+                self.checkin(model, self._processor_factory(model))
+
+        logger.debug(f"IntentProcessorPool created in process {os.getpid()} for models {self.models}")
+
+    def idle_count(self, model: str) -> int:
+        """Returns the number of processors of a model waiting in the pool"""
+        with self._lock:
+            self._drop_inherited_processors()
+
+            return len(self._idle_processors.get(model, []))
+
+    def checkout(self, model: str) -> IntentProcessor:
+        """
+        Takes a processor for the model out of the pool. A new processor is built if none is idle,
+        so a checkout never waits for another request to complete.
+        """
+        with self._lock:
+            self._drop_inherited_processors()
+
+            idle_processors = self._idle_processors.get(model)
+
+            if idle_processors:
+                return idle_processors.pop()
+
+        return self._processor_factory(model)
+
+    def checkin(self, model: str, processor: IntentProcessor) -> None:
+        """Returns a processor to the pool. Processors beyond the size of the pool are discarded."""
+        with self._lock:
+            self._drop_inherited_processors()
+
+            idle_processors = self._idle_processors.setdefault(model, [])
+
+            if len(idle_processors) < self.processors_per_model:
+                idle_processors.append(processor)
+
+    @contextmanager
+    def processor(self, model: str) -> Iterator[IntentProcessor]:
+        """Checks out a processor for the duration of a with block, e.g. with pool.processor("gpt-4o") as p:"""
+        processor = self.checkout(model)
+
+        try:
+            yield processor
+        finally:
+            self.checkin(model, processor)
+
+    def _drop_inherited_processors(self) -> None:
+        if self._owner_pid != os.getpid():
+            self._idle_processors, self._owner_pid = {}, os.getpid()
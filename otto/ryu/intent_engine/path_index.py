@@ -0,0 +1,351 @@
+import heapq
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Iterable, Mapping, Optional, Sequence
+
+import networkx as nx
+
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components, shortest_path
+except ImportError:
+    np = csr_matrix = connected_components = shortest_path = None
+
+DEFAULT_ALTERNATIVE_PATHS = 3
+MAX_PATH_SEARCH_EXPANSIONS = 10000
+DEFAULT_CACHED_DESTINATIONS = 1024
+
+
+class PathIndex(ABC):
+    """
+    Precomputed paths between the nodes of a topology, so finding a path is a lookup instead of a graph search.
+
+    For every destination switch, the index holds the distance of every other switch to it and the next hops on
+    all the shortest paths towards it (its next-hop table). Hosts are reached through the switch they are
+    connected to. Paths are expanded into the ports they go through with switch_port_mappings, and the expanded
+    paths are kept, so asking for the same path again is a dictionary lookup. Equal-cost and k-shortest
+    alternatives are found by walking the same tables.
+
+    How the tables are stored and computed is left to the backends: NetworkxPathIndex and SparsePathIndex.
+
+    Args:
+        switch_port_mappings: {(node, node): (port, port)} interfaces used to connect two nodes
+        host_switches: {host ID: DPID of the switch the host is connected to}
+    """
+
+    def __init__(self, switch_port_mappings: Mapping, host_switches: dict[str, str]):
+        self._switch_port_mappings = switch_port_mappings
+        self._host_switches = host_switches
+
+        self._switch_hosts: dict[str, list[str]] = {}
+
+        for host, switch in sorted(host_switches.items()):
+            self._switch_hosts.setdefault(switch, []).append(host)
+
+        self._port_paths: dict[tuple[str, str], list[tuple[str, str]]] = {}
+        self._port_paths_lock = Lock()
+
+    @abstractmethod
+    def _has_switch(self, switch: str) -> bool:
+        """Returns whether a switch is in the topology"""
+        pass
+
+    @abstractmethod
+    def _switch_neighbours(self, switch: str) -> Sequence[str]:
+        """Returns the switches linked to a switch"""
+        pass
+
+    @abstractmethod
+    def _switch_distance(self, switch: str, destination_switch: str) -> Optional[int]:
+        """Returns the number of links between two switches, or None if there is no path between them"""
+        pass
+
+    @abstractmethod
+    def _next_hops(self, switch: str, destination_switch: str) -> Sequence[str]:
+        """Returns the neighbours of a switch which are on a shortest path towards the destination switch"""
+        pass
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._host_switches or self._has_switch(node)
+
+    def _switch_of(self, node: str) -> str:
+        if node in self._host_switches:
+            return self._host_switches[node]
+
+        if self._has_switch(node):
+            return node
+
+        raise nx.NodeNotFound(f"Node {node} is not in the network")
+
+    def _host_links(self, source: str, destination: str) -> tuple[list[str], list[str]]:
+        """Returns the nodes to add before and after a path between switches when its ends are hosts"""
+        return [source] if source in self._host_switches else [], \
+            [destination] if destination in self._host_switches else []
+
+    def neighbours(self, node: str) -> list[str]:
+        """Returns the switches and hosts linked to a node"""
+        if node in self._host_switches:
+            return [self._host_switches[node]]
+
+        return list(self._switch_neighbours(self._switch_of(node))) + self._switch_hosts.get(node, [])
+
+    def is_reachable(self, source: str, destination: str) -> bool:
+        """Returns whether there is a path between two nodes"""
+        return self._switch_distance(self._switch_of(source), self._switch_of(destination)) is not None
+
+    def distance(self, source: str, destination: str) -> int:
+        """Returns the number of links on the shortest path between two nodes"""
+        source_switch, destination_switch = self._switch_of(source), self._switch_of(destination)
+
+        if source == destination:
+            return 0
+
+        switch_distance = self._switch_distance(source_switch, destination_switch)
+
+        if switch_distance is None:
+            raise nx.NetworkXNoPath(f"No path between {source} and {destination}")
+
+        return switch_distance + (source != source_switch) + (destination != destination_switch)
+
+    def shortest_path(self, source: str, destination: str) -> list[str]:
+        """Returns the nodes on a shortest path between two nodes, following the first next hop of every switch"""
+        if self.distance(source, destination) == 0:
+            return [source]
+
+        destination_switch, switch = self._switch_of(destination), self._switch_of(source)
+        head, tail = self._host_links(source, destination)
+
+        path = [switch]
+
+        while switch != destination_switch:
+            switch = self._next_hops(switch, destination_switch)[0]
+            path.append(switch)
+
+        return head + path + tail
+
+    def port_path(self, source: str, destination: str) -> list[tuple[str, str]]:
+        """
+        Returns the ports on the shortest path between two nodes as a list of (port, port) tuples, e.g.
+        [('host-1-1', 's1-eth1'), ('s1-eth3', 's5-eth1'), ('s5-eth3', 's3-eth1'), ('s3-eth3', 'host-3-1')]
+        """
+        port_path = self._port_paths.get((source, destination))
+
+        if port_path is None:
+            port_path = self.expand_ports(self.shortest_path(source, destination))
+
+            with self._port_paths_lock:
+                self._port_paths[(source, destination)] = port_path
+
+        return list(port_path)
+
+    def expand_ports(self, path: list[str]) -> list[tuple[str, str]]:
+        """Returns the (port, port) tuples connecting every two consecutive nodes of a path"""
+        return [self._switch_port_mappings[(path[i], path[i + 1])] for i in range(len(path) - 1)]
+
+    def equal_cost_paths(self, source: str, destination: str,
+                         limit: int = DEFAULT_ALTERNATIVE_PATHS) -> list[list[str]]:
+        """Returns up to limit shortest paths between two nodes, all of the same length"""
+        if self.distance(source, destination) == 0:
+            return [[source]]
+
+        destination_switch = self._switch_of(destination)
+        head, tail = self._host_links(source, destination)
+
+        paths, pending = [], [[self._switch_of(source)]]
+
+        while pending and len(paths) < limit:
+            path = pending.pop()
+
+            if path[-1] == destination_switch:
+                paths.append(head + path + tail)
+                continue
+
+            pending.extend(path + [next_hop] for next_hop in reversed(self._next_hops(path[-1], destination_switch)))
+
+        return paths
+
+    def k_shortest_paths(self, source: str, destination: str,
+                         k: int = DEFAULT_ALTERNATIVE_PATHS) -> list[list[str]]:
+        """
+        Returns up to k loop-free paths between two nodes, from the shortest to the longest. Paths are searched
+        best first, using the distances of the index to always extend the path which can end up the shortest.
+        """
+        if self.distance(source, destination) == 0:
+            return [[source]]
+
+        source_switch, destination_switch = self._switch_of(source), self._switch_of(destination)
+        head, tail = self._host_links(source, destination)
+
+        paths, expansions = [], 0
+        pending = [(self._switch_distance(source_switch, destination_switch), (source_switch,))]
+
+        while pending and len(paths) < k and expansions < MAX_PATH_SEARCH_EXPANSIONS:
+            _, path = heapq.heappop(pending)
+            expansions += 1
+
+            if path[-1] == destination_switch:
+                paths.append(head + list(path) + tail)
+                continue
+
+            for neighbour in self._switch_neighbours(path[-1]):
+                remaining_distance = self._switch_distance(neighbour, destination_switch)
+
+                if remaining_distance is not None and neighbour not in path:
+                    heapq.heappush(pending, (len(path) + remaining_distance, path + (neighbour,)))
+
+        return paths
+
+
+class NetworkxPathIndex(PathIndex):
+    """
+    PathIndex built from a networkx graph. A breadth first search from every switch fills in all the distance
+    and next-hop tables when the index is created, as dictionaries. Suited to fabrics of up to a few hundred
+    switches, see SparsePathIndex for larger ones.
+
+    Args:
+        network_graph: links between hosts and switches
+    """
+
+    def __init__(self, network_graph: nx.Graph, switch_port_mappings: Mapping, host_switches: dict[str, str]):
+        super().__init__(switch_port_mappings, host_switches)
+
+        self._neighbours = {
+            node: tuple(sorted(neighbour for neighbour in network_graph.neighbors(node)
+                               if neighbour not in host_switches))
+            for node in network_graph.nodes if node not in host_switches
+        }
+
+        self._distances: dict[str, dict[str, int]] = {}
+        self._next_hop_tables: dict[str, dict[str, tuple[str, ...]]] = {}
+
+        for destination in self._neighbours:
+            self._distances[destination], self._next_hop_tables[destination] = self._search_from(destination)
+
+    def _search_from(self, destination: str) -> tuple[dict[str, int], dict[str, tuple[str, ...]]]:
+        """Breadth first search from a switch, returning the distances and next hops of every switch towards it"""
+        distances, next_hops = {destination: 0}, {destination: []}
+        queue = deque([destination])
+
+        while queue:
+            node = queue.popleft()
+
+            for neighbour in self._neighbours[node]:
+                if neighbour not in distances:
+                    distances[neighbour] = distances[node] + 1
+                    next_hops[neighbour] = [node]
+                    queue.append(neighbour)
+
+                elif distances[neighbour] == distances[node] + 1:
+                    next_hops[neighbour].append(node)
+
+        return distances, {node: tuple(hops) for node, hops in next_hops.items()}
+
+    def _has_switch(self, switch: str) -> bool:
+        return switch in self._neighbours
+
+    def _switch_neighbours(self, switch: str) -> Sequence[str]:
+        return self._neighbours[switch]
+
+    def _switch_distance(self, switch: str, destination_switch: str) -> Optional[int]:
+        return self._distances[destination_switch].get(switch)
+
+    def _next_hops(self, switch: str, destination_switch: str) -> Sequence[str]:
+        return self._next_hop_tables[destination_switch][switch]
+
+
+class SparsePathIndex(PathIndex):
+    """
+    PathIndex backed by a SciPy CSR adjacency matrix of the switches, which are given integer IDs in DPID
+    order. Suited to fabrics of thousands of switches, where holding the tables of every destination would
+    not fit in memory: the distances towards a destination are computed by a breadth first search in
+    scipy.sparse.csgraph the first time a path to it is asked for, and the tables of the max_destinations
+    most recently used destinations are kept. Next hops are read from the distances with vectorised lookups
+    of the neighbours of a switch in the CSR matrix. Reachability is answered from the connected components
+    of the matrix, computed once.
+
+    Args:
+        switch_links: {switch DPID: DPIDs of the switches linked to it}
+        max_destinations: number of destinations whose distance tables are kept
+    """
+
+    def __init__(self, switch_links: Mapping[str, Iterable[str]], switch_port_mappings: Mapping,
+                 host_switches: dict[str, str], max_destinations: int = DEFAULT_CACHED_DESTINATIONS):
+        if csr_matrix is None:
+            raise ImportError("SparsePathIndex requires scipy and numpy")
+
+        super().__init__(switch_port_mappings, host_switches)
+
+        switches = set(switch_links) | set(host_switches.values())
+
+        for linked_switches in switch_links.values():
+            switches.update(linked_switches)
+
+        self._switches = sorted(switches)
+        self._switch_ids = {switch: switch_id for switch_id, switch in enumerate(self._switches)}
+
+        sources, targets = [], []
+
+        for switch, linked_switches in switch_links.items():
+            for linked_switch in linked_switches:
+                sources += [self._switch_ids[switch], self._switch_ids[linked_switch]]
+                targets += [self._switch_ids[linked_switch], self._switch_ids[switch]]
+
+        adjacency = csr_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)),
+                               shape=(len(self._switches), len(self._switches)))
+        adjacency.data[:] = 1  # links given in both directions are summed up, only their presence matters
+        adjacency.sort_indices()
+
+        self.adjacency = adjacency
+        self.component_count, self._components = connected_components(adjacency, directed=False)
+
+        self._max_destinations = max(1, max_destinations)
+        self._distance_tables: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._distance_tables_lock = Lock()
+
+    def _distances_to(self, destination_id: int) -> np.ndarray:
+        """Returns the distance of every switch to a destination switch, -1 for the switches which can't reach it"""
+        with self._distance_tables_lock:
+            distances = self._distance_tables.get(destination_id)
+
+            if distances is not None:
+                self._distance_tables.move_to_end(destination_id)
+                return distances
+
+        search_distances = shortest_path(self.adjacency, directed=False, unweighted=True, indices=destination_id)
+        distances = np.where(np.isinf(search_distances), -1, search_distances).astype(np.int32)
+
+        with self._distance_tables_lock:
+            self._distance_tables[destination_id] = distances
+
+            while len(self._distance_tables) > self._max_destinations:
+                self._distance_tables.popitem(last=False)
+
+        return distances
+
+    def _neighbour_ids(self, switch_id: int) -> np.ndarray:
+        return self.adjacency.indices[self.adjacency.indptr[switch_id]:self.adjacency.indptr[switch_id + 1]]
+
+    def _has_switch(self, switch: str) -> bool:
+        return switch in self._switch_ids
+
+    def _switch_neighbours(self, switch: str) -> Sequence[str]:
+        return [self._switches[neighbour_id] for neighbour_id in self._neighbour_ids(self._switch_ids[switch])]
+
+    def _switch_distance(self, switch: str, destination_switch: str) -> Optional[int]:
+        switch_id, destination_id = self._switch_ids[switch], self._switch_ids[destination_switch]
+
+        if self._components[switch_id] != self._components[destination_id]:
+            return None
+
+        return int(self._distances_to(destination_id)[switch_id])
+
+    def _next_hops(self, switch: str, destination_switch: str) -> Sequence[str]:
+        switch_id = self._switch_ids[switch]
+        distances = self._distances_to(self._switch_ids[destination_switch])
+
+        neighbour_ids = self._neighbour_ids(switch_id)
+        next_hop_ids = neighbour_ids[distances[neighbour_ids] == distances[switch_id] - 1]
+
+        return [self._switches[next_hop_id] for next_hop_id in next_hop_ids]
@@ -0,0 +1,104 @@
+"""
+Cookies linking the flows installed by an agent run to the run. Every flow added by the tools of a run is
+stamped with the cookie of the run, which is saved with the run in processed_intents. The flows of a run can
+then be listed or removed with one /stats/flow or /stats/flowentry/delete call per switch, filtered on the
+cookie under RUN_COOKIE_MASK, instead of being looked up one by one.
+
+The cookie of a run takes bits 16 to 62 of the cookie, leaving the lower 16 bits to other uses. The top bit is
+kept clear so cookies fit the signed 64-bit columns of processed_intents.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.network_state_format import OFPTT_ALL
+from otto.ryu.ryu_transport import RyuTransport
+
+RUN_COOKIE_BITS = 47
+RUN_COOKIE_SHIFT = 16
+RUN_COOKIE_MASK = ((1 << RUN_COOKIE_BITS) - 1) << RUN_COOKIE_SHIFT
+
+
+def run_cookie(agent_run_id: Optional[str]) -> int:
+    """
+    Returns the cookie stamped on the flows installed by an agent run, derived from the ID of the run so every
+    tool of the run finds the same cookie. 0 outside of an agent run.
+    """
+    if agent_run_id is None:
+        return 0
+
+    run_bits = int(hashlib.md5(agent_run_id.encode('utf-8')).hexdigest(), 16) & ((1 << RUN_COOKIE_BITS) - 1)
+
+    return (run_bits or 1) << RUN_COOKIE_SHIFT
+
+
+def cookie_filter(cookie: int, cookie_mask: int = RUN_COOKIE_MASK) -> dict:
+    """Returns the fields of a Ryu request which select the flows stamped with a run cookie"""
+    if not cookie & cookie_mask:
+        # a cookie of 0 would select every flow not installed by an agent run
+        raise ValueError(f"{cookie} is not the cookie of an agent run")
+
+    return {"cookie": cookie & cookie_mask, "cookie_mask": cookie_mask}
+
+
+def on_every_switch(function, switch_ids: list[str], transport: RyuTransport) -> dict:
+    """Calls a function with every switch concurrently, returns {switch ID: returned value}"""
+    if not switch_ids:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(len(switch_ids), transport.pool_size)) as executor:
+        return dict(zip(switch_ids, executor.map(function, switch_ids)))
+
+
+def find_run_flows(cookie: int, switch_ids: Optional[list[str]] = None,
+                   transport: Optional[RyuTransport] = None, cookie_mask: int = RUN_COOKIE_MASK) -> dict[str, dict]:
+    """
+    Returns the flows stamped with the cookie of an agent run, as {switch ID: installed flows} for the
+    switches holding any. Raises a FlowRetrievalException if a switch cannot be read.
+    Args:
+        cookie: cookie of the agent run, see run_cookie
+        switch_ids: IDs of the switches (in decimal) to look on. Defaults to every switch connected to Ryu.
+        transport: RyuTransport used to contact Ryu. Defaults to the shared transport.
+        cookie_mask: mask the cookie was saved with in processed_intents
+    """
+    transport = transport or RyuTransport.get_instance()
+    nw_state_finder = NetworkStateFinder(transport=transport)
+    flow_filter = cookie_filter(cookie, cookie_mask)
+
+    if switch_ids is None:
+        switch_ids = [str(switch_id) for switch_id in nw_state_finder.get_switches()]
+
+    run_flows = on_every_switch(lambda switch_id: nw_state_finder.get_matching_flows(switch_id, flow_filter),
+                                switch_ids, transport)
+
+    return {switch_id: flows for switch_id, flows in run_flows.items() if flows}
+
+
+def rollback_run(cookie: int, switch_ids: Optional[list[str]] = None,
+                 transport: Optional[RyuTransport] = None, cookie_mask: int = RUN_COOKIE_MASK) -> dict[str, int | str]:
+    """
+    Deletes every flow stamped with the cookie of an agent run, from every table, with one
+    /stats/flowentry/delete call per switch. Returns {switch ID: HTTP status code of the call, or the error
+    raised}. Groups are not rolled back, as they carry no cookie.
+    Args:
+        cookie: cookie of the agent run, see run_cookie
+        switch_ids: IDs of the switches (in decimal) to roll back. Defaults to every switch connected to Ryu.
+        transport: RyuTransport used to contact Ryu. Defaults to the shared transport.
+        cookie_mask: mask the cookie was saved with in processed_intents
+    """
+    transport = transport or RyuTransport.get_instance()
+    delete_filter = {"table_id": OFPTT_ALL, **cookie_filter(cookie, cookie_mask)}
+
+    if switch_ids is None:
+        switch_ids = [str(switch_id) for switch_id in NetworkStateFinder(transport=transport).get_switches()]
+
+    def delete_run_flows(switch_id: str) -> int | str:
+        try:
+            return transport.post("/stats/flowentry/delete", json={"dpid": int(switch_id), **delete_filter}) \
+                .status_code
+        except Exception as e:
+            return f"error: {e}"
+
+    return on_every_switch(delete_run_flows, switch_ids, transport)
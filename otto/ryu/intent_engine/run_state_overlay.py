@@ -0,0 +1,194 @@
+import copy
+import os
+from threading import Lock
+from typing import Optional
+
+from otto.ryu.network_state_db.network_state_format import (FLOW_COUNTER_FIELDS, FLOW_ENTRY_DEFAULT_PRIORITY,
+                                                            filter_flow, format_actions, format_match, hash_flow)
+
+
+class RunStateOverlay:
+    """
+    Run-local view of the network state given to each agent run. The network state of a run is a snapshot
+    shared with other runs, so it is never modified: when Ryu accepts a change made by one of the tools, the
+    switch is copied into the overlay of the run and the change is applied to the copy. check_switch is served
+    from the overlay, so an agent run reads its own writes without calling the controller, and only re-reads
+    a switch from Ryu when a confirmed view is asked for.
+
+    Changes made outside of the run (e.g. by another agent run) are not in the overlay until the switch is
+    re-read with confirm_switch.
+
+    The switches a run changed are also kept until taken with take_written_switches, so they can be reported
+    to the NetworkStateBroker.
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self):
+        self._switches: dict[str, dict[str, dict]] = {}
+        self._confirmed: dict[str, set[str]] = {}
+        self._written: dict[str, set[str]] = {}
+        self._lock = Lock()
+        self._owner_pid = os.getpid()
+
+    @classmethod
+    def get_instance(cls) -> "RunStateOverlay":
+        """Returns the RunStateOverlay shared by the tools of every agent run of the current process"""
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._owner_pid != os.getpid():
+                cls._instance = cls()
+
+            return cls._instance
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._switches)
+
+    @staticmethod
+    def _network_elements(network_state: dict) -> dict:
+        return network_state[next(iter(network_state))] if network_state else {}
+
+    def _run_switch(self, agent_run_id: str, network_state: dict, dpid: str) -> dict:
+        """Returns the overlay copy of a switch, copied from the network state first. Called with the lock held"""
+        run_switches = self._switches.setdefault(agent_run_id, {})
+
+        if dpid not in run_switches:
+            run_switches[dpid] = copy.deepcopy(self._network_elements(network_state).get(dpid) or {"name": dpid})
+
+        switch = run_switches[dpid]
+        switch["installedFlows"] = switch.get("installedFlows") or {}
+        switch["installedGroups"] = switch.get("installedGroups") or []
+
+        return switch
+
+    def view_switch(self, agent_run_id: str, network_state: dict, dpid: str) -> Optional[dict]:
+        """
+        Returns a copy of a switch as seen by an agent run: as in its network state, with the changes made by
+        the run applied. None if the switch is neither in the network state nor in the overlay.
+        """
+        with self._lock:
+            switch = self._switches.get(agent_run_id, {}).get(dpid)
+
+            if switch is None:
+                switch = self._network_elements(network_state).get(dpid)
+
+            return copy.deepcopy(switch)
+
+    def is_confirmed(self, agent_run_id: str, dpid: str) -> bool:
+        """Returns whether the view of a switch was re-read from Ryu during the agent run"""
+        with self._lock:
+            return dpid in self._confirmed.get(agent_run_id, set())
+
+    def record_change(self, agent_run_id: str, network_state: dict, api: str, request: dict) -> None:
+        """
+        Applies a change accepted by Ryu to the view of the agent run.
+        Args:
+            agent_run_id: ID of the agent run which made the change
+            network_state: network state of the agent run
+            api: Ryu API the change was sent to, e.g. /stats/flowentry/add
+            request: body of the call, with the dpid of the switch in decimal
+        """
+        switch_id = str(int(request["dpid"]))
+        dpid = format(int(switch_id), '016x')
+        command = api.rstrip("/").rsplit("/", 1)[-1]
+
+        with self._lock:
+            switch = self._run_switch(agent_run_id, network_state, dpid)
+            self._written.setdefault(agent_run_id, set()).add(dpid)
+
+            if "/flowentry/" in api:
+                self._record_flow_change(switch, switch_id, command, request)
+            elif "/groupentry/" in api:
+                self._record_group_change(switch, command, request)
+
+    @staticmethod
+    def _record_flow_change(switch: dict, switch_id: str, command: str, request: dict) -> None:
+        flows = switch["installedFlows"]
+        # keyed as Ryu reports the flow, so the hash matches the one of the flow re-read from Ryu
+        flow_key = (request.get("priority", FLOW_ENTRY_DEFAULT_PRIORITY), request.get("table_id", 0),
+                    format_match(request.get("match", {})))
+
+        matching_flows = [flow_hash for flow_hash, flow in flows.items()
+                          if (flow.get("priority"), flow.get("table_id"), format_match(flow.get("match", {}))) ==
+                          flow_key]
+
+        if command == "add":
+            flow = {
+                "priority": flow_key[0],
+                "cookie": request.get("cookie", 0),
+                "idle_timeout": request.get("idle_timeout", 0),
+                "hard_timeout": request.get("hard_timeout", 0),
+                "actions": format_actions(request.get("actions", [])),
+                "match": flow_key[2],
+                "table_id": flow_key[1]
+            }
+
+            # adding a flow with the same priority and match replaces it, as OpenFlow does
+            for flow_hash in matching_flows:
+                del flows[flow_hash]
+
+            flows[hash_flow(switch_id, flow)] = flow
+
+        elif command == "delete_strict":
+            for flow_hash in matching_flows:
+                del flows[flow_hash]
+
+        elif command == "delete":
+            # a non-strict delete, e.g. the rollback of the flows stamped with a run cookie
+            delete_filter = {field: value for field, value in request.items() if field != "priority"}
+            delete_filter["table_id"] = request.get("table_id", 0)
+
+            for flow_hash, flow in list(flows.items()):
+                if filter_flow(flow, delete_filter):
+                    del flows[flow_hash]
+
+        elif command == "modify_strict":
+            for flow_hash in matching_flows:
+                flow = {**flows.pop(flow_hash), "actions": format_actions(request.get("actions", []))}
+                flows[hash_flow(switch_id, flow)] = flow
+
+    @staticmethod
+    def _record_group_change(switch: dict, command: str, request: dict) -> None:
+        groups = switch["installedGroups"]
+        existing_group = next((group for group in groups if group.get("group_id") == request["group_id"]), {})
+
+        remaining_groups = [group for group in groups if group.get("group_id") != request["group_id"]]
+
+        if command == "delete":
+            switch["installedGroups"] = remaining_groups
+            return
+
+        group = {**existing_group, "group_id": request["group_id"]}
+
+        for field in ["type", "buckets"]:
+            if request.get(field) is not None:
+                group[field] = request[field]
+
+        switch["installedGroups"] = remaining_groups + [group]
+
+    def confirm_switch(self, agent_run_id: str, network_state: dict, dpid: str, installed_flows: dict,
+                       installed_groups: list) -> dict:
+        """Replaces the view of a switch by the flows and groups re-read from Ryu. Returns a copy of the view."""
+        with self._lock:
+            switch = self._run_switch(agent_run_id, network_state, dpid)
+
+            # as in the network state, the configuration of the flows is kept without their counters
+            switch["installedFlows"] = {flow_hash: {field: value for field, value in flow.items()
+                                                    if field not in FLOW_COUNTER_FIELDS}
+                                        for flow_hash, flow in installed_flows.items()}
+            switch["installedGroups"] = installed_groups
+            self._confirmed.setdefault(agent_run_id, set()).add(dpid)
+
+            return copy.deepcopy(switch)
+
+    def take_written_switches(self, agent_run_id: str) -> set[str]:
+        """Returns the DPIDs of the switches an agent run changed since this method was last called for it"""
+        with self._lock:
+            return self._written.pop(agent_run_id, set())
+
+    def discard(self, agent_run_id: str) -> None:
+        """Drops the view of an agent run once it is over"""
+        with self._lock:
+            self._switches.pop(agent_run_id, None)
+            self._confirmed.pop(agent_run_id, None)
+            self._written.pop(agent_run_id, None)
@@ -0,0 +1,156 @@
+import asyncio
+import os
+from typing import Any, Optional
+
+from langchain_core.messages import BaseMessage, ToolCall
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor, get_config_list
+from langgraph.prebuilt import ToolNode
+
+DEFAULT_TOOL_CONCURRENCY = 8
+
+
+def switch_key(switch_id: Any) -> str:
+    """Returns the DPID of a switch given as a decimal ID or a 16 digit DPID, so both name the same switch"""
+    switch_id = str(switch_id).strip().lower()
+
+    try:
+        return format(int(switch_id, 16) if len(switch_id) == 16 else int(switch_id), '016x')
+    except ValueError:
+        return switch_id
+
+
+def switches_of(tool_call: ToolCall) -> set[str]:
+    """
+    Returns the switches a tool call touches: its switch_id argument, and the switch_id of every entry of its
+    list arguments (e.g. a batch of flows).
+    """
+    switches = set()
+
+    for name, value in (tool_call.get('args') or {}).items():
+        if name == 'switch_id':
+            switches.add(switch_key(value))
+
+        elif isinstance(value, list):
+            switches.update(switch_key(entry['switch_id']) for entry in value
+                            if isinstance(entry, dict) and 'switch_id' in entry)
+
+    return switches
+
+
+def order_by_switch(tool_calls: list[ToolCall]) -> list[list[int]]:
+    """
+    Splits tool calls into lanes of call indexes. Calls touching a common switch are in the same lane, in the
+    order they were made, so they can be run one after the other while the lanes run concurrently. Calls
+    which don't touch any switch get a lane of their own.
+    """
+    lane_of_switch: dict[str, int] = {}
+    lanes: list[Optional[list[int]]] = []
+
+    for index, tool_call in enumerate(tool_calls):
+        joined_lanes = sorted({lane_of_switch[switch] for switch in switches_of(tool_call)
+                               if switch in lane_of_switch})
+
+        if joined_lanes:
+            lane = joined_lanes[0]
+
+            # the call links lanes which were independent until now, so they have to be merged
+            for merged_lane in joined_lanes[1:]:
+                lanes[lane].extend(lanes[merged_lane])
+                lanes[merged_lane] = None
+
+                for switch, switch_lane in lane_of_switch.items():
+                    if switch_lane == merged_lane:
+                        lane_of_switch[switch] = lane
+
+            lanes[lane] = sorted(lanes[lane]) + [index]
+        else:
+            lane = len(lanes)
+            lanes.append([index])
+
+        for switch in switches_of(tool_call):
+            lane_of_switch[switch] = lane
+
+    return [lane for lane in lanes if lane is not None]
+
+
+class SwitchOrderedToolNode(Runnable):
+    """
+    Runs the tool calls of a model turn concurrently, except for calls touching the same switch, which are run
+    in the order the model made them (e.g. deleting a rule before adding its replacement). The results are
+    returned in the order of the calls.
+
+    Built on the public API of ToolNode only: every tool call is run by its own ToolNode invocation, given the
+    state with the last AI message narrowed down to that call, and the config of that call.
+
+    Args:
+        tools: tools which can be called
+        max_concurrency: number of tool calls run at the same time, taken from the OTTO_TOOL_CONCURRENCY
+        environment variable by default
+        kwargs: passed on to the ToolNode, e.g. handle_tool_errors
+    """
+
+    def __init__(self, tools: list, max_concurrency: Optional[int] = None, **kwargs):
+        self.tool_node = ToolNode(tools, **kwargs)
+        self.name = self.tool_node.name
+
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("OTTO_TOOL_CONCURRENCY",
+                                                                       DEFAULT_TOOL_CONCURRENCY)))
+
+    @staticmethod
+    def _messages_of(input: Any) -> list[BaseMessage]:
+        return input if isinstance(input, list) else input["messages"]
+
+    @classmethod
+    def _call_input(cls, input: Any, tool_call: ToolCall) -> Any:
+        """Returns the input of the ToolNode invocation running one of the tool calls of the last AI message"""
+        messages = cls._messages_of(input)
+        call_messages = messages[:-1] + [messages[-1].model_copy(update={"tool_calls": [tool_call]})]
+
+        return call_messages if isinstance(input, list) else {**input, "messages": call_messages}
+
+    @staticmethod
+    def _combine(input: Any, outputs: list[Any]) -> Any:
+        messages = [message for output in outputs for message in (output if isinstance(output, list)
+                                                                   else output["messages"])]
+
+        return messages if isinstance(input, list) else {"messages": messages}
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        tool_calls = self._messages_of(input)[-1].tool_calls
+        config_list = get_config_list(config, len(tool_calls))
+        outputs: list[Any] = [None] * len(tool_calls)
+
+        def run_lane(lane: list[int]):
+            for index in lane:
+                outputs[index] = self.tool_node.invoke(self._call_input(input, tool_calls[index]),
+                                                       config_list[index], **kwargs)
+
+        lanes = order_by_switch(tool_calls)
+
+        if len(lanes) <= 1:
+            for lane in lanes:
+                run_lane(lane)
+        else:
+            with ContextThreadPoolExecutor(max_workers=min(self.max_concurrency, len(lanes))) as executor:
+                # result() raises the exception of a lane, as ToolNode does for a single call
+                for lane_result in [executor.submit(run_lane, lane) for lane in lanes]:
+                    lane_result.result()
+
+        return self._combine(input, outputs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        tool_calls = self._messages_of(input)[-1].tool_calls
+        config_list = get_config_list(config, len(tool_calls))
+        outputs: list[Any] = [None] * len(tool_calls)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_lane(lane: list[int]):
+            async with semaphore:
+                for index in lane:
+                    outputs[index] = await self.tool_node.ainvoke(self._call_input(input, tool_calls[index]),
+                                                                  config_list[index], **kwargs)
+
+        await asyncio.gather(*(run_lane(lane) for lane in order_by_switch(tool_calls)))
+
+        return self._combine(input, outputs)
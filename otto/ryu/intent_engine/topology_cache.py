@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from functools import cached_property
+from threading import Lock
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import networkx as nx
+
+from otto.otto_logger.logger_config import logger
+from otto.ryu.intent_engine.path_index import NetworkxPathIndex, PathIndex, SparsePathIndex, csr_matrix
+from otto.ryu.network_state_db.port_dpid_index import PortDpidIndex
+
+DEFAULT_TOPOLOGY_CACHE_SIZE = 8
+STATE_IDS_PER_TOPOLOGY = 16
+SPARSE_TOPOLOGY_THRESHOLD = 500
+
+
+class NetworkTopology:
+    """
+    Topology of a network state, shared by every agent run given a network state with the same links and
+    hosts. None of the structures can be modified: the graph is frozen and the port mappings are a read-only view.
+
+    Attributes:
+        switch_port_mappings: {(node, node): (port, port)} interfaces used to connect two nodes
+        host_switches: {host ID: DPID of the switch the host is connected to}
+        path_index: paths between every two nodes of the topology
+        network_graph: links between hosts and switches as a networkx graph. Only built when first used by
+        the topologies held in a SparsePathIndex, e.g. to draw them.
+    """
+
+    def __init__(self, switch_port_mappings: Mapping[tuple[str, str], tuple[str, str]], host_switches: dict[str, str],
+                 path_index: PathIndex, network_graph: Optional[nx.Graph] = None):
+        self.switch_port_mappings = switch_port_mappings
+        self.host_switches = host_switches
+        self.path_index = path_index
+
+        if network_graph is not None:
+            self.__dict__["network_graph"] = network_graph
+
+    @cached_property
+    def network_graph(self) -> nx.Graph:
+        network_graph = nx.Graph()
+
+        for (node, remote_node), (port, remote_port) in self.switch_port_mappings.items():
+            if node in self.host_switches or remote_node in self.host_switches:
+                network_graph.add_edge(node, remote_node)
+            else:
+                network_graph.add_edge(node, remote_node, port_info=(port, remote_port))
+
+        return nx.freeze(network_graph)
+
+
+def topology_key(network_elements: dict) -> str:
+    """
+    Returns a digest of the links and hosts of a network state. Network states which only differ in their
+    flows or groups have the same topology key, and so share the same NetworkTopology.
+    """
+    topology = {switch: [sorted(switch_data.get('portMappings', {}).items()),
+                         sorted((switch_port, host['id']) for switch_port, host in
+                                switch_data.get('connectedHosts', {}).items())]
+                for switch, switch_data in network_elements.items()}
+
+    return hashlib.sha256(json.dumps(topology, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def topology_backend(switch_count: int) -> str:
+    """
+    Returns the backend used for the PathIndex of a topology, as set in the OTTO_TOPOLOGY_BACKEND environment
+    variable: "networkx", "sparse", or "auto" (the default) for the sparse backend from
+    SPARSE_TOPOLOGY_THRESHOLD switches, when SciPy is installed.
+    """
+    backend = os.getenv("OTTO_TOPOLOGY_BACKEND", "auto")
+
+    if backend not in ["auto", "networkx", "sparse"]:
+        raise ValueError(f"Unknown topology backend {backend}")
+
+    if backend == "auto":
+        return "sparse" if switch_count >= SPARSE_TOPOLOGY_THRESHOLD and csr_matrix is not None else "networkx"
+
+    return backend
+
+
+def build_topology(network_elements: dict, backend: Optional[str] = None) -> NetworkTopology:
+    """
+    Builds the topology of a network state. The switch at the remote end of every link is resolved with a
+    PortDpidIndex, links whose remote switch can't be resolved are left out.
+    Args:
+        network_elements: {switch DPID: switch info} of the network state
+        backend: "networkx" or "sparse", see topology_backend for the default
+    """
+    switch_links, switch_port_mappings, host_switches = {}, {}, {}
+    port_dpids = PortDpidIndex(network_elements)
+
+    for switch, switch_data in network_elements.items():
+        switch_links.setdefault(switch, set())
+
+        for switch_port, remote_port in switch_data.get('portMappings', {}).items():
+            remote_switch = port_dpids.remote_switch(switch_port, remote_port)
+
+            if remote_switch is None:
+                continue
+
+            switch_links[switch].add(remote_switch)
+
+            switch_port_mappings[(switch, remote_switch)] = (switch_port, remote_port)
+            switch_port_mappings[(remote_switch, switch)] = (remote_port, switch_port)
+
+        for switch_port, remote_host in switch_data.get('connectedHosts', {}).items():
+            host_id = remote_host['id']
+            host_switches[host_id] = switch
+
+            switch_port_mappings[(switch, host_id)] = (switch_port, host_id)
+            switch_port_mappings[(host_id, switch)] = (host_id, switch_port)
+
+    switch_port_mappings = MappingProxyType(switch_port_mappings)
+
+    if (backend or topology_backend(len(network_elements))) == "sparse":
+        return NetworkTopology(switch_port_mappings, host_switches,
+                               SparsePathIndex(switch_links, switch_port_mappings, host_switches))
+
+    topology = NetworkTopology(switch_port_mappings, host_switches, None)
+    topology.path_index = NetworkxPathIndex(topology.network_graph, switch_port_mappings, host_switches)
+
+    return topology
+
+
+class TopologyCache:
+    """
+    Least recently used cache of the topology built for each network state, keyed by its topology key (see
+    topology_key). Every agent run given a network state with the same links and hosts shares the same
+    NetworkTopology instead of building its own, and the topology key of each state ID is remembered so it
+    is only computed once.
+
+    The size of the cache is set through its constructor or the OTTO_TOPOLOGY_CACHE_SIZE environment variable.
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max(1, max_size or int(os.getenv("OTTO_TOPOLOGY_CACHE_SIZE", DEFAULT_TOPOLOGY_CACHE_SIZE)))
+
+        self._topologies: OrderedDict[str, NetworkTopology] = OrderedDict()
+        self._topology_keys: OrderedDict[str, str] = OrderedDict()
+        self._lock = Lock()
+        self._owner_pid = os.getpid()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls) -> "TopologyCache":
+        """Returns the TopologyCache shared by every IntentProcessor of the current process"""
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._owner_pid != os.getpid():
+                cls._instance = cls()
+
+            return cls._instance
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._topologies)
+
+    def get_topology(self, network_state: dict) -> NetworkTopology:
+        """
+        Returns the topology of a network state, building it if it is not cached.
+        Args:
+            network_state: {state ID: {switch DPID: switch info}}, as provided by the NetworkStateBroker
+        """
+        state_id = next(iter(network_state))
+
+        with self._lock:
+            key = self._topology_keys.get(state_id)
+
+            if key is not None and key in self._topologies:
+                self._topology_keys.move_to_end(state_id)
+                self._topologies.move_to_end(key)
+                self.hits += 1
+
+                return self._topologies[key]
+
+        if key is None:
+            key = topology_key(network_state[state_id])
+
+        with self._lock:
+            self._remember_topology_key(state_id, key)
+
+            topology = self._topologies.get(key)
+
+            if topology is not None:
+                self._topologies.move_to_end(key)
+                self.hits += 1
+
+                return topology
+
+            self.misses += 1
+
+        topology = build_topology(network_state[state_id])
+
+        with self._lock:
+            # another agent run may have built the same topology in the meantime, keep the first one
+            topology = self._topologies.setdefault(key, topology)
+            self._topologies.move_to_end(key)
+
+            while len(self._topologies) > self.max_size:
+                evicted_key, _ = self._topologies.popitem(last=False)
+                logger.debug(f"Evicted topology {evicted_key} from the topology cache")
+
+        return topology
+
+    def _remember_topology_key(self, state_id: str, key: str) -> None:
+        self._topology_keys[state_id] = key
+        self._topology_keys.move_to_end(state_id)
+
+        while len(self._topology_keys) > self.max_size * STATE_IDS_PER_TOPOLOGY:
+            self._topology_keys.popitem(last=False)
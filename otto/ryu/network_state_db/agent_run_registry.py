@@ -0,0 +1,149 @@
+from threading import Event, Lock
+from typing import Callable, Optional
+
+from otto.otto_logger.logger_config import logger
+from otto.ryu.network_state_db.network_snapshot import NetworkSnapshot
+
+StateChangeCallback = Callable[[str, set[str]], None]
+
+
+class AgentRun:
+    """
+    An agent run registered with the NetworkStateBroker, along with the network state it was given.
+
+    Attributes:
+        state_id: ID of the network state given to the agent run
+        switch_digests: digest of every switch in that network state
+        changed_switches: DPIDs of the switches which changed since the network state was given
+        written_switches: DPIDs of the switches the agent run changed itself, whose next change is its own
+        state_changed: set once any switch changed
+    """
+
+    def __init__(self, agent_run_id: str, state_id: str, switch_digests: dict):
+        self.agent_run_id = agent_run_id
+        self.state_id = state_id
+        self.switch_digests = switch_digests
+
+        self.changed_switches: set[str] = set()
+        self.written_switches: set[str] = set()
+        self.state_changed = Event()
+        self.callbacks: list[StateChangeCallback] = []
+
+
+class AgentRunRegistry:
+    """
+    Thread-safe registry of the agent runs currently executing. Each time the broker finds a new
+    network snapshot, the registry compares it with the network state given to every agent run, and
+    notifies the runs whose switches changed.
+    """
+
+    def __init__(self):
+        self._agent_runs: dict[str, AgentRun] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._agent_runs)
+
+    def register(self, agent_run_id: str, network_snapshot: NetworkSnapshot) -> None:
+        """Registers an agent run as having been given the network state of network_snapshot"""
+        state_id = next(iter(network_snapshot["network_state"]))
+
+        with self._lock:
+            self._agent_runs[agent_run_id] = AgentRun(agent_run_id, state_id, network_snapshot["switch_digests"])
+
+    def unregister(self, agent_run_id: str) -> AgentRun:
+        """Removes an agent run from the registry. Raises a KeyError if the agent run is not registered."""
+        with self._lock:
+            return self._agent_runs.pop(agent_run_id)
+
+    def subscribe(self, agent_run_id: str, callback: Optional[StateChangeCallback] = None) -> Event:
+        """
+        Subscribes to the changes made to the network after an agent run was given its network state.
+        Raises a KeyError if the agent run is not registered.
+
+        Args:
+            agent_run_id: ID of the agent run
+            callback: called with the agent run ID and the set of switches which changed since the
+            network state was given, each time more switches are found to have changed
+        Returns:
+            Event set once any switch changed, see changed_switches for which ones
+        """
+        with self._lock:
+            agent_run = self._agent_runs[agent_run_id]
+
+            if callback is not None:
+                agent_run.callbacks.append(callback)
+
+            return agent_run.state_changed
+
+    def changed_switches(self, agent_run_id: str) -> set[str]:
+        """Returns the switches which changed since an agent run was given its network state"""
+        with self._lock:
+            agent_run = self._agent_runs.get(agent_run_id)
+
+            return set(agent_run.changed_switches) if agent_run is not None else set()
+
+    def record_writes(self, agent_run_id: str, switches: set[str]) -> None:
+        """
+        Records that an agent run changed switches itself, so the next change found on each of them is taken
+        into its network state instead of being notified to it (see notify). A change made to one of these
+        switches by anyone else before the switch is collected again is taken as the agent run's own as well.
+        """
+        with self._lock:
+            agent_run = self._agent_runs.get(agent_run_id)
+
+            if agent_run is not None:
+                agent_run.written_switches |= switches
+
+    def given_state_ids(self) -> dict[str, str]:
+        """Returns the ID of the network state given to each agent run, as {agent run ID: state ID}"""
+        with self._lock:
+            return {agent_run_id: agent_run.state_id for agent_run_id, agent_run in self._agent_runs.items()}
+
+    def notify(self, network_snapshot: NetworkSnapshot) -> None:
+        """
+        Compares a new network snapshot with the network state given to every agent run. The switches
+        whose digest differs (or which were added or removed) are added to the changed switches of the
+        agent run, and its subscribers are notified if any of them had not changed before. The changes
+        an agent run made itself (see record_writes) are not notified to it.
+        """
+        state_id = next(iter(network_snapshot["network_state"]))
+        switch_digests = network_snapshot["switch_digests"]
+
+        notifications = []
+
+        with self._lock:
+            for agent_run in self._agent_runs.values():
+                if agent_run.state_id == state_id:
+                    continue
+
+                changed_switches = {switch for switch in agent_run.switch_digests.keys() | switch_digests.keys()
+                                    if agent_run.switch_digests.get(switch) != switch_digests.get(switch)}
+
+                own_changes = changed_switches & agent_run.written_switches
+
+                if own_changes:
+                    # the switch digests are shared with the snapshot the agent run was given, so are replaced
+                    agent_run.switch_digests = {**agent_run.switch_digests,
+                                                **{switch: switch_digests.get(switch) for switch in own_changes}}
+                    agent_run.written_switches -= own_changes
+                    changed_switches -= own_changes
+
+                if changed_switches <= agent_run.changed_switches:
+                    continue
+
+                agent_run.changed_switches |= changed_switches
+                agent_run.state_changed.set()
+
+                notifications.append((agent_run.agent_run_id, set(agent_run.changed_switches),
+                                      list(agent_run.callbacks)))
+
+        for agent_run_id, changed_switches, callbacks in notifications:
+            logger.info(f"Network state changed for agent run {agent_run_id} on switches {sorted(changed_switches)}")
+
+            for callback in callbacks:
+                try:
+                    callback(agent_run_id, changed_switches)
+                except Exception as e:
+                    logger.warn(f"Error while notifying agent run {agent_run_id} of state changes: {e}")
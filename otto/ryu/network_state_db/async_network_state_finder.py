@@ -0,0 +1,235 @@
+import asyncio
+from threading import Thread
+from typing import Coroutine, Optional
+
+import aiohttp
+
+from otto.ryu.network_state_db.network_snapshot import NetworkSnapshot
+from otto.ryu.network_state_db.network_state_calls import (ALL_CONNECTED_HOSTS, ALL_PORT_MAPPINGS, ALL_PORTS,
+                                                           CONNECTED_HOSTS, FLOW_COUNT, INSTALLED_FLOWS,
+                                                           INSTALLED_GROUPS, PORT_MAPPINGS, PORTS, SWITCHES,
+                                                           RyuCall, call_error, call_path)
+from otto.ryu.network_state_db.network_state_format import create_network_snapshot
+from otto.ryu.network_state_db.network_state_hasher import NetworkStateHasher
+from otto.ryu.ryu_transport import AsyncRyuTransport
+
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+class AsyncNetworkStateFinder:
+    """
+    asyncio counterpart of the NetworkStateFinder. Every Ryu API call is issued on the event loop, so the
+    state of hundreds of switches can be collected concurrently without an OS thread per call in flight.
+    Produces the same network state and state ID as the NetworkStateFinder, and raises the same exceptions.
+    Can be used as an async context manager, which closes the transport of the finder on exit.
+    """
+    _transport: AsyncRyuTransport
+    _request_timeout: Optional[float]
+    _bulk_topology: bool
+    _state_hasher: NetworkStateHasher
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 request_timeout: Optional[float] = None,
+                 transport: Optional[AsyncRyuTransport] = None,
+                 bulk_topology: bool = True):
+        """
+        Args:
+            max_concurrency: upper bound on the number of Ryu API calls in flight.
+            request_timeout: deadline (in seconds) applied to every individual Ryu API call.
+            Defaults to the read timeout of the transport.
+            transport: AsyncRyuTransport used to contact the Ryu REST API.
+            bulk_topology: collect the ports, port mappings and connected hosts of the whole network with
+            one call each to the unfiltered /v1.0/topology APIs, instead of three calls per switch.
+        """
+        self._transport = transport or AsyncRyuTransport()
+        self._request_timeout = request_timeout
+        self._bulk_topology = bulk_topology
+        self._state_hasher = NetworkStateHasher()
+        self._call_slots = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def __aenter__(self) -> "AsyncNetworkStateFinder":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def get_network_state(self) -> dict:
+        """
+        Method to find the current network state. Returns the configuration part of the NetworkSnapshot
+        found by get_network_snapshot, in the form {state ID: network elements}
+        """
+        snapshot = await self.get_network_snapshot()
+
+        return snapshot["network_state"]
+
+    async def get_network_snapshot(self) -> NetworkSnapshot:
+        """
+        Method to find the current network state. Obtains the list of current switches and then
+        collects every switch concurrently. The topology of the whole network is collected with three
+        calls to the unfiltered topology APIs, unless the finder was created with bulk_topology=False.
+        The result follows the same format as NetworkStateFinder.get_network_snapshot.
+        """
+        found_switches = await self.get_switches()
+
+        if not self._bulk_topology:
+            switch_details = await self._gather(*(self.get_switch_details(str(switch)) for switch in found_switches))
+
+            return create_network_snapshot({switch_info["name"]: switch_info for switch_info in switch_details},
+                                           self._state_hasher)
+
+        all_ports, all_port_mappings, all_connected_hosts, *switch_tables = await self._gather(
+            self.get_all_ports(),
+            self.get_all_port_mappings(),
+            self.get_all_connected_hosts(),
+            *(self._get_switch_tables(str(switch)) for switch in found_switches)
+        )
+
+        network_elements = {}
+
+        for switch_hex_dpid, installed_flows, installed_groups in switch_tables:
+            network_elements[switch_hex_dpid] = {
+                "name": switch_hex_dpid,
+                "ports": all_ports.get(switch_hex_dpid, []),
+                "portMappings": all_port_mappings.get(switch_hex_dpid, {}),
+                "connectedHosts": all_connected_hosts.get(switch_hex_dpid, {}),
+                "installedFlows": installed_flows,
+                "installedGroups": installed_groups
+            }
+
+        return create_network_snapshot(network_elements, self._state_hasher)
+
+    async def _get_switch_tables(self, switch_id: str) -> tuple[str, dict, list]:
+        """Returns the DPID, installed flows and installed groups of a switch"""
+        installed_flows, installed_groups = await self._gather(self.get_installed_flows(switch_id),
+                                                               self.get_installed_groups(switch_id))
+
+        return format(int(switch_id), '016x'), installed_flows, installed_groups
+
+    async def get_switches_details(self, switches: set[str]) -> dict:
+        """Returns the details of the given switches (by DPID) collected concurrently, as {switch DPID: details}"""
+        switch_details = await self._gather(*(self.get_switch_details(str(int(switch, 16))) for switch in switches))
+
+        return {switch_info["name"]: switch_info for switch_info in switch_details}
+
+    async def probe_network(self) -> dict[str, int]:
+        """Returns the number of flows installed on each switch, see NetworkStateFinder.probe_network"""
+        found_switches = await self.get_switches()
+
+        flow_counts = await self._gather(*(self.get_flow_count(str(switch)) for switch in found_switches))
+
+        return {format(switch, '016x'): flow_count for switch, flow_count in zip(found_switches, flow_counts)}
+
+    async def get_switch_details(self, switch_id: str) -> dict:
+        switch_hex_dpid = format(int(switch_id), '016x')  # need to write as 16 hex DPID for some RYU API calls
+
+        ports, port_mappings, connected_hosts, installed_flows, installed_groups = await self._gather(
+            self.get_ports(switch_hex_dpid),
+            self.get_port_mappings(switch_hex_dpid),
+            self.get_connected_hosts(switch_hex_dpid),
+            self.get_installed_flows(switch_id),
+            self.get_installed_groups(switch_id)
+        )
+
+        return {
+            "name": switch_hex_dpid,
+            "ports": ports,
+            "portMappings": port_mappings,
+            "connectedHosts": connected_hosts,
+            "installedFlows": installed_flows,
+            "installedGroups": installed_groups
+        }
+
+    async def get_switches(self) -> list[int]:
+        return await self._fetch(SWITCHES)
+
+    async def get_ports(self, switch_dpid: str) -> list:
+        return await self._fetch(PORTS, switch_dpid)
+
+    async def get_port_mappings(self, switch_dpid: str) -> dict:
+        return await self._fetch(PORT_MAPPINGS, switch_dpid)
+
+    async def get_connected_hosts(self, switch_dpid: str) -> dict:
+        return await self._fetch(CONNECTED_HOSTS, switch_dpid)
+
+    async def get_all_ports(self) -> dict:
+        return await self._fetch(ALL_PORTS)
+
+    async def get_all_port_mappings(self) -> dict:
+        return await self._fetch(ALL_PORT_MAPPINGS)
+
+    async def get_all_connected_hosts(self) -> dict:
+        return await self._fetch(ALL_CONNECTED_HOSTS)
+
+    async def get_installed_groups(self, switch_id: str):
+        return await self._fetch(INSTALLED_GROUPS, switch_id)
+
+    async def get_flow_count(self, switch_id: str) -> int:
+        return await self._fetch(FLOW_COUNT, switch_id)
+
+    async def get_installed_flows(self, switch_dpid: str) -> dict:
+        return await self._fetch(INSTALLED_FLOWS, switch_dpid)
+
+    async def close(self) -> None:
+        await self._transport.close()
+
+    async def _fetch(self, call: RyuCall, switch: Optional[str] = None):
+        """
+        Method to make a Ryu API call (see network_state_calls) and return what it collected. Any error is
+        raised as the exception of the call, in the same way as the NetworkStateFinder.
+        """
+        path = call_path(call, switch)
+
+        try:
+            async with self._call_slots:
+                response = await self._transport.get_json(path, timeout=self._request_timeout)
+
+        except aiohttp.ClientResponseError as e:
+            raise call_error(call, path, e)
+
+        except aiohttp.ClientConnectionError as e:
+            raise call_error(call, path, e, reached=False)
+
+        except Exception as e:
+            raise call.exception(e)
+
+        return call.parse(switch, response)
+
+    @staticmethod
+    async def _gather(*coroutines: Coroutine) -> list:
+        """
+        Runs the coroutines concurrently and returns their results in order. If one fails, the
+        others are cancelled and its exception is raised as is.
+        """
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+class EventLoopThread:
+    """
+    Runs an asyncio event loop in a daemon thread, so synchronous code (the NetworkStateBroker, the Flask
+    API, the IntentProcessor graph) can wait on coroutines such as AsyncNetworkStateFinder.get_network_state.
+    Connections opened by the loop stay pooled between calls.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name="otto_event_loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine: Coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        """Stops the event loop, waits for its thread to exit and closes the loop"""
+        if self._loop.is_closed():
+            return
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
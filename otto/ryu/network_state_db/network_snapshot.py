@@ -0,0 +1,17 @@
+from typing import TypedDict
+
+
+class NetworkSnapshot(TypedDict):
+    """
+    Network state collected by a NetworkStateFinder, split into two parts:
+        network_state: {state ID: network elements} holding the configuration of the network
+        (ports, port mappings, connected hosts, flow and group definitions). The state ID is a SHA256
+        hash of the switch digests, so it stays the same while traffic flows through the network.
+        flow_counters: {switch DPID: {flow hash: {packet_count, byte_count}}} holding the volatile
+        counters of every installed flow, keyed the same way as installedFlows in the network state.
+        switch_digests: {switch DPID: digest} holding a SHA256 hash of the configuration of each switch.
+        Comparing the digests of two snapshots tells which switches changed between them.
+    """
+    network_state: dict
+    flow_counters: dict
+    switch_digests: dict
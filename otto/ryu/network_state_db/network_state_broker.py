@@ -1,49 +1,339 @@
-from threading import Thread, Event
+import os
+import time
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+from typing import Optional
 
 from otto.otto_logger.logger_config import logger
+from otto.ryu.network_state_db.agent_run_registry import AgentRunRegistry, StateChangeCallback
+from otto.ryu.network_state_db.network_snapshot import NetworkSnapshot
 from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.ryu_event_listener import RyuEventListener, switches_affected_by
+
+DEFAULT_RECONCILIATION_INTERVAL = 300.0
+DEFAULT_MAX_STALENESS = 5.0
+DEFAULT_MIN_POLL_INTERVAL = 2.0
+DEFAULT_MAX_POLL_INTERVAL = 60.0
+DEFAULT_FULL_SWEEP_INTERVAL = 60.0
 
 
 class NetworkStateBroker(Thread):
+    """
+    Provides the network state to agent runs, and watches the network while they execute.
+
+    The broker holds the latest network snapshot it collected, along with a version (incremented each
+    time a snapshot is stored) and the time it was collected at. Agent runs are given that snapshot as
+    long as it is no older than max_staleness seconds. Otherwise, the network state is collected again;
+    concurrent agent runs needing a new snapshot wait on the same collection rather than each sweeping
+    the controller.
+
+    By default, the broker polls Ryu for the whole network state. In event-driven mode, it subscribes
+    to the topology and flow events of Ryu (see RyuEventListener) and keeps the network state in memory:
+    each event only collects the switches it affects again. The whole network is still collected every
+    reconciliation_interval seconds, and whenever an event websocket (re)connects, to catch up with any
+    change no event was received for.
+
+    In event-driven mode the snapshot is kept up to date by the events, so it is given regardless of its age,
+    except while changes made by agent runs are waiting to be collected. Ryu raises no event for the flows and
+    groups added or modified through its REST API, so the switches agent runs write to (see record_writes) are
+    collected again as if an event had been received for them, and the staleness bound applies until they are.
+    In polling mode, a write starts the next poll.
+
+    Every agent run given a network state is registered until it terminates. Whenever the broker finds a
+    new snapshot, the agent runs given an older network state are notified of the switches which changed
+    (see subscribe).
+
+    In polling mode, the broker only polls while agent runs are registered. Each poll first probes the
+    network (see NetworkStateFinder.probe_network), and the whole network state is only collected when
+    the probe differs from the previous one, or when the snapshot is older than full_sweep_interval.
+    Polls start every min_poll_interval seconds; the interval doubles after each poll which found no
+    change, up to max_poll_interval, and goes back to min_poll_interval once a change is found or a new
+    agent run is registered. The cost and interval of the polls are reported by get_metrics.
+
+    The broker is configured through its constructor or the following environment variables:
+        OTTO_STATE_MAX_STALENESS: age (in seconds) up to which a snapshot is given to agent runs
+        OTTO_STATE_MIN_POLL_INTERVAL: seconds between two polls when the network changes
+        OTTO_STATE_MAX_POLL_INTERVAL: seconds between two polls when the network is quiet
+        OTTO_STATE_FULL_SWEEP_INTERVAL: age (in seconds) at which a poll collects the whole network state
+        OTTO_STATE_EVENTS: set to 1 to follow Ryu events
+        OTTO_STATE_RECONCILIATION_INTERVAL: seconds between two collections of the whole network
+    """
     _nw_state_finder: NetworkStateFinder
+    _event_listener: Optional[RyuEventListener]
+    _network_snapshot: Optional[NetworkSnapshot]
 
-    def __init__(self):
-        self._nw_state_finder = NetworkStateFinder()
-        self.agent_run_network_state_given = {}
+    def __init__(self, event_driven: Optional[bool] = None, reconciliation_interval: Optional[float] = None,
+                 network_state_finder: Optional[NetworkStateFinder] = None, max_staleness: Optional[float] = None,
+                 min_poll_interval: Optional[float] = None, max_poll_interval: Optional[float] = None,
+                 full_sweep_interval: Optional[float] = None):
+        self._nw_state_finder = network_state_finder or NetworkStateFinder()
+        self._agent_runs = AgentRunRegistry()
+        self._flow_counters = {}
         self.stop_event = Event()
 
+        if event_driven is None:
+            event_driven = os.getenv("OTTO_STATE_EVENTS", "0") == "1"
+
+        self._max_staleness = max_staleness if max_staleness is not None else float(
+            os.getenv("OTTO_STATE_MAX_STALENESS", DEFAULT_MAX_STALENESS))
+
+        self._reconciliation_interval = reconciliation_interval or float(
+            os.getenv("OTTO_STATE_RECONCILIATION_INTERVAL", DEFAULT_RECONCILIATION_INTERVAL))
+
+        self._min_poll_interval = min_poll_interval or float(
+            os.getenv("OTTO_STATE_MIN_POLL_INTERVAL", DEFAULT_MIN_POLL_INTERVAL))
+        self._max_poll_interval = max(self._min_poll_interval, max_poll_interval or float(
+            os.getenv("OTTO_STATE_MAX_POLL_INTERVAL", DEFAULT_MAX_POLL_INTERVAL)))
+        self._full_sweep_interval = full_sweep_interval or float(
+            os.getenv("OTTO_STATE_FULL_SWEEP_INTERVAL", DEFAULT_FULL_SWEEP_INTERVAL))
+        self._poll_wakeup = Event()
+
+        self._metrics = {
+            "poll_interval": self._min_poll_interval,
+            "probes": 0,
+            "probe_seconds": 0.0,
+            "last_probe_seconds": None,
+            "full_sweeps": 0,
+            "full_sweep_seconds": 0.0,
+            "last_full_sweep_seconds": None,
+            "switch_refreshes": 0
+        }
+        self._metrics_lock = Lock()
+
+        self._event_listener = None
+
+        if event_driven:
+            self._event_listener = RyuEventListener(on_event=self._on_controller_event,
+                                                    on_connect=self._on_listener_connect,
+                                                    base_url=self._nw_state_finder.base_url)
+
+        self._network_snapshot = None
+        self._snapshot_version = 0
+        self._snapshot_collected_at = 0.0
+        self._snapshot_lock = Lock()
+
+        self._collection_in_flight: Optional[Future] = None
+        self._collection_lock = Lock()
+
+        self._changed_switches, self._removed_switches = set(), set()
+        self._reconciliation_requested = False
+        # number of record_writes calls, and how many of them the snapshot held by the broker follows
+        self._writes_recorded, self._writes_collected = 0, 0
+        self._events_lock = Lock()
+        self._events_pending = Event()
+
         super().__init__()
 
-    def provide_network_state(self, agent_run_id: str) -> dict:
+    @property
+    def event_driven(self) -> bool:
+        return self._event_listener is not None
+
+    @property
+    def snapshot_version(self) -> int:
+        """Version of the snapshot held by the broker, 0 until a snapshot is collected"""
+        with self._snapshot_lock:
+            return self._snapshot_version
+
+    @property
+    def snapshot_age(self) -> Optional[float]:
+        """Seconds since the snapshot held by the broker was collected, None until a snapshot is collected"""
+        with self._snapshot_lock:
+            if self._network_snapshot is None:
+                return None
+
+            return time.monotonic() - self._snapshot_collected_at
+
+    @property
+    def agent_run_network_state_given(self) -> dict[str, str]:
+        """ID of the network state given to each registered agent run, as {agent run ID: state ID}"""
+        return self._agent_runs.given_state_ids()
+
+    def provide_network_state(self, agent_run_id: str, max_staleness: Optional[float] = None) -> dict:
         """
         Method to provide the current network state to an agent. An agent will call
         this method with the ID of the current agent run, and the method will provide
-        the current network state found through the get_network_state method in the
-        NetworkStateFinder class. A dictionary containing agent run IDs mapped with the
-        network state ID is created, to be checked in the run method of the thread.
+        the current network state found through the get_network_snapshot method in the
+        NetworkStateFinder class. The agent run is registered with the network state it
+        was given, so it can be notified of the changes made after, see subscribe.
+        The network state ID only covers the configuration of the network. The flow counters
+        found alongside it are kept by the broker, see provide_flow_counters.
+
+        The snapshot held by the broker is provided if it is fresh enough, see get_network_snapshot.
+
+        Args:
+            agent_run_id: ID of the agent run
+            max_staleness: overrides the max_staleness of the broker for this agent run
 
         Returns:
             Dictionary containing the current network state.
         """
-        found_network_state = self._nw_state_finder.get_network_state()
+        network_snapshot = self.get_network_snapshot(max_staleness)
+
+        found_network_state = network_snapshot["network_state"]
         state_id = next(iter(found_network_state), None)
 
         if state_id is None:
             raise Exception("State ID is None.")
 
-        self.agent_run_network_state_given[agent_run_id] = state_id
+        self._agent_runs.register(agent_run_id, network_snapshot)
+        self._poll_wakeup.set()
+
+        latest_snapshot = self.current_network_snapshot()
+
+        if latest_snapshot is not network_snapshot:
+            # a newer snapshot was stored before the agent run was registered
+            self._agent_runs.notify(latest_snapshot)
+        self._flow_counters = network_snapshot["flow_counters"]
 
         return found_network_state
 
+    def provide_flow_counters(self) -> dict:
+        """
+        Method to provide the packet and byte counters of the installed flows, found with the last
+        network state provided. Follows the form {switch DPID: {flow hash: {packet_count, byte_count}}},
+        where each flow hash is a key of installedFlows in the network state.
+        """
+        return self._flow_counters
+
+    def get_network_snapshot(self, max_staleness: Optional[float] = None) -> NetworkSnapshot:
+        """
+        Method to return the snapshot held by the broker if it is no older than max_staleness seconds
+        (or if it is kept up to date by Ryu events and follows every write of the agent runs), and to collect
+        a new one otherwise.
+
+        Args:
+            max_staleness: overrides the max_staleness of the broker. 0 always collects a new snapshot.
+        """
+        max_staleness = self._max_staleness if max_staleness is None else max_staleness
+
+        with self._snapshot_lock:
+            network_snapshot = self._network_snapshot
+            snapshot_age = time.monotonic() - self._snapshot_collected_at
+
+        if network_snapshot is not None and (snapshot_age <= max_staleness or
+                                             self.event_driven and self._follows_writes()):
+            return network_snapshot
+
+        return self._collect_network_snapshot()
+
+    def get_metrics(self) -> dict:
+        """
+        Method to return the metrics of the broker:
+            poll_interval: seconds until the next poll
+            probes, probe_seconds, last_probe_seconds: number and duration of the probes made by the polls
+            full_sweeps, full_sweep_seconds, last_full_sweep_seconds: number and duration of the
+            collections of the whole network state
+            switch_refreshes: number of switches collected again following Ryu events
+            snapshot_version, snapshot_age: see the properties of the same name
+            agent_runs: number of registered agent runs
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        metrics.update({
+            "snapshot_version": self.snapshot_version,
+            "snapshot_age": self.snapshot_age,
+            "agent_runs": len(self._agent_runs),
+            "event_driven": self.event_driven
+        })
+
+        return metrics
+
+    def current_network_snapshot(self) -> Optional[NetworkSnapshot]:
+        """
+        Method to return the snapshot held by the broker whatever its age, or None if the
+        broker has not collected the network state yet.
+        """
+        with self._snapshot_lock:
+            return self._network_snapshot
+
+    def _collect_network_snapshot(self) -> NetworkSnapshot:
+        """
+        Collects the whole network state and stores it as the snapshot held by the broker. If a
+        collection is already in flight, waits for it and returns its snapshot instead of starting
+        another one. Errors are raised to every caller waiting on the collection.
+        """
+        with self._collection_lock:
+            collection = self._collection_in_flight
+            collecting = collection is None
+
+            if collecting:
+                collection = self._collection_in_flight = Future()
+
+        if not collecting:
+            return collection.result()
+
+        try:
+            sweep_started = time.monotonic()
+
+            with self._events_lock:
+                writes_recorded = self._writes_recorded
+
+            network_snapshot = self._nw_state_finder.get_network_snapshot()
+            self._store_network_snapshot(network_snapshot, writes_recorded)
+
+            self._record_metric("full_sweep", time.monotonic() - sweep_started)
+
+            collection.set_result(network_snapshot)
+
+        except Exception as e:
+            collection.set_exception(e)
+            raise
+
+        finally:
+            with self._collection_lock:
+                self._collection_in_flight = None
+
+        return network_snapshot
+
+    def subscribe(self, agent_run_id: str, callback: Optional[StateChangeCallback] = None) -> Event:
+        """
+        Method for an agent run to be notified when the network changes after it was given its network state.
+
+        Args:
+            agent_run_id: ID of an agent run given a network state with provide_network_state
+            callback: called with the agent run ID and the set of DPIDs of the switches which changed
+            since the network state was given, each time more switches are found to have changed
+        Returns:
+            Event set once any switch changed, see changed_switches
+        """
+        return self._agent_runs.subscribe(agent_run_id, callback)
+
+    def changed_switches(self, agent_run_id: str) -> set[str]:
+        """Method to return the DPIDs of the switches which changed since an agent run was given its network state"""
+        return self._agent_runs.changed_switches(agent_run_id)
+
+    def record_writes(self, agent_run_id: str, switches: set[str]) -> None:
+        """
+        Method for an agent run to report the switches it changed, so it is not notified of its own changes,
+        and the switches are collected again (at the next poll in polling mode).
+
+        Args:
+            agent_run_id: ID of an agent run given a network state with provide_network_state
+            switches: DPIDs of the switches the agent run changed
+        """
+        self._agent_runs.record_writes(agent_run_id, switches)
+
+        if not self.event_driven:
+            self._poll_wakeup.set()
+            return
+
+        # no Ryu event is raised for these changes, so the switches are collected again as for an event
+        with self._events_lock:
+            self._removed_switches.difference_update(switches)
+            self._changed_switches.update(switches)
+            self._writes_recorded += 1
+
+            self._events_pending.set()
+
     def terminate_agent_run(self, agent_run_id: str) -> None:
         """
-        Removes the agent run ID from the agent_run_network_state_given dictionary once
-        an agent has finished executing.
+        Unregisters the agent run once an agent has finished executing.
         """
 
         try:
-            print("Deleting...")
-            del self.agent_run_network_state_given[agent_run_id]
+            logger.debug(f"Unregistering agent run {agent_run_id}")
+            self._agent_runs.unregister(agent_run_id)
 
         except KeyError as e:
             raise Exception(f"Could not find ID for the provided agent run: {e}")
@@ -51,18 +341,202 @@ class NetworkStateBroker(Thread):
         except Exception as e:
             raise Exception(f"An error occurred whilst attempting to unregister the agent run: {e}")
 
+    def stop(self) -> None:
+        """
+        Stops the broker thread and its event listener, waits for the thread to exit, and releases the
+        resources of the NetworkStateFinder (see NetworkStateFinder.close).
+        """
+        self.stop_event.set()
+        self._events_pending.set()
+        self._poll_wakeup.set()
+
+        if self.is_alive():
+            self.join()
+
+        self._nw_state_finder.close()
+
     def run(self):
         """
         Overwritten run method of the parent Thread class. While the event is not set,
-        go through each
+        go through each agent run in polling mode, or apply the Ryu events received in
+        event-driven mode.
         """
+        if self.event_driven:
+            self._event_listener.start()
+
+            try:
+                self._follow_events()
+            finally:
+                self._event_listener.stop()
+
+            return
+
+        self._poll()
+
+    def _poll(self) -> None:
+        poll_interval, previous_probe = self._min_poll_interval, None
+
+        while not self.stop_event.is_set():
+            if not len(self._agent_runs):
+                # nothing to watch until an agent run is registered
+                self._poll_wakeup.wait()
+                self._poll_wakeup.clear()
+
+                poll_interval, previous_probe = self._min_poll_interval, None
+                continue
+
+            network_changed, previous_probe = self._poll_once(previous_probe)
+
+            if network_changed:
+                poll_interval = self._min_poll_interval
+            else:
+                poll_interval = min(poll_interval * 2, self._max_poll_interval)
+
+            with self._metrics_lock:
+                self._metrics["poll_interval"] = poll_interval
+
+            if self._poll_wakeup.wait(poll_interval):
+                # a new agent run was registered
+                self._poll_wakeup.clear()
+                poll_interval = self._min_poll_interval
+
+    def _poll_once(self, previous_probe: Optional[dict]) -> tuple[bool, Optional[dict]]:
+        """
+        Probes the network, and collects the whole network state if the probe changed or the snapshot
+        is older than full_sweep_interval. Registered agent runs are notified of any change when the
+        snapshot is stored.
+
+        Returns:
+            whether the network changed, and the probe to compare the next poll with
+        """
+        probe_started = time.monotonic()
+
+        try:
+            probe = self._nw_state_finder.probe_network()
+        except Exception as e:
+            logger.warn(f"Could not probe the network state: {e}")
+            return False, previous_probe
+
+        self._record_metric("probe", time.monotonic() - probe_started)
+
+        probe_changed = previous_probe is not None and probe != previous_probe
+        snapshot_age = self.snapshot_age
+
+        if not probe_changed and snapshot_age is not None and snapshot_age < self._full_sweep_interval:
+            return False, probe
+
+        snapshot_before = self.current_network_snapshot()
+
+        try:
+            network_snapshot = self._collect_network_snapshot()
+        except Exception as e:
+            logger.warn(f"Could not collect the network state: {e}")
+            return probe_changed, probe
+
+        state_changed = snapshot_before is None or \
+            next(iter(network_snapshot["network_state"])) != next(iter(snapshot_before["network_state"]))
+
+        logger.debug(f"Polled the network state: probe changed: {probe_changed}, state changed: {state_changed}")
+
+        return probe_changed or state_changed, probe
+
+    def _record_metric(self, operation: str, duration: float) -> None:
+        with self._metrics_lock:
+            self._metrics[f"{operation}s"] += 1
+            self._metrics[f"{operation}_seconds"] += duration
+            self._metrics[f"last_{operation}_seconds"] = duration
+
+    def _follow_events(self) -> None:
+        next_reconciliation = time.monotonic()
 
         while not self.stop_event.is_set():
-            for agent_run, given_network_state in self.agent_run_network_state_given.items():
-                logger.info(f"Checking {agent_run} with state {given_network_state}")
-                current_network_state = self._nw_state_finder.get_network_state()
+            self._events_pending.wait(max(0.0, next_reconciliation - time.monotonic()))
+
+            if self.stop_event.is_set():
+                break
+
+            with self._events_lock:
+                changed_switches, self._changed_switches = self._changed_switches, set()
+                removed_switches, self._removed_switches = self._removed_switches, set()
+                reconciliation_requested, self._reconciliation_requested = self._reconciliation_requested, False
+                writes_recorded = self._writes_recorded
+                self._events_pending.clear()
+
+            network_snapshot = self.current_network_snapshot()
+
+            if reconciliation_requested or network_snapshot is None or time.monotonic() >= next_reconciliation:
+                if self._reconcile():
+                    next_reconciliation = time.monotonic() + self._reconciliation_interval
+                else:
+                    next_reconciliation = time.monotonic() + min(self._reconciliation_interval, 10)
+
+                continue
+
+            try:
+                self._store_network_snapshot(
+                    self._nw_state_finder.refresh_network_snapshot(network_snapshot, changed_switches,
+                                                                   removed_switches),
+                    writes_recorded
+                )
+
+                with self._metrics_lock:
+                    self._metrics["switch_refreshes"] += len(changed_switches)
+            except Exception as e:
+                logger.warn(f"Could not apply changes to switches {sorted(changed_switches)}: {e}. "
+                            "Collecting the whole network state instead")
+                self._request_reconciliation()
+
+    def _reconcile(self) -> bool:
+        """Collects the whole network state. Returns whether it could be collected."""
+        try:
+            self._collect_network_snapshot()
+        except Exception as e:
+            logger.warn(f"Could not collect the network state: {e}")
+            return False
+
+        return True
+
+    def _store_network_snapshot(self, network_snapshot: NetworkSnapshot, writes_recorded: int) -> None:
+        """
+        Stores a snapshot collected after the first writes_recorded writes of the agent runs, and notifies
+        the agent runs of its changes.
+        """
+        with self._snapshot_lock:
+            self._network_snapshot = network_snapshot
+            self._snapshot_version += 1
+            self._snapshot_collected_at = time.monotonic()
+
+        with self._events_lock:
+            self._writes_collected = max(self._writes_collected, writes_recorded)
+
+        self._agent_runs.notify(network_snapshot)
+
+    def _follows_writes(self) -> bool:
+        """Returns whether the snapshot held by the broker was collected after every write of the agent runs"""
+        with self._events_lock:
+            return self._writes_collected == self._writes_recorded
+
+    def _on_controller_event(self, method: str, params: dict) -> None:
+        changed_switches, removed_switches = switches_affected_by(method, params)
+
+        if not changed_switches and not removed_switches:
+            return
+
+        logger.debug(f"Ryu event {method} changed switches {sorted(changed_switches | removed_switches)}")
+
+        with self._events_lock:
+            self._changed_switches.difference_update(removed_switches)
+            self._removed_switches.difference_update(changed_switches)
+
+            self._changed_switches.update(changed_switches)
+            self._removed_switches.update(removed_switches)
+
+            self._events_pending.set()
 
-                if current_network_state != given_network_state:
-                    logger.warn("Changes Found in Network State. Need to interrupt agent..")
+    def _on_listener_connect(self, event_url: str) -> None:
+        self._request_reconciliation()
 
-            self.stop_event.wait(10)
+    def _request_reconciliation(self) -> None:
+        with self._events_lock:
+            self._reconciliation_requested = True
+            self._events_pending.set()
@@ -0,0 +1,85 @@
+"""
+The Ryu REST API calls made to collect the network state: the path of each call, the exception its errors are
+raised as, and the function turning its response into the structure stored in the network state. Shared by the
+NetworkStateFinder and the AsyncNetworkStateFinder, which only differ in how the calls are made.
+"""
+
+from typing import Any, Callable, NamedTuple, Optional
+
+from otto.exceptions import (FlowRetrievalException, HostRetrievalException,
+                             PortMappingException, PortRetrievalException,
+                             SwitchRetrievalException)
+from otto.ryu.network_state_db.network_state_format import (format_all_connected_hosts, format_all_port_mappings,
+                                                            format_all_ports, format_connected_hosts,
+                                                            format_installed_flows, format_installed_groups,
+                                                            format_port_mappings, format_ports)
+
+
+def format_flow_count(switch_id: str, aggregate_flow: dict) -> int:
+    """Returns the number of flows installed on a switch, from its /stats/aggregateflow response"""
+    aggregate_stats = aggregate_flow.get(switch_id, [])
+
+    return aggregate_stats[0]["flow_count"] if aggregate_stats else 0
+
+
+class RyuCall(NamedTuple):
+    """
+    Attributes:
+        path: path of the Ryu API, where {switch} is replaced by the switch the call is made for
+        exception: exception raised when the call fails
+        parse: called with the switch and the decoded response, returns what the call collected
+    """
+    path: str
+    exception: type[Exception]
+    parse: Callable[[Optional[str], Any], Any]
+
+
+SWITCHES = RyuCall("/stats/switches", SwitchRetrievalException,
+                   lambda switch, switches: switches)
+PORTS = RyuCall("/v1.0/topology/switches/{switch}", PortRetrievalException,
+                lambda switch, switch_details: format_ports(switch_details))
+PORT_MAPPINGS = RyuCall("/v1.0/topology/links/{switch}", PortMappingException,
+                        lambda switch, links_found: format_port_mappings(links_found))
+CONNECTED_HOSTS = RyuCall("/v1.0/topology/hosts/{switch}", HostRetrievalException, format_connected_hosts)
+ALL_PORTS = RyuCall("/v1.0/topology/switches", PortRetrievalException,
+                    lambda switch, switches_found: format_all_ports(switches_found))
+ALL_PORT_MAPPINGS = RyuCall("/v1.0/topology/links", PortMappingException,
+                            lambda switch, links_found: format_all_port_mappings(links_found))
+ALL_CONNECTED_HOSTS = RyuCall("/v1.0/topology/hosts", HostRetrievalException,
+                              lambda switch, hosts_discovered: format_all_connected_hosts(hosts_discovered))
+INSTALLED_GROUPS = RyuCall("/stats/groupdesc/{switch}", HostRetrievalException, format_installed_groups)
+INSTALLED_FLOWS = RyuCall("/stats/flow/{switch}", FlowRetrievalException, format_installed_flows)
+FLOW_COUNT = RyuCall("/stats/aggregateflow/{switch}", FlowRetrievalException, format_flow_count)
+
+
+def call_path(call: RyuCall, switch: Optional[str] = None) -> str:
+    """Returns the path to make a call for a switch"""
+    return call.path.format(switch=switch)
+
+
+def call_error(call: RyuCall, path: str, error: Exception, reached: bool = True) -> Exception:
+    """
+    Returns the exception a failed call is raised as.
+    Args:
+        call: the call which failed
+        path: path the call was made on
+        error: error raised by the transport
+        reached: whether Ryu answered the call (with an error status). Otherwise, the applications Ryu must run
+        are listed.
+    """
+    if reached:
+        return call.exception(
+            f"""
+            Error while contacting API {path}.
+            Exception raised: {error}
+            """
+        )
+
+    return call.exception(
+        f"""
+        Error while contacting API {path}.
+        Please ensure you run Ryu with the following applications:\n
+        ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
+        Exception raised: {error}
+        """
+    )
@@ -1,43 +1,244 @@
-import hashlib
-import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
 
-import requests
 from requests.exceptions import ConnectionError, HTTPError
 
-from otto.exceptions import (FlowRetrievalException, HostRetrievalException,
-                             PortMappingException, PortRetrievalException,
-                             SwitchRetrievalException)
+from otto.ryu.network_state_db.async_network_state_finder import AsyncNetworkStateFinder, EventLoopThread
+from otto.ryu.network_state_db.network_snapshot import NetworkSnapshot
+from otto.ryu.network_state_db.network_state_calls import (ALL_CONNECTED_HOSTS, ALL_PORT_MAPPINGS, ALL_PORTS,
+                                                           CONNECTED_HOSTS, FLOW_COUNT, INSTALLED_FLOWS,
+                                                           INSTALLED_GROUPS, PORT_MAPPINGS, PORTS, SWITCHES,
+                                                           RyuCall, call_error, call_path)
+from otto.ryu.network_state_db.network_state_format import create_network_snapshot, update_network_snapshot
+from otto.ryu.network_state_db.network_state_hasher import NetworkStateHasher
+from otto.ryu.ryu_transport import AsyncRyuTransport, RyuTransport
+
+
+DEFAULT_MAX_WORKERS = 16
 
 
 class NetworkStateFinder:
+    _transport: RyuTransport
+    _max_workers: int
+    _request_timeout: Optional[float]
+    _bulk_topology: bool
+    _state_hasher: NetworkStateHasher
+    _async_finder: Optional[AsyncNetworkStateFinder]
+
+    _empty_topology = {"ports": list, "portMappings": dict, "connectedHosts": dict}
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 request_timeout: Optional[float] = None,
+                 transport: Optional[RyuTransport] = None,
+                 use_asyncio: bool = False,
+                 bulk_topology: bool = True):
+        """
+        Args:
+            max_workers: upper bound on the number of Ryu API calls in flight while collecting
+            the network state. A value of 1 collects each switch one call at a time.
+            request_timeout: deadline (in seconds) applied to every individual Ryu API call.
+            Defaults to the read timeout of the transport.
+            transport: RyuTransport used to contact the Ryu REST API. Defaults to the shared transport.
+            use_asyncio: collect the network state (get_network_snapshot, refresh_network_snapshot and
+            probe_network) through an AsyncNetworkStateFinder running on a background event loop instead of
+            a pool of worker threads. max_workers then bounds the number of calls in flight on the event
+            loop. The event loop and its connections are released by close.
+            bulk_topology: collect the ports, port mappings and connected hosts of the whole network with
+            one call each to the unfiltered /v1.0/topology APIs, instead of three calls per switch.
+        """
+        self._transport = transport or RyuTransport.get_instance()
+        self._max_workers = max(1, max_workers)
+        self._request_timeout = request_timeout
+        self._bulk_topology = bulk_topology
+        self._state_hasher = NetworkStateHasher()
+
+        self._async_finder, self._event_loop_thread = None, None
+
+        if use_asyncio:
+            async_transport = AsyncRyuTransport(base_url=self._transport.base_url,
+                                                pool_size=self._transport.pool_size,
+                                                connect_timeout=self._transport.connect_timeout,
+                                                read_timeout=self._transport.read_timeout)
+
+            self._async_finder = AsyncNetworkStateFinder(max_concurrency=self._max_workers,
+                                                         request_timeout=request_timeout,
+                                                         transport=async_transport,
+                                                         bulk_topology=bulk_topology)
+            self._event_loop_thread = EventLoopThread()
+
+    def __enter__(self) -> "NetworkStateFinder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Method to stop the event loop of a finder created with use_asyncio, and close its connections.
+        The RyuTransport of the finder is left open, as it may be shared.
+        """
+        if self._async_finder is None:
+            return
+
+        try:
+            self._event_loop_thread.run(self._async_finder.close())
+        finally:
+            self._event_loop_thread.close()
+            self._async_finder, self._event_loop_thread = None, None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL of the Ryu controller the network state is collected from"""
+        return self._transport.base_url
 
     def get_network_state(self) -> dict:
         """
-        Method to find the current network state. First obtains a list of current
-        switches found in the network and then uses the get_switch_details method
-        to create a dictionary for each switch. Each dictionary created for a switch
-        is aggregated into one dictionary to represent the current network state.
-        Creates a SHA256 Hash of the dictionary to uniquely identify the current
-        network state
+        Method to find the current network state. Returns the configuration part of the
+        NetworkSnapshot found by get_network_snapshot, in the form {state ID: network elements}.
+        The installed flows do not include their packet and byte counters, so the state ID only
+        changes when the configuration of the network changes.
 
         Returns:
             dict: dictionary representing the current network state
         """
+        return self.get_network_snapshot()["network_state"]
+
+    def get_network_snapshot(self) -> NetworkSnapshot:
+        """
+        Method to find the current network state. First obtains a list of current
+        switches found in the network and then collects the ports, port mappings, connected
+        hosts, installed flows and installed groups of every switch. The ports, port mappings and
+        connected hosts of all switches are collected with three calls to the unfiltered topology
+        APIs, unless the finder was created with bulk_topology=False. These calls are spread over
+        a bounded pool of worker threads, so all switches are collected concurrently.
+        Each dictionary created for a switch is aggregated into one dictionary to represent
+        the current network state. The packet and byte counters of the installed flows are split
+        out of the network state, and the remaining configuration is hashed per flow, per switch and
+        for the whole network (see NetworkStateHasher) to uniquely identify the current network state.
+        Only the switches which changed since the previous call are rehashed.
+
+        When created with use_asyncio, the network state is collected by the AsyncNetworkStateFinder.
+
+        Returns:
+            NetworkSnapshot: the configuration of the network keyed by its state ID, and the flow counters
+        """
+        if self._async_finder is not None:
+            return self._event_loop_thread.run(self._async_finder.get_network_snapshot())
+
         found_switches = self.get_switches()
 
-        network_elements, current_nw_state = {}, {}
+        executor = None
+
+        if self._max_workers > 1:
+            executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="nw_state_finder")
+
+        try:
+            pending_topology = {}
+
+            if self._bulk_topology:
+                pending_topology = {
+                    "ports": self._submit(executor, self.get_all_ports),
+                    "portMappings": self._submit(executor, self.get_all_port_mappings),
+                    "connectedHosts": self._submit(executor, self.get_all_connected_hosts)
+                }
+
+            pending_switches = [self._submit_switch_details(executor, str(switch)) for switch in found_switches]
+
+            network_elements = {}
+
+            for pending_switch in pending_switches:
+                switch_info = {}
+
+                for field, value in pending_switch.items():
+                    if isinstance(value, Future):
+                        switch_info[field] = value.result()
+
+                    elif value is None:
+                        # collected in bulk for the whole fabric
+                        switch_info[field] = pending_topology[field].result().get(pending_switch["name"],
+                                                                                  self._empty_topology[field]())
+                    else:
+                        switch_info[field] = value
+
+                network_elements[switch_info["name"]] = switch_info
+        finally:
+            if executor is not None:
+                # if a call fails, the exception is raised from result() above; don't wait on calls not yet started
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return create_network_snapshot(network_elements, self._state_hasher)
 
-        for switch in found_switches:
-            switch_info = self.get_switch_details(str(switch))
+    def refresh_network_snapshot(self, network_snapshot: NetworkSnapshot, changed_switches: set[str],
+                                 removed_switches: set[str] = frozenset()) -> NetworkSnapshot:
+        """
+        Method to update a NetworkSnapshot after some switches changed, e.g. following a Ryu event.
+        Only the changed switches are collected again (with get_switch_details, concurrently); the
+        removed switches are dropped, and every other switch is kept from the given snapshot along
+        with its flow counters.
+        Args:
+            network_snapshot: the snapshot to update
+            changed_switches: DPIDs of the switches to collect again
+            removed_switches: DPIDs of the switches which left the network
+        Returns:
+            NetworkSnapshot: the updated snapshot, with a new state ID if the configuration changed
+        """
+        changed_switches = set(changed_switches) - set(removed_switches)
+
+        if self._async_finder is not None:
+            refreshed_switches = self._event_loop_thread.run(
+                self._async_finder.get_switches_details(changed_switches)
+            )
+
+            return update_network_snapshot(network_snapshot, refreshed_switches, removed_switches, self._state_hasher)
+
+        executor = None
+
+        if self._max_workers > 1 and len(changed_switches) > 1:
+            executor = ThreadPoolExecutor(max_workers=min(self._max_workers, len(changed_switches)),
+                                          thread_name_prefix="nw_state_finder")
+
+        try:
+            pending_switches = {switch: self._submit(executor, self.get_switch_details, str(int(switch, 16)))
+                                for switch in changed_switches}
 
-            network_elements[switch_info["name"]] = switch_info
+            refreshed_switches = {switch: pending_switch.result()
+                                  for switch, pending_switch in pending_switches.items()}
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
 
-        current_network_state_id = hashlib.sha256(
-            json.dumps(network_elements, sort_keys=True).encode('utf-8')).hexdigest()
+        return update_network_snapshot(network_snapshot, refreshed_switches, removed_switches, self._state_hasher)
 
-        current_nw_state[current_network_state_id] = network_elements
+    def probe_network(self) -> dict[str, int]:
+        """
+        Method to cheaply check whether the network may have changed, without collecting the whole
+        network state. Obtains the list of current switches, and the number of flows installed on
+        each switch from the /stats/aggregateflow/{dpid} Ryu API, which only returns counters.
+        Two different probes mean the network changed; equal probes do not rule out a change
+        which keeps the same number of flows, or a change to the topology.
 
-        return current_nw_state
+        Returns:
+            dict: number of flows installed on each switch, keyed by switch DPID
+        """
+        if self._async_finder is not None:
+            return self._event_loop_thread.run(self._async_finder.probe_network())
+
+        found_switches = self.get_switches()
+
+        executor = None
+
+        if self._max_workers > 1 and len(found_switches) > 1:
+            executor = ThreadPoolExecutor(max_workers=min(self._max_workers, len(found_switches)),
+                                          thread_name_prefix="nw_state_finder")
+
+        try:
+            pending_flow_counts = {format(switch, '016x'): self._submit(executor, self.get_flow_count, str(switch))
+                                   for switch in found_switches}
+
+            return {switch: pending_flow_count.result() for switch, pending_flow_count in pending_flow_counts.items()}
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
 
     def get_switch_details(self, switch_id: str) -> dict:
         switch_hex_dpid = format(int(switch_id), '016x')  # need to write as 16 hex DPID for some RYU API calls
@@ -53,223 +254,148 @@ class NetworkStateFinder:
 
         return switch_struct
 
-    @staticmethod
-    def get_switches() -> list[int]:
+    def _submit_switch_details(self, executor: Optional[ThreadPoolExecutor], switch_id: str) -> dict:
         """
-        Method to obtain a list of switches in the current network using
-        the /stats/switches Ryu API. Returns a list of each switch's datapath
-        e.g. [5,4,1,2]
+        Submits the Ryu API calls needed to describe a switch to the given executor.
+        Returns a dictionary with the same layout as get_switch_details, where each
+        value is a Future of the corresponding call. When the topology is collected in bulk,
+        the ports, port mappings and connected hosts are left as None.
         """
-        try:
-            switch_list = requests.get('http://127.0.0.1:8080/stats/switches')
-            switch_list.raise_for_status()
-        except HTTPError as e:
-            raise SwitchRetrievalException(
-                f"""
-                Error while contacting API /stats/switches.
-                Exception raised: {e}
-                """
-            )
+        switch_hex_dpid = format(int(switch_id), '016x')
 
-        except ConnectionError as e:
-            raise SwitchRetrievalException(
-                f"""
-                Error while contacting API /stats/switches.
-                Please ensure you run Ryu with the following applications:\n
-                ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
-                Exception raised: {e}
-                """
-            )
+        pending_switch = {
+            "name": switch_hex_dpid,
+            "ports": None,
+            "portMappings": None,
+            "connectedHosts": None,
+            "installedFlows": self._submit(executor, self.get_installed_flows, switch_id),
+            "installedGroups": self._submit(executor, self.get_installed_groups, switch_id)
+        }
 
-        except Exception as e:
-            raise SwitchRetrievalException(e)
+        if not self._bulk_topology:
+            pending_switch["ports"] = self._submit(executor, self.get_ports, switch_hex_dpid)
+            pending_switch["portMappings"] = self._submit(executor, self.get_port_mappings, switch_hex_dpid)
+            pending_switch["connectedHosts"] = self._submit(executor, self.get_connected_hosts, switch_hex_dpid)
 
-        return switch_list.json()
+        return pending_switch
 
     @staticmethod
-    def get_ports(switch_dpid: str) -> list:
+    def _submit(executor: Optional[ThreadPoolExecutor], function, *args) -> Future:
         """
-        Method to return a list of ports for a given switch
-        using the /topology/switches/{dpid} Ryu API. Returns
-        a dictionary for each port including physical address,
-        port number and port name.
+        Submits a call to the executor. Without an executor the call is made straight away and
+        its outcome is returned as a completed Future.
         """
-        try:
-            switch_details = requests.get(f"http://127.0.0.1:8080/v1.0/topology/switches/{switch_dpid}")
-            switch_details.raise_for_status()
-        except HTTPError as e:
-            raise PortRetrievalException(
-                f"""
-                Error while contacting API /V1.0/topology/switches.
-                Exception raised: {e}
-                """
-            )
+        if executor is not None:
+            return executor.submit(function, *args)
 
-        except ConnectionError as e:
-            raise PortRetrievalException(
-                f"""
-                Error while contacting API /V1.0/topology/switches.
-                Please ensure you run Ryu with the following applications:\n
-                ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
-                Exception raised: {e}
-                """
-            )
+        completed_call = Future()
 
+        try:
+            completed_call.set_result(function(*args))
         except Exception as e:
-            raise PortRetrievalException(e)
+            completed_call.set_exception(e)
 
-        if len(switch_details.json()) and 'ports' in switch_details.json()[0]:
-            retrieved_switch_ports = switch_details.json()[0]['ports']
+        return completed_call
 
-            for port in retrieved_switch_ports:
-                del port['dpid']  # we don't need to include the dpid in each port desc, so remove it
-
-            return retrieved_switch_ports
+    def get_switches(self) -> list[int]:
+        """
+        Method to obtain a list of switches in the current network using
+        the /stats/switches Ryu API. Returns a list of each switch's datapath
+        e.g. [5,4,1,2]
+        """
+        return self._fetch(SWITCHES)
 
-        return []
+    def get_ports(self, switch_dpid: str) -> list:
+        """
+        Method to return a list of ports for a given switch
+        using the /topology/switches/{dpid} Ryu API. Returns
+        a dictionary for each port including physical address,
+        port number and port name.
+        """
+        return self._fetch(PORTS, switch_dpid)
 
-    @staticmethod
-    def get_port_mappings(switch_dpid: str) -> dict:
+    def get_port_mappings(self, switch_dpid: str) -> dict:
         """
         Method which returns the port mappings for each port on a switch.
         Uses the /topology/links/{dpid} Ryu API and returns a dictionary
         which follows the form src : dst, where src and dst are port names
         e.g. s1-eth1 : s4-eth2
         """
-        try:
-            links_found = requests.get(f"http://127.0.0.1:8080/v1.0/topology/links/{switch_dpid}")
-            links_found.raise_for_status()
-        except HTTPError as e:
-            raise PortMappingException(
-                f"""
-                Error while contacting API /v1.0/topology/links.
-                Please ensure you run Ryu with the following applications:\n
-                ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
-                Exception raised: {e}
-                """
-            )
-
-        except Exception as e:
-            raise PortMappingException(e)
-
-        switch_port_mapping = {}
-
-        links_found = links_found.json()
-
-        if len(links_found):
-            for port_mapping in links_found:
-                source_port = port_mapping['src']['name']
-                destination = port_mapping['dst']['name']
-
-                switch_port_mapping[source_port] = destination
-
-        return switch_port_mapping
-
-    @staticmethod
-    def get_connected_hosts(switch_dpid: str) -> dict:
-        try:
-            hosts_discovered = requests.get(f"http://127.0.0.1:8080/v1.0/topology/hosts/{switch_dpid}")
-            hosts_discovered.raise_for_status()
-        except HTTPError as e:
-            raise HostRetrievalException(
-                f"""
-                Error while contacting API /v1.0/topology/hosts.
-                Please ensure you run Ryu with the following applications:\n
-                ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
-                Exception raised: {e}
-                """
-            )
+        return self._fetch(PORT_MAPPINGS, switch_dpid)
 
-        except Exception as e:
-            raise HostRetrievalException(e)
+    def get_connected_hosts(self, switch_dpid: str) -> dict:
+        return self._fetch(CONNECTED_HOSTS, switch_dpid)
 
-        host_mappings = {}
+    def get_all_ports(self) -> dict:
+        """
+        Method to return the ports of every switch in the network with one call to the
+        unfiltered /v1.0/topology/switches Ryu API. Returns a dictionary keyed by switch DPID,
+        where each value follows the format returned by get_ports.
+        """
+        return self._fetch(ALL_PORTS)
 
-        hosts_discovered = hosts_discovered.json()
+    def get_all_port_mappings(self) -> dict:
+        """
+        Method to return the port mappings of every switch in the network with one call to the
+        unfiltered /v1.0/topology/links Ryu API. Returns a dictionary keyed by switch DPID,
+        where each value follows the format returned by get_port_mappings.
+        """
+        return self._fetch(ALL_PORT_MAPPINGS)
 
-        if hosts_discovered:
-            host_count = 1
-            for connected_host in hosts_discovered:
-                connected_port = connected_host['port']['name']
+    def get_all_connected_hosts(self) -> dict:
+        """
+        Method to return the hosts connected to every switch in the network with one call to the
+        unfiltered /v1.0/topology/hosts Ryu API. Returns a dictionary keyed by switch DPID,
+        where each value follows the format returned by get_connected_hosts.
+        """
+        return self._fetch(ALL_CONNECTED_HOSTS)
 
-                host_id = f"host-{str(int(switch_dpid, 16))}-{str(host_count)}"
+    def get_installed_groups(self, switch_id: str):
+        return self._fetch(INSTALLED_GROUPS, switch_id)
 
-                host_details = {
-                    'id': host_id,
-                    'mac': connected_host['mac'],
-                    'ipv4': connected_host['ipv4'],
-                    'ipv6': connected_host['ipv6']
-                }
+    def get_flow_count(self, switch_id: str) -> int:
+        """
+        Method to return the number of flows installed on a switch, using the
+        /stats/aggregateflow/{dpid} Ryu API.
+        """
+        return self._fetch(FLOW_COUNT, switch_id)
 
-                host_mappings[connected_port] = host_details
+    def get_installed_flows(self, switch_dpid: str) -> dict:
+        return self._fetch(INSTALLED_FLOWS, switch_dpid)
 
-                host_count += 1
+    def get_matching_flows(self, switch_id: str, flow_filter: dict) -> dict:
+        """
+        Returns the flows of a switch which pass a filter, in the same format as get_installed_flows. Uses the
+        /stats/flow/{dpid} Ryu API with the filter as a POST body, so only the matching flows are sent back
+        instead of every flow of the switch.
+        Args:
+            switch_id: ID of the switch (in decimal)
+            flow_filter: any of table_id, priority, match, cookie and cookie_mask. Flows match when their
+            match criteria contain all the criteria of the filter.
+        """
+        return self._fetch(INSTALLED_FLOWS, switch_id, flow_filter)
 
-        return host_mappings
+    def _fetch(self, call: RyuCall, switch: Optional[str] = None, body: Optional[dict] = None):
+        """
+        Method to make a Ryu API call (see network_state_calls) and return what it collected. The call is a
+        GET, or a POST of body when given. Any error is raised as the exception of the call.
+        """
+        path = call_path(call, switch)
 
-    @staticmethod
-    def get_installed_groups(switch_id: str):
         try:
-            installed_groups = requests.get(f"http://127.0.0.1:8080/stats/groupdesc/{switch_id}")
-            installed_groups.raise_for_status()
-        except HTTPError as e:
-            raise HostRetrievalException(
-                f"""
-                Error while contacting API /stats/groupdesc
-                Please ensure you run Ryu with the following applications:\n
-                ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
-                Exception raised: {e}
-                """
-            )
+            if body is None:
+                response = self._transport.get(path, timeout=self._request_timeout)
+            else:
+                response = self._transport.post(path, json=body, timeout=self._request_timeout)
 
-        except Exception as e:
-            raise HostRetrievalException(e)
-
-        installed_groups = installed_groups.json()
-
-        return installed_groups[switch_id]
-
-    @staticmethod
-    def get_installed_flows(switch_dpid: str) -> dict:
-        try:
-            installed_flows_found = requests.get(f"http://127.0.0.1:8080/stats/flow/{switch_dpid}")
-            installed_flows_found.raise_for_status()
+            response.raise_for_status()
         except HTTPError as e:
-            raise FlowRetrievalException(
-                f"""
-                Error while contacting API /stats/flows.
-                Please ensure you run Ryu with the following applications:\n
-                ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology --observe-links
-                Exception raised: {e}
-                """
-            )
-
-        except Exception as e:
-            raise FlowRetrievalException(e)
-
-        flows_found_dict = installed_flows_found.json()
+            raise call_error(call, path, e)
 
-        formatted_flows = {}
-
-        if len(flows_found_dict):
-            switch_key, = flows_found_dict
-
-            for flow in flows_found_dict[switch_key]:
-                target_hash_fields = {
-                    'priority': flow['priority'],
-                    'table_id': flow['table_id'],
-                    'match': flow['match'],
-                    'actions': flow['actions'],
-                    'dpid': switch_dpid
-                }
-
-                hash_str = json.dumps(target_hash_fields, sort_keys=True)
-
-                flow_hash = str(hashlib.md5(hash_str.encode('utf-8')).hexdigest())
-
-                del flow["duration_sec"]
-                del flow["duration_nsec"]
+        except ConnectionError as e:
+            raise call_error(call, path, e, reached=False)
 
-                formatted_flows[flow_hash] = flow
+        except Exception as e:
+            raise call.exception(e)
 
-        return formatted_flows
+        return call.parse(switch, response.json())
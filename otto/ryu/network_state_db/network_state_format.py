@@ -0,0 +1,297 @@
+"""
+Functions which turn responses of the Ryu REST APIs into the structures stored in the network state.
+Shared by the NetworkStateFinder and the AsyncNetworkStateFinder so both produce the same network
+state and state ID for the same network.
+"""
+
+import hashlib
+import ipaddress
+import json
+from typing import Optional
+
+from otto.ryu.network_state_db.network_snapshot import NetworkSnapshot
+from otto.ryu.network_state_db.network_state_hasher import NetworkStateHasher
+
+FLOW_COUNTER_FIELDS = ("packet_count", "byte_count")
+OFPTT_ALL = 0xff  # table_id selecting every table
+FLOW_ENTRY_DEFAULT_PRIORITY = 0  # priority ofctl_rest gives a flow entry request without one
+
+# OpenFlow 1.3 names of the match fields which ofctl_v1_3 returns under their legacy name
+MATCH_FIELD_ALIASES = {
+    "eth_src": "dl_src", "eth_dst": "dl_dst", "eth_type": "dl_type", "vlan_vid": "dl_vlan",
+    "ipv4_src": "nw_src", "ipv4_dst": "nw_dst", "ip_proto": "nw_proto",
+    "tcp_src": "tp_src", "tcp_dst": "tp_dst", "udp_src": "tp_src", "udp_dst": "tp_dst"
+}
+INT_MATCH_FIELDS = {"in_port", "in_phy_port", "dl_type", "nw_proto", "tp_src", "tp_dst", "sctp_src", "sctp_dst",
+                    "ip_dscp", "ip_ecn", "icmpv4_type", "icmpv4_code", "icmpv6_type", "icmpv6_code", "arp_op",
+                    "vlan_pcp", "mpls_label", "mpls_tc", "mpls_bos", "pbb_isid"}
+MAC_MATCH_FIELDS = {"dl_src", "dl_dst", "arp_sha", "arp_tha", "ipv6_nd_sll", "ipv6_nd_tll"}
+IPV4_MATCH_FIELDS = {"nw_src", "nw_dst", "arp_spa", "arp_tpa"}
+
+
+def format_ports(switch_details: list) -> list:
+    """
+    Returns the ports found in a /v1.0/topology/switches/{dpid} response, without the dpid of each port.
+    """
+    if len(switch_details) and 'ports' in switch_details[0]:
+        retrieved_switch_ports = switch_details[0]['ports']
+
+        for port in retrieved_switch_ports:
+            del port['dpid']  # we don't need to include the dpid in each port desc, so remove it
+
+        return retrieved_switch_ports
+
+    return []
+
+
+def format_port_mappings(links_found: list) -> dict:
+    """
+    Returns the port mappings found in a /v1.0/topology/links/{dpid} response, following the
+    form src : dst, where src and dst are port names e.g. s1-eth1 : s4-eth2
+    """
+    switch_port_mapping = {}
+
+    if len(links_found):
+        for port_mapping in links_found:
+            source_port = port_mapping['src']['name']
+            destination = port_mapping['dst']['name']
+
+            switch_port_mapping[source_port] = destination
+
+    return switch_port_mapping
+
+
+def format_connected_hosts(switch_dpid: str, hosts_discovered: list) -> dict:
+    """
+    Returns the hosts found in a /v1.0/topology/hosts/{dpid} response, keyed by the name of the switch
+    port each host is connected to. Each host is given an ID of the form host-[switch ID]-[host number].
+    """
+    host_mappings = {}
+
+    if hosts_discovered:
+        host_count = 1
+        for connected_host in hosts_discovered:
+            connected_port = connected_host['port']['name']
+
+            host_id = f"host-{str(int(switch_dpid, 16))}-{str(host_count)}"
+
+            host_details = {
+                'id': host_id,
+                'mac': connected_host['mac'],
+                'ipv4': connected_host['ipv4'],
+                'ipv6': connected_host['ipv6']
+            }
+
+            host_mappings[connected_port] = host_details
+
+            host_count += 1
+
+    return host_mappings
+
+
+def format_installed_groups(switch_id: str, installed_groups: dict) -> list:
+    return installed_groups[switch_id]
+
+
+def format_installed_flows(switch_dpid: str, flows_found_dict: dict) -> dict:
+    """
+    Returns the flows found in a /stats/flow/{dpid} response, keyed by an MD5 hash of the fields which
+    identify the flow (priority, table, match, actions and switch). Flow durations are dropped.
+    """
+    formatted_flows = {}
+
+    if len(flows_found_dict):
+        switch_key, = flows_found_dict
+
+        for flow in flows_found_dict[switch_key]:
+            del flow["duration_sec"]
+            del flow["duration_nsec"]
+
+            formatted_flows[hash_flow(switch_dpid, flow)] = flow
+
+    return formatted_flows
+
+
+def hash_flow(switch_dpid: str, flow: dict) -> str:
+    """Returns the MD5 hash of the fields which identify a flow, used as its key in installedFlows"""
+    target_hash_fields = {
+        'priority': flow['priority'],
+        'table_id': flow['table_id'],
+        'match': flow['match'],
+        'actions': flow['actions'],
+        'dpid': switch_dpid
+    }
+
+    hash_str = json.dumps(target_hash_fields, sort_keys=True)
+
+    return str(hashlib.md5(hash_str.encode('utf-8')).hexdigest())
+
+
+def format_actions(actions: list) -> list[str]:
+    """
+    Converts actions in the format accepted by /stats/flowentry/* to the string format
+    returned by /stats/flow, e.g. {"type": "OUTPUT", "port": 2} -> "OUTPUT:2"
+    """
+    formatted_actions = []
+
+    for action in actions:
+        if not isinstance(action, dict):
+            formatted_actions.append(str(action))
+            continue
+
+        match action.get("type"):
+            case "OUTPUT":
+                formatted_actions.append(f"OUTPUT:{action.get('port')}")
+            case "GROUP":
+                formatted_actions.append(f"GROUP:{action.get('group_id')}")
+            case "SET_FIELD":
+                formatted_actions.append(f"SET_FIELD: {{{action.get('field')}:{action.get('value')}}}")
+            case _:
+                formatted_actions.append(str(action.get("type")))
+
+    return formatted_actions
+
+
+def format_match(match: dict) -> dict:
+    """
+    Converts match criteria in the format accepted by /stats/flowentry/* to the format returned by /stats/flow,
+    as ofctl_v1_3 does: OpenFlow 1.3 field names are replaced by their legacy name (e.g. ipv4_dst -> nw_dst),
+    numbers given as strings are parsed, MAC addresses are lower cased and IPv4 prefixes are given with their
+    netmask (e.g. 10.0.0.1/24 -> 10.0.0.0/255.255.255.0). Unknown fields and values are kept as they are.
+    """
+    formatted_match = {}
+
+    for field, value in match.items():
+        field = MATCH_FIELD_ALIASES.get(field, field)
+
+        try:
+            if field in INT_MATCH_FIELDS and isinstance(value, str):
+                value = int(value, 0)
+            elif field in MAC_MATCH_FIELDS and isinstance(value, str):
+                value = value.lower()
+            elif field in IPV4_MATCH_FIELDS and isinstance(value, str) and "/" in value:
+                network = ipaddress.IPv4Network(value, strict=False)
+                # switches hold the masked address, and a full mask as an exact match
+                value = str(network.network_address) if network.prefixlen == 32 else \
+                    f"{network.network_address}/{network.netmask}"
+        except ValueError:
+            pass
+
+        # as ofctl_v1_3, the first of two fields given under the same legacy name is kept
+        formatted_match.setdefault(field, value)
+
+    return formatted_match
+
+
+def filter_flow(flow: dict, flow_filter: dict) -> bool:
+    """
+    Returns whether a flow, in the format returned by /stats/flow, passes a filter as given to a POST to
+    /stats/flow/{dpid}: its table, priority and cookie (under cookie_mask) are the ones given, and its match
+    criteria contain the criteria of the filter.
+    """
+    table_id = flow_filter.get("table_id", OFPTT_ALL)
+    cookie_mask = flow_filter.get("cookie_mask", 0)
+
+    return (table_id == OFPTT_ALL or flow.get("table_id") == table_id) and \
+        flow_filter.get("priority", flow.get("priority")) == flow.get("priority") and \
+        flow.get("cookie", 0) & cookie_mask == flow_filter.get("cookie", 0) & cookie_mask and \
+        all(flow.get("match", {}).get(field) == value
+            for field, value in format_match(flow_filter.get("match", {})).items())
+
+
+def create_network_snapshot(network_elements: dict,
+                            state_hasher: Optional[NetworkStateHasher] = None) -> NetworkSnapshot:
+    """
+    Splits the packet and byte counters out of the installed flows of every switch, so the state ID
+    is only computed over the configuration of the network. Returns the configuration (keyed by its
+    state ID) together with the counters and the digest of every switch.
+    Args:
+        network_elements: {switch DPID: switch info} as collected from Ryu
+        state_hasher: NetworkStateHasher which hashed the previous network state, so only the
+        switches which changed since are rehashed.
+    """
+    configuration_elements, flow_counters = {}, {}
+
+    for switch, switch_info in network_elements.items():
+        configured_flows, switch_counters = {}, {}
+
+        for flow_hash, flow in switch_info.get("installedFlows", {}).items():
+            configured_flows[flow_hash] = {field: value for field, value in flow.items()
+                                           if field not in FLOW_COUNTER_FIELDS}
+
+            switch_counters[flow_hash] = {field: flow[field] for field in FLOW_COUNTER_FIELDS if field in flow}
+
+        configuration_elements[switch] = {**switch_info, "installedFlows": configured_flows}
+        flow_counters[switch] = switch_counters
+
+    state_id, switch_digests = (state_hasher or NetworkStateHasher()).hash_network(configuration_elements)
+
+    return NetworkSnapshot(network_state={state_id: configuration_elements},
+                           flow_counters=flow_counters,
+                           switch_digests=switch_digests)
+
+
+def update_network_snapshot(network_snapshot: NetworkSnapshot, refreshed_switches: dict,
+                            removed_switches: set[str] = frozenset(),
+                            state_hasher: Optional[NetworkStateHasher] = None) -> NetworkSnapshot:
+    """
+    Returns a NetworkSnapshot updated with switches collected again: the refreshed switches replace (or are
+    added to) the switches of the snapshot, and the removed switches are dropped. Every other switch is kept
+    along with its flow counters.
+    Args:
+        network_snapshot: the snapshot to update
+        refreshed_switches: {switch DPID: switch info} as collected from Ryu
+        removed_switches: DPIDs of the switches which left the network
+        state_hasher: see create_network_snapshot
+    """
+    network_elements = dict(next(iter(network_snapshot["network_state"].values())))
+
+    for removed_switch in removed_switches:
+        network_elements.pop(removed_switch, None)
+
+    network_elements.update(refreshed_switches)
+
+    refreshed_snapshot = create_network_snapshot(network_elements, state_hasher)
+
+    flow_counters = {switch: counters for switch, counters in network_snapshot["flow_counters"].items()
+                     if switch in network_elements and switch not in refreshed_switches}
+
+    flow_counters.update({switch: refreshed_snapshot["flow_counters"][switch] for switch in refreshed_switches})
+
+    refreshed_snapshot["flow_counters"] = flow_counters
+
+    return refreshed_snapshot
+
+
+def split_by_dpid(topology_elements: list, dpid_of) -> dict[str, list]:
+    """
+    Splits a response of an unfiltered /v1.0/topology API into one list per switch DPID,
+    keeping the order in which Ryu returned the elements.
+    Args:
+        topology_elements: list of switches, links or hosts returned by Ryu
+        dpid_of: function returning the DPID an element belongs to
+    """
+    elements_by_dpid = {}
+
+    for element in topology_elements:
+        elements_by_dpid.setdefault(dpid_of(element), []).append(element)
+
+    return elements_by_dpid
+
+
+def format_all_ports(switches_found: list) -> dict:
+    """Returns the ports of every switch found in a /v1.0/topology/switches response, keyed by DPID"""
+    return {dpid: format_ports(switches) for dpid, switches in
+            split_by_dpid(switches_found, lambda switch: switch['dpid']).items()}
+
+
+def format_all_port_mappings(links_found: list) -> dict:
+    """Returns the port mappings of every switch found in a /v1.0/topology/links response, keyed by DPID"""
+    return {dpid: format_port_mappings(links) for dpid, links in
+            split_by_dpid(links_found, lambda link: link['src']['dpid']).items()}
+
+
+def format_all_connected_hosts(hosts_discovered: list) -> dict:
+    """Returns the hosts connected to every switch found in a /v1.0/topology/hosts response, keyed by DPID"""
+    return {dpid: format_connected_hosts(dpid, hosts) for dpid, hosts in
+            split_by_dpid(hosts_discovered, lambda host: host['port']['dpid']).items()}
@@ -0,0 +1,81 @@
+import hashlib
+import json
+from threading import Lock
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class NetworkStateHasher:
+    """
+    Computes the network state ID as a hash tree: each installed flow is hashed, the flow digests and the
+    rest of a switch's configuration are hashed into a digest per switch, and the state ID is the hash of
+    all switch digests.
+
+    The hasher keeps the switches and flows it hashed on the previous call. A switch (or flow) equal to the
+    one seen before reuses its previous digest, so each call only rehashes the switches whose content changed.
+    """
+
+    def __init__(self):
+        self._switch_cache: dict[str, tuple[dict, str]] = {}
+        self._flow_cache: dict[str, dict[str, tuple[dict, str]]] = {}
+        self._lock = Lock()
+
+        self.rehashed_switches: set[str] = set()
+
+    def hash_network(self, network_elements: dict) -> tuple[str, dict]:
+        """
+        Args:
+            network_elements: {switch DPID: switch info} holding the configuration of the network
+        Returns:
+            the state ID, and a dictionary of {switch DPID: switch digest}
+        """
+        with self._lock:
+            switch_digests, rehashed_switches = {}, set()
+
+            for switch, switch_info in network_elements.items():
+                cached_switch = self._switch_cache.get(switch)
+
+                if cached_switch is not None and cached_switch[0] == switch_info:
+                    switch_digests[switch] = cached_switch[1]
+                    continue
+
+                switch_digests[switch] = self._hash_switch(switch, switch_info)
+                rehashed_switches.add(switch)
+
+            for removed_switch in set(self._switch_cache) - set(network_elements):
+                del self._switch_cache[removed_switch]
+                self._flow_cache.pop(removed_switch, None)
+
+            self.rehashed_switches = rehashed_switches
+
+        return self.hash_switch_digests(switch_digests), switch_digests
+
+    @staticmethod
+    def hash_switch_digests(switch_digests: dict) -> str:
+        """Returns the state ID for a set of switch digests"""
+        return hashlib.sha256(
+            "".join(f"{switch}:{digest}\n" for switch, digest in sorted(switch_digests.items())).encode('utf-8')
+        ).hexdigest()
+
+    def _hash_switch(self, switch: str, switch_info: dict) -> str:
+        cached_flows = self._flow_cache.get(switch, {})
+        flow_digests, flow_cache = {}, {}
+
+        for flow_hash, flow in switch_info.get("installedFlows", {}).items():
+            cached_flow = cached_flows.get(flow_hash)
+
+            flow_digest = cached_flow[1] if cached_flow is not None and cached_flow[0] == flow else _digest(flow)
+
+            flow_digests[flow_hash] = flow_digest
+            flow_cache[flow_hash] = (flow, flow_digest)
+
+        switch_configuration = {field: value for field, value in switch_info.items() if field != "installedFlows"}
+
+        switch_digest = _digest({"configuration": switch_configuration, "installedFlows": flow_digests})
+
+        self._flow_cache[switch] = flow_cache
+        self._switch_cache[switch] = (switch_info, switch_digest)
+
+        return switch_digest
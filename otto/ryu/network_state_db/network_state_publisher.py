@@ -0,0 +1,261 @@
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from otto.exceptions import NetworkStatePublisherException
+from otto.otto_logger.logger_config import logger
+from otto.ryu.network_state_db.agent_run_registry import StateChangeCallback
+from otto.ryu.network_state_db.network_state_broker import NetworkStateBroker
+
+DEFAULT_RECONNECT_ATTEMPTS = 5
+DEFAULT_RECONNECT_BACKOFF = 0.1
+MAX_RECONNECT_BACKOFF = 2.0
+
+
+class NetworkStatePublisher(Thread):
+    """
+    Publishes the network state held by a NetworkStateBroker to other processes over a local Unix socket,
+    so the Gunicorn workers of the Otto REST API read the network state collected by the broker of the
+    main process instead of each contacting the controller (see RemoteNetworkStateBroker).
+
+    The address of the socket is exported in the OTTO_STATE_SOCKET environment variable, which is inherited
+    by the processes started after the publisher. Connections are authenticated with the authkey of the
+    current process, which forked processes share.
+    """
+
+    def __init__(self, network_state_broker: NetworkStateBroker, address: Optional[str] = None,
+                 authkey: Optional[bytes] = None):
+
+        super().__init__(name="network_state_publisher", daemon=True)
+
+        self.address = address or os.path.join(tempfile.gettempdir(), f"otto-state-{os.getpid()}.sock")
+        self.owner_pid = os.getpid()
+
+        self._network_state_broker = network_state_broker
+        self._authkey = authkey or bytes(multiprocessing.current_process().authkey)
+        self._listener: Optional[Listener] = None
+        self._stopping = Event()
+
+    def start(self) -> "NetworkStatePublisher":
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self._authkey)
+        os.environ["OTTO_STATE_SOCKET"] = self.address
+
+        super().start()
+
+        return self
+
+    def stop(self) -> None:
+        if os.getpid() != self.owner_pid:
+            return  # a forked process must not remove the socket of its parent
+
+        self._stopping.set()
+
+        if self.is_alive():
+            # closing the listener does not interrupt accept, so connect to it to wake it up
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as wakeup:
+                wakeup.connect(self.address)
+
+            self.join()
+
+        if self._listener is not None:
+            self._listener.close()
+
+        if os.environ.get("OTTO_STATE_SOCKET") == self.address:
+            del os.environ["OTTO_STATE_SOCKET"]
+
+    def run(self):
+        logger.debug(f"Publishing the network state on {self.address}")
+
+        while not self._stopping.is_set():
+            try:
+                connection = self._listener.accept()
+            except Exception as e:
+                if not self._stopping.is_set():
+                    logger.warn(f"Refused a connection to the network state publisher: {e}")
+                continue
+
+            Thread(target=self._serve, args=(connection,), name="network_state_subscriber", daemon=True).start()
+
+    def _serve(self, connection: Connection) -> None:
+        """Answers the requests of one process until it closes its connection"""
+        with connection:
+            while True:
+                try:
+                    method, args = connection.recv()
+                except (EOFError, OSError):
+                    break
+
+                try:
+                    response = ("result", self._call(method, *args))
+                except Exception as e:
+                    # the exception itself may not be picklable, so only its type and message are sent
+                    response = ("error", f"{type(e).__name__}: {e}")
+
+                try:
+                    connection.send(response)
+                except (EOFError, OSError):
+                    break
+                except Exception as e:
+                    connection.send(("error", f"Could not send the result of {method}: {type(e).__name__}: {e}"))
+
+    def _call(self, method: str, *args):
+        match method:
+            case "provide_network_state":
+                agent_run_id, max_staleness, known_state_id = args
+
+                network_state = self._network_state_broker.provide_network_state(agent_run_id, max_staleness)
+                state_id = next(iter(network_state))
+
+                # the subscriber already holds this network state, don't send it again
+                return state_id, None if state_id == known_state_id else network_state
+
+            case ("provide_flow_counters" | "changed_switches" | "record_writes" | "terminate_agent_run" |
+                  "get_metrics"):
+                return getattr(self._network_state_broker, method)(*args)
+
+            case _:
+                raise ValueError(f"Unknown network state broker method {method}")
+
+
+class RemoteNetworkStateBroker:
+    """
+    Stands in for the NetworkStateBroker in processes which read the network state from a
+    NetworkStatePublisher. Provides the same methods to agent runs, answered by the broker of the
+    publishing process. The network state is only sent over the socket when its state ID differs
+    from the last one this process received.
+
+    Callbacks given to subscribe are called from changed_switches, when it finds switches which
+    had not changed before.
+
+    When the connection to the publisher is lost, requests connect again, up to reconnect_attempts times,
+    waiting reconnect_backoff seconds before the first attempt and twice as long before each next one (up to
+    MAX_RECONNECT_BACKOFF seconds). A NetworkStatePublisherException is raised if the publisher cannot be
+    reached, or if the broker of the publisher raised an error.
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None,
+                 reconnect_attempts: int = DEFAULT_RECONNECT_ATTEMPTS,
+                 reconnect_backoff: float = DEFAULT_RECONNECT_BACKOFF):
+        self.address = address
+
+        self._authkey = authkey or bytes(multiprocessing.current_process().authkey)
+        self._reconnect_attempts = reconnect_attempts
+        self._reconnect_backoff = reconnect_backoff
+
+        self._connection: Optional[Connection] = self._connect()
+        self._connection_lock = Lock()
+        self._owner_pid = os.getpid()
+
+        self._network_state: Optional[dict] = None
+
+        self._subscriptions: dict[str, tuple[Event, list[StateChangeCallback], set[str]]] = {}
+
+    @classmethod
+    def get_instance(cls, address: str) -> "RemoteNetworkStateBroker":
+        """
+        Returns the RemoteNetworkStateBroker of the current process, connecting to the publisher at
+        address. Connections are never shared with a forked process.
+        """
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._owner_pid != os.getpid() or cls._instance.address != address:
+                cls._instance = cls(address)
+
+            return cls._instance
+
+    def provide_network_state(self, agent_run_id: str, max_staleness: Optional[float] = None) -> dict:
+        known_state_id = next(iter(self._network_state)) if self._network_state is not None else None
+
+        _, network_state = self._request("provide_network_state", agent_run_id, max_staleness, known_state_id)
+
+        if network_state is not None:
+            self._network_state = network_state
+
+        return self._network_state
+
+    def provide_flow_counters(self) -> dict:
+        return self._request("provide_flow_counters")
+
+    def subscribe(self, agent_run_id: str, callback: Optional[StateChangeCallback] = None) -> Event:
+        state_changed, callbacks, _ = self._subscriptions.setdefault(agent_run_id, (Event(), [], set()))
+
+        if callback is not None:
+            callbacks.append(callback)
+
+        return state_changed
+
+    def changed_switches(self, agent_run_id: str) -> set[str]:
+        changed_switches = self._request("changed_switches", agent_run_id)
+
+        subscription = self._subscriptions.get(agent_run_id)
+
+        if subscription is not None and not changed_switches <= subscription[2]:
+            state_changed, callbacks, notified_switches = subscription
+
+            notified_switches |= changed_switches
+            state_changed.set()
+
+            for callback in callbacks:
+                callback(agent_run_id, set(changed_switches))
+
+        return changed_switches
+
+    def record_writes(self, agent_run_id: str, switches: set[str]) -> None:
+        self._request("record_writes", agent_run_id, switches)
+
+    def terminate_agent_run(self, agent_run_id: str) -> None:
+        self._subscriptions.pop(agent_run_id, None)
+        self._request("terminate_agent_run", agent_run_id)
+
+    def get_metrics(self) -> dict:
+        return self._request("get_metrics")
+
+    def close(self) -> None:
+        with self._connection_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> Connection:
+        return Client(self.address, family="AF_UNIX", authkey=self._authkey)
+
+    def _request(self, method: str, *args):
+        with self._connection_lock:
+            for attempt in range(self._reconnect_attempts + 1):
+                try:
+                    if self._connection is None:
+                        self._connection = self._connect()
+
+                    self._connection.send((method, args))
+                    outcome, value = self._connection.recv()
+                    break
+
+                except (EOFError, OSError) as e:
+                    if self._connection is not None:
+                        self._connection.close()
+                        self._connection = None
+
+                    if attempt == self._reconnect_attempts:
+                        raise NetworkStatePublisherException(
+                            f"Could not reach the network state publisher at {self.address}: {e}")
+
+                    backoff = min(self._reconnect_backoff * 2 ** attempt, MAX_RECONNECT_BACKOFF)
+
+                    logger.warn(f"Lost the connection to the network state publisher at {self.address}: {e}. "
+                                f"Connecting again in {backoff:.1f} seconds")
+
+                    time.sleep(backoff)
+
+        if outcome == "error":
+            raise NetworkStatePublisherException(value)
+
+        return value
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from otto.otto_logger.logger_config import logger
+
+
+class PortDpidIndex:
+    """
+    Resolves the switch at the remote end of a link of the network state. The port mappings of a switch only
+    hold the name of the remote port, e.g. {"s1-eth2": "s12-eth3"}, so the remote switch is found from the
+    link data Ryu returns instead of the port name:
+
+        - Ryu reports every link from both of its ends, and the port mappings of a switch are built from the
+          links whose src.dpid is the switch. The remote switch of s1-eth2 -> s12-eth3 is the switch holding
+          the reverse link s12-eth3 -> s1-eth2, i.e. the dst.dpid of the link.
+        - Links only reported from one end are resolved through the ports of every switch: a port name
+          found on a single switch belongs to that switch.
+
+    Args:
+        network_elements: {switch DPID: switch info} of the network state
+    """
+
+    def __init__(self, network_elements: dict):
+        self._link_dpids: dict[tuple[str, str], str] = {}
+        self._port_dpids: dict[str, str] = {}
+        self._shared_port_names: set[str] = set()
+
+        for switch, switch_data in network_elements.items():
+            port_mappings = switch_data.get('portMappings') or {}
+
+            for switch_port, remote_port in port_mappings.items():
+                self._link_dpids[(switch_port, remote_port)] = switch
+
+            port_names = set(port_mappings) | {port['name'] for port in switch_data.get('ports') or []
+                                               if 'name' in port}
+
+            for port_name in port_names:
+                if self._port_dpids.setdefault(port_name, switch) != switch:
+                    self._shared_port_names.add(port_name)
+
+    def __len__(self) -> int:
+        return len(self._port_dpids)
+
+    def dpid_of(self, port_name: str) -> Optional[str]:
+        """Returns the DPID of the switch a port belongs to, or None if the port name is unknown or not unique"""
+        if port_name in self._shared_port_names:
+            return None
+
+        return self._port_dpids.get(port_name)
+
+    def remote_switch(self, switch_port: str, remote_port: str) -> Optional[str]:
+        """
+        Returns the DPID of the switch at the remote end of a link, or None if it can't be resolved.
+        Args:
+            switch_port: name of the local port of the link, e.g. s1-eth2
+            remote_port: name of the remote port of the link, e.g. s12-eth3
+        """
+        remote_switch = self._link_dpids.get((remote_port, switch_port)) or self.dpid_of(remote_port)
+
+        if remote_switch is None:
+            logger.warn(f"Could not resolve the switch of port {remote_port}, linked to {switch_port}")
+
+        return remote_switch
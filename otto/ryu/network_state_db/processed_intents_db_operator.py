@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from typing import Optional
 
 from sqlalchemy import create_engine, desc, func
 from sqlalchemy.orm import Session, joinedload
@@ -15,7 +16,8 @@ class ProcessedIntentsDbOperator:
         self._session = Session(self._engine)
 
     def save_intent(self, agent_run: str, username: str, intent: str, timestamp: datetime,
-                    called_tools: list[dict], model: str) -> None:
+                    called_tools: list[dict], model: str, cookie: Optional[int] = None,
+                    cookie_mask: Optional[int] = None) -> None:
         """
         Args:
             agent_run: ID of the agent run
@@ -23,6 +25,8 @@ class ProcessedIntentsDbOperator:
             intent: The intent declared
             timestamp: datetime object
             called_tools: List of completed operations carried out by IntentProcessor
+            cookie: cookie stamped on the flows installed by the agent run
+            cookie_mask: mask selecting the bits of the cookie which identify the agent run
 
         """
 
@@ -36,7 +40,9 @@ class ProcessedIntentsDbOperator:
             declared_by_id=target_id,
             intent=intent,
             timestamp=timestamp,
-            model=model
+            model=model,
+            cookie=cookie,
+            cookie_mask=cookie_mask
         )
 
         self._session.add(processed_intent)
@@ -56,6 +62,24 @@ class ProcessedIntentsDbOperator:
 
         self._session.commit()
 
+    def get_intent_cookie(self, agent_run: str, username: str) -> Optional[tuple[int, int]]:
+        """
+        Method to find the cookie and cookie mask stamped on the flows installed by an agent run, used to list
+        or roll back the flows of a processed intent. None if the agent run is unknown, has no cookie, or its
+        intent was not declared by the given user/app, so no one can act on the intents of someone else.
+        """
+        intent_cookie = (
+            self._session.query(ProcessedIntents.cookie, ProcessedIntents.cookie_mask)
+            .join(Entities, Entities.id == ProcessedIntents.declared_by_id)
+            .filter(ProcessedIntents.agent_run == agent_run, Entities.username == username)
+            .first()
+        )
+
+        if intent_cookie is None or intent_cookie.cookie is None:
+            return None
+
+        return intent_cookie.cookie, intent_cookie.cookie_mask
+
     def get_latest_activity(self) -> dict:
         """
         Method to find up to the 5 most recent intents declared and registered in the ProcessedIntents table.
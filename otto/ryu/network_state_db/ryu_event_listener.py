@@ -0,0 +1,139 @@
+import asyncio
+import json
+from threading import Event, Thread
+from typing import Callable, Optional
+
+import aiohttp
+
+from otto.otto_logger.logger_config import logger
+from otto.ryu.ryu_transport import RyuTransport
+
+TOPOLOGY_EVENTS_PATH = "/v1.0/topology/ws"
+FLOW_EVENTS_PATH = "/v1.0/otto/flows/ws"
+
+DEFAULT_RETRY_INTERVAL = 5.0
+
+
+def switches_affected_by(method: str, params: dict) -> tuple[set[str], set[str]]:
+    """
+    Returns the DPIDs of the switches whose state is changed by a Ryu event, as two sets:
+    the switches to be refreshed, and the switches which left the network.
+    Args:
+        method: name of the event, e.g. event_link_add
+        params: the element carried by the event (a switch, link, host or flow)
+    """
+
+    def dpid_of(value) -> str:
+        return format(value, '016x') if isinstance(value, int) else str(value).zfill(16)
+
+    match method:
+        case "event_switch_leave":
+            return set(), {dpid_of(params["dpid"])}
+        case "event_switch_enter" | "event_port_status" | "event_flow_removed":
+            return {dpid_of(params["dpid"])}, set()
+        case "event_link_add" | "event_link_delete":
+            return {dpid_of(params["src"]["dpid"]), dpid_of(params["dst"]["dpid"])}, set()
+        case "event_host_add":
+            return {dpid_of(params["port"]["dpid"])}, set()
+        case _:
+            return set(), set()
+
+
+class RyuEventListener(Thread):
+    """
+    Subscribes to the JSON-RPC websockets of Ryu and passes every event received to a callback.
+    By default, it listens to:
+        /v1.0/topology/ws: topology events, served when Ryu runs ryu.app.ws_topology
+        /v1.0/otto/flows/ws: flow events, served when Ryu runs otto/ryu/ryu_apps/flow_event_relay.py
+    A websocket which cannot be reached is retried every retry_interval seconds. on_connect is called
+    each time a websocket (re)connects, as any event sent while it was disconnected was missed.
+    """
+
+    def __init__(self, on_event: Callable[[str, dict], None],
+                 on_connect: Optional[Callable[[str], None]] = None,
+                 base_url: Optional[str] = None,
+                 event_paths: tuple[str, ...] = (TOPOLOGY_EVENTS_PATH, FLOW_EVENTS_PATH),
+                 retry_interval: float = DEFAULT_RETRY_INTERVAL):
+
+        super().__init__(name="ryu_event_listener", daemon=True)
+
+        base_url = (base_url or RyuTransport.get_instance().base_url).replace("http", "ws", 1)
+
+        self._event_urls = [f"{base_url}{path}" for path in event_paths]
+        self._on_event = on_event
+        self._on_connect = on_connect
+        self._retry_interval = retry_interval
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listening_task: Optional[asyncio.Task] = None
+        self._stop_event = Event()
+
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+
+        self._listening_task = self._loop.create_task(self._listen_all())
+
+        try:
+            self._loop.run_until_complete(self._listening_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+        if self._loop is not None and self._listening_task is not None:
+            self._loop.call_soon_threadsafe(self._listening_task.cancel)
+
+        if self.is_alive():
+            self.join()
+
+    async def _listen_all(self) -> None:
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(self._listen(session, event_url) for event_url in self._event_urls))
+
+    async def _listen(self, session: aiohttp.ClientSession, event_url: str) -> None:
+        while not self._stop_event.is_set():
+            try:
+                async with session.ws_connect(event_url, heartbeat=30) as websocket:
+                    logger.debug(f"Subscribed to Ryu events on {event_url}")
+
+                    if self._on_connect is not None:
+                        self._on_connect(event_url)
+
+                    async for message in websocket:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            await self._handle_message(websocket, message.data)
+
+                        elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+
+            except (aiohttp.ClientError, OSError) as e:
+                logger.debug(f"Could not subscribe to Ryu events on {event_url}: {e}")
+
+            await asyncio.sleep(self._retry_interval)
+
+    async def _handle_message(self, websocket: aiohttp.ClientWebSocketResponse, data: str) -> None:
+        """
+        Handles a JSON-RPC request sent by Ryu. Ryu waits for a reply to every event it sends, so an
+        empty result is sent back before the event is passed on.
+        """
+        try:
+            rpc_request = json.loads(data)
+        except json.JSONDecodeError:
+            logger.warn(f"Discarding malformed Ryu event: {data}")
+            return
+
+        if "method" not in rpc_request:
+            return
+
+        if "id" in rpc_request:
+            await websocket.send_str(json.dumps({"jsonrpc": "2.0", "id": rpc_request["id"], "result": ""}))
+
+        params = rpc_request.get("params") or [{}]
+
+        try:
+            self._on_event(rpc_request["method"], params[0])
+        except Exception as e:
+            logger.warn(f"Error while handling Ryu event {rpc_request['method']}: {e}")
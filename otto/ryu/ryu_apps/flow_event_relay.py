@@ -0,0 +1,83 @@
+"""
+Ryu application relaying OpenFlow flow-removed and port-status messages to Otto over a JSON-RPC websocket,
+in the same way ryu.app.ws_topology relays topology events. Run it alongside the applications Otto needs:
+
+    ryu-manager ryu.app.ofctl_rest ryu.app.rest_topology ryu.app.ws_topology \
+        otto/ryu/ryu_apps/flow_event_relay.py --observe-links
+
+Switches only send a flow-removed message for flows installed with the OFPFF_SEND_FLOW_REM flag set.
+Changes to other flows are picked up by the periodic reconciliation of the NetworkStateBroker.
+"""
+
+from socket import error as SocketError
+
+from ryu.app.wsgi import ControllerBase, WebSocketRPCClient, WSGIApplication, websocket
+from ryu.base import app_manager
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER, set_ev_cls
+from tinyrpc.exc import InvalidReplyError
+
+FLOW_EVENTS_PATH = "/v1.0/otto/flows/ws"
+
+
+class FlowEventRelay(app_manager.RyuApp):
+    _CONTEXTS = {"wsgi": WSGIApplication}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.rpc_clients = []
+
+        kwargs["wsgi"].register(FlowEventRelayController, {"flow_event_relay": self})
+
+    @set_ev_cls(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    def _flow_removed_handler(self, ev):
+        msg = ev.msg
+
+        self._rpc_broadcall("event_flow_removed", {
+            "dpid": msg.datapath.id,
+            "cookie": msg.cookie,
+            "priority": msg.priority,
+            "table_id": getattr(msg, "table_id", 0),
+            "reason": msg.reason
+        })
+
+    @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
+    def _port_status_handler(self, ev):
+        msg = ev.msg
+
+        self._rpc_broadcall("event_port_status", {
+            "dpid": msg.datapath.id,
+            "port_no": msg.desc.port_no,
+            "reason": msg.reason
+        })
+
+    def _rpc_broadcall(self, func_name: str, msg: dict) -> None:
+        disconnected_clients = []
+
+        for rpc_client in self.rpc_clients:
+            rpc_server = rpc_client.get_proxy()
+
+            try:
+                getattr(rpc_server, func_name)(msg)
+            except SocketError:
+                self.logger.debug("WebSocket disconnected: %s", rpc_client.ws)
+                disconnected_clients.append(rpc_client)
+            except InvalidReplyError as e:
+                self.logger.error(e)
+
+        for client in disconnected_clients:
+            self.rpc_clients.remove(client)
+
+
+class FlowEventRelayController(ControllerBase):
+    def __init__(self, req, link, data, **config):
+        super().__init__(req, link, data, **config)
+
+        self.flow_event_relay = data["flow_event_relay"]
+
+    @websocket("flow_events", FLOW_EVENTS_PATH)
+    def _websocket_handler(self, ws):
+        rpc_client = WebSocketRPCClient(ws)
+        self.flow_event_relay.rpc_clients.append(rpc_client)
+        rpc_client.serve_forever()
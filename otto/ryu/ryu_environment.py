@@ -1,12 +1,16 @@
 import atexit
+import os
+from typing import Optional, Union
 
 from otto.controller_environment import ControllerEnvironment
 from otto.otto_logger.logger_config import logger
 from otto.ryu.network_state_db.network_state_broker import NetworkStateBroker
+from otto.ryu.network_state_db.network_state_publisher import NetworkStatePublisher, RemoteNetworkStateBroker
 
 
 class RyuEnvironment(ControllerEnvironment):
     network_state_broker = NetworkStateBroker()
+    network_state_publisher: Optional[NetworkStatePublisher] = None
 
     def __init__(self):
         atexit.register(self.stop_state_broker)
@@ -14,8 +18,36 @@ class RyuEnvironment(ControllerEnvironment):
     def start_state_broker(self):
         self.network_state_broker.start()
 
+        RyuEnvironment.network_state_publisher = NetworkStatePublisher(self.network_state_broker).start()
+
     def stop_state_broker(self):
         logger.debug("Stopping network state broker thread..")
-        self.network_state_broker.stop_event.set()
-        self.network_state_broker.join()
+
+        if self.network_state_publisher is not None:
+            self.network_state_publisher.stop()
+
+        self.network_state_broker.stop()
         logger.debug("Network state broker thread stopped.")
+
+    @classmethod
+    def shared_network_state_broker(cls) -> Union[NetworkStateBroker, RemoteNetworkStateBroker]:
+        """
+        Returns the broker to provide the network state to agent runs of the current process. In the
+        process which started the state broker, or when no broker publishes its network state, this is the
+        network_state_broker. In the processes forked from it (e.g. the Gunicorn workers of the REST API) or
+        given its socket in OTTO_STATE_SOCKET, this is a RemoteNetworkStateBroker reading the network state
+        of that broker, so the controller is not contacted by every process.
+        """
+        publisher_address = os.getenv("OTTO_STATE_SOCKET")
+
+        if publisher_address is None or (cls.network_state_publisher is not None and
+                                         cls.network_state_publisher.owner_pid == os.getpid()):
+            return cls.network_state_broker
+
+        try:
+            return RemoteNetworkStateBroker.get_instance(publisher_address)
+        except Exception as e:
+            logger.warn(f"Could not connect to the network state publisher at {publisher_address}: {e}. "
+                        "Collecting the network state from this process instead")
+
+            return cls.network_state_broker
@@ -0,0 +1,429 @@
+"""
+A small stand-in for a Ryu controller running ryu.app.ofctl_rest, ryu.app.rest_topology and ryu.app.ws_topology.
+It serves a generated topology over the same REST endpoints Otto uses, so the NetworkStateFinder, the
+IntentProcessor tools and the benchmarks can be exercised without Mininet or a real controller. Topology and
+flow events can be pushed to the JSON-RPC websockets followed by the RyuEventListener.
+
+Run on its own with:
+    python -m otto.ryu.ryu_stand_in --switches 60 --port 8080
+"""
+
+import argparse
+import asyncio
+import json
+import weakref
+from threading import Event, Thread
+from typing import Optional
+
+from aiohttp import web
+
+from otto.ryu.network_state_db.network_state_format import (FLOW_ENTRY_DEFAULT_PRIORITY, filter_flow, format_actions,
+                                                            format_match)
+
+class SyntheticFabric:
+    """
+    Generated topology described in the same format as the Ryu REST APIs. Switches are numbered from 1 and
+    connected as a ring (or a line), with hosts_per_switch hosts attached to the first ports of every switch.
+    """
+
+    def __init__(self, switch_count: int, hosts_per_switch: int = 1, topology: str = "ring"):
+        if topology not in ["ring", "linear"]:
+            raise ValueError(f"Unknown topology {topology}")
+
+        self.switch_count = switch_count
+        self.hosts_per_switch = hosts_per_switch
+
+        self.ports: dict[str, list[dict]] = {}
+        self.links: list[dict] = []
+        self.hosts: list[dict] = []
+        self.flows: dict[int, list[dict]] = {}
+        self.groups: dict[int, list[dict]] = {}
+
+        for switch_id in range(1, switch_count + 1):
+            self.ports[self.dpid(switch_id)] = []
+            self.flows[switch_id] = [self._controller_flow()]
+            self.groups[switch_id] = []
+
+            for _ in range(hosts_per_switch):
+                self.add_host(switch_id)
+
+        link_count = switch_count if topology == "ring" and switch_count > 2 else switch_count - 1
+
+        for link in range(link_count):
+            src_switch, dst_switch = link + 1, (link + 1) % switch_count + 1
+            self.add_link(src_switch, dst_switch)
+
+    @staticmethod
+    def dpid(switch_id: int) -> str:
+        return format(switch_id, '016x')
+
+    @staticmethod
+    def _address(index: int, prefix: str) -> str:
+        return f"{prefix}:" + ":".join(f"{(index >> shift) & 0xff:02x}" for shift in (24, 16, 8, 0))
+
+    @staticmethod
+    def _controller_flow() -> dict:
+        return {
+            "priority": 65535,
+            "cookie": 0,
+            "idle_timeout": 0,
+            "hard_timeout": 0,
+            "actions": ["OUTPUT:CONTROLLER"],
+            "match": {"dl_dst": "01:80:c2:00:00:0e", "dl_type": 35020},
+            "byte_count": 0,
+            "duration_sec": 0,
+            "duration_nsec": 0,
+            "packet_count": 0,
+            "table_id": 0
+        }
+
+    def _add_port(self, switch_id: int) -> dict:
+        dpid = self.dpid(switch_id)
+        port_number = len(self.ports[dpid]) + 1
+
+        port = {
+            "dpid": dpid,
+            "port_no": format(port_number, '08x'),
+            "hw_addr": self._address((switch_id << 8) + port_number, prefix="02:00"),
+            "name": f"s{switch_id}-eth{port_number}"
+        }
+
+        self.ports[dpid].append(port)
+
+        return port
+
+    def add_host(self, switch_id: int) -> dict:
+        """Connects a new host to a new port of the switch. Returns the host."""
+        host_port = self._add_port(switch_id)
+        host_index = len(self.hosts) + 1
+
+        host = {
+            "mac": self._address(host_index, prefix="00:00"),
+            "ipv4": [f"10.{(host_index >> 16) & 0xff}.{(host_index >> 8) & 0xff}.{host_index & 0xff}"],
+            "ipv6": [],
+            "port": host_port
+        }
+
+        self.hosts.append(host)
+
+        return host
+
+    def add_link(self, src_switch: int, dst_switch: int) -> dict:
+        """Adds a new port on both switches and links them together in both directions. Returns the first link."""
+        src_port, dst_port = self._add_port(src_switch), self._add_port(dst_switch)
+
+        self.links.append({"src": src_port, "dst": dst_port})
+        self.links.append({"src": dst_port, "dst": src_port})
+
+        return self.links[-2]
+
+    def get_switches(self, dpid: Optional[str] = None) -> list[dict]:
+        return [{"dpid": switch_dpid, "ports": [dict(port) for port in ports]}
+                for switch_dpid, ports in self.ports.items() if dpid is None or switch_dpid == dpid]
+
+    def get_links(self, dpid: Optional[str] = None) -> list[dict]:
+        return [link for link in self.links if dpid is None or link["src"]["dpid"] == dpid]
+
+    def get_hosts(self, dpid: Optional[str] = None) -> list[dict]:
+        return [host for host in self.hosts if dpid is None or host["port"]["dpid"] == dpid]
+
+    def add_flow(self, flow_entry: dict) -> None:
+        # adding a flow with the same priority and match replaces it, as OpenFlow does
+        self.delete_flow_strict(flow_entry)
+
+        # kept as ofctl_v1_3 reports it, e.g. ipv4_dst is returned as nw_dst
+        self.flows[int(flow_entry["dpid"])].append({
+            "priority": flow_entry.get("priority", FLOW_ENTRY_DEFAULT_PRIORITY),
+            "cookie": flow_entry.get("cookie", 0),
+            "idle_timeout": flow_entry.get("idle_timeout", 0),
+            "hard_timeout": flow_entry.get("hard_timeout", 0),
+            "actions": format_actions(flow_entry.get("actions", [])),
+            "match": format_match(flow_entry.get("match", {})),
+            "byte_count": 0,
+            "duration_sec": 0,
+            "duration_nsec": 0,
+            "packet_count": 0,
+            "table_id": flow_entry.get("table_id", 0)
+        })
+
+    def delete_flow_strict(self, flow_entry: dict) -> None:
+        self.flows[int(flow_entry["dpid"])] = [
+            flow for flow in self.flows[int(flow_entry["dpid"])]
+            if (flow["priority"], flow["table_id"], flow["match"]) !=
+               (flow_entry.get("priority", FLOW_ENTRY_DEFAULT_PRIORITY), flow_entry.get("table_id", 0),
+                format_match(flow_entry.get("match", {})))
+        ]
+
+    def delete_flow(self, flow_entry: dict) -> None:
+        """Deletes the flows selected by a non-strict delete: by table, cookie and match, whatever their priority"""
+        flow_filter = {field: value for field, value in flow_entry.items() if field != "priority"}
+        flow_filter["table_id"] = flow_entry.get("table_id", 0)
+
+        self.flows[int(flow_entry["dpid"])] = [flow for flow in self.flows[int(flow_entry["dpid"])]
+                                               if not filter_flow(flow, flow_filter)]
+
+    def modify_flow_strict(self, flow_entry: dict) -> None:
+        for flow in self.flows[int(flow_entry["dpid"])]:
+            if (flow["priority"], flow["table_id"], flow["match"]) == \
+                    (flow_entry.get("priority", FLOW_ENTRY_DEFAULT_PRIORITY), flow_entry.get("table_id", 0),
+                format_match(flow_entry.get("match", {}))):
+                flow["actions"] = format_actions(flow_entry.get("actions", []))
+
+    def add_group(self, group_entry: dict) -> None:
+        self.groups[int(group_entry["dpid"])].append({
+            "type": group_entry.get("type", "ALL"),
+            "group_id": group_entry["group_id"],
+            "buckets": group_entry.get("buckets", [])
+        })
+
+    def delete_group(self, group_entry: dict) -> None:
+        self.groups[int(group_entry["dpid"])] = [group for group in self.groups[int(group_entry["dpid"])]
+                                                 if group["group_id"] != group_entry["group_id"]]
+
+
+class RyuStandIn:
+    """
+    Serves a SyntheticFabric over the Ryu REST API from a background thread.
+
+    Args:
+        fabric: the topology to serve
+        host: address to bind to
+        port: port to bind to. 0 picks a free port, see the url attribute once started.
+        latency: seconds added to every response, to mimic the processing time of a real controller
+    """
+
+    def __init__(self, fabric: SyntheticFabric, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.fabric = fabric
+        self.host = host
+        self.port = port
+        self.latency = latency
+
+        self.requests_served = 0
+        self.connections_opened = 0
+        self._client_connections = weakref.WeakSet()
+
+        self._event_websockets: dict[str, set[web.WebSocketResponse]] = {}
+        self._event_id = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[Thread] = None
+        self._started = Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._track_request])
+
+        app.router.add_get("/stats/switches", self._get_switches)
+        app.router.add_get("/v1.0/topology/switches", self._get_topology_switches)
+        app.router.add_get("/v1.0/topology/switches/{dpid}", self._get_topology_switches)
+        app.router.add_get("/v1.0/topology/links", self._get_topology_links)
+        app.router.add_get("/v1.0/topology/links/{dpid}", self._get_topology_links)
+        app.router.add_get("/v1.0/topology/hosts", self._get_topology_hosts)
+        app.router.add_get("/v1.0/topology/hosts/{dpid}", self._get_topology_hosts)
+        app.router.add_get("/stats/flow/{dpid}", self._get_flows)
+        app.router.add_post("/stats/flow/{dpid}", self._get_flows)
+        app.router.add_get("/stats/groupdesc/{dpid}", self._get_groups)
+        app.router.add_get("/stats/aggregateflow/{dpid}", self._get_aggregate_flow)
+        app.router.add_post("/stats/flowentry/{command}", self._modify_flow_entry)
+        app.router.add_post("/stats/groupentry/{command}", self._modify_group_entry)
+        app.router.add_get("/v1.0/topology/ws", self._subscribe_to_events)
+        app.router.add_get("/v1.0/otto/flows/ws", self._subscribe_to_events)
+
+        return app
+
+    @web.middleware
+    async def _track_request(self, request: web.Request, handler):
+        self.requests_served += 1
+
+        if request.transport not in self._client_connections:
+            self._client_connections.add(request.transport)
+            self.connections_opened += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return await handler(request)
+
+    async def _get_switches(self, request: web.Request) -> web.Response:
+        return web.json_response(sorted(self.fabric.flows))
+
+    async def _get_topology_switches(self, request: web.Request) -> web.Response:
+        return web.json_response(self.fabric.get_switches(request.match_info.get("dpid")))
+
+    async def _get_topology_links(self, request: web.Request) -> web.Response:
+        return web.json_response(self.fabric.get_links(request.match_info.get("dpid")))
+
+    async def _get_topology_hosts(self, request: web.Request) -> web.Response:
+        return web.json_response(self.fabric.get_hosts(request.match_info.get("dpid")))
+
+    async def _get_flows(self, request: web.Request) -> web.Response:
+        switch_id = request.match_info["dpid"]
+
+        if int(switch_id) not in self.fabric.flows:
+            return web.json_response({})
+
+        flow_filter = await request.json() if request.method == "POST" and request.can_read_body else {}
+        flows = [flow for flow in self.fabric.flows[int(switch_id)] if filter_flow(flow, flow_filter)]
+
+        return web.json_response({switch_id: json.loads(json.dumps(flows))})
+
+    async def _get_aggregate_flow(self, request: web.Request) -> web.Response:
+        switch_id = request.match_info["dpid"]
+
+        if int(switch_id) not in self.fabric.flows:
+            return web.json_response({})
+
+        flows = self.fabric.flows[int(switch_id)]
+
+        return web.json_response({switch_id: [{
+            "packet_count": sum(flow["packet_count"] for flow in flows),
+            "byte_count": sum(flow["byte_count"] for flow in flows),
+            "flow_count": len(flows)
+        }]})
+
+    async def _get_groups(self, request: web.Request) -> web.Response:
+        switch_id = request.match_info["dpid"]
+
+        return web.json_response({switch_id: self.fabric.groups.get(int(switch_id), [])})
+
+    async def _modify_flow_entry(self, request: web.Request) -> web.Response:
+        flow_entry = await request.json()
+
+        if int(flow_entry.get("dpid", 0)) not in self.fabric.flows:
+            return web.Response(status=404)
+
+        match request.match_info["command"]:
+            case "add":
+                self.fabric.add_flow(flow_entry)
+            case "delete":
+                self.fabric.delete_flow(flow_entry)
+            case "delete_strict":
+                self.fabric.delete_flow_strict(flow_entry)
+            case "modify_strict":
+                self.fabric.modify_flow_strict(flow_entry)
+            case _:
+                return web.Response(status=404)
+
+        return web.Response(status=200)
+
+    async def _modify_group_entry(self, request: web.Request) -> web.Response:
+        group_entry = await request.json()
+
+        if int(group_entry.get("dpid", 0)) not in self.fabric.groups:
+            return web.Response(status=404)
+
+        match request.match_info["command"]:
+            case "add":
+                self.fabric.add_group(group_entry)
+            case "modify":
+                self.fabric.delete_group(group_entry)
+                self.fabric.add_group(group_entry)
+            case "delete":
+                self.fabric.delete_group(group_entry)
+            case _:
+                return web.Response(status=404)
+
+        return web.Response(status=200)
+
+    async def _subscribe_to_events(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+
+        subscribers = self._event_websockets.setdefault(request.path, set())
+        subscribers.add(websocket)
+
+        try:
+            async for _ in websocket:  # replies sent back to the events are not needed
+                pass
+        finally:
+            subscribers.discard(websocket)
+
+        return websocket
+
+    def subscriber_count(self, path: str = "/v1.0/topology/ws") -> int:
+        return len(self._event_websockets.get(path, ()))
+
+    def push_event(self, method: str, params: dict, path: str = "/v1.0/topology/ws") -> None:
+        """
+        Sends an event as a JSON-RPC request to every client subscribed to the websocket at path,
+        in the same way as ryu.app.ws_topology, e.g. push_event("event_host_add", fabric.add_host(1))
+        """
+        self._event_id += 1
+
+        rpc_request = json.dumps({"jsonrpc": "2.0", "id": self._event_id, "method": method, "params": [params]})
+
+        async def send_event():
+            for websocket in list(self._event_websockets.get(path, ())):
+                await websocket.send_str(rpc_request)
+
+        asyncio.run_coroutine_threadsafe(send_event(), self._loop).result()
+
+    def start(self) -> "RyuStandIn":
+        """Starts serving in a background thread. Returns once the stand-in accepts connections."""
+        self._thread = Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+        return self
+
+    def _serve(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        self._runner = web.AppRunner(self.create_app())
+        self._loop.run_until_complete(self._runner.setup())
+
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+
+        self._loop.run_forever()
+
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self._close_event_websockets(), self._loop).result()
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    async def _close_event_websockets(self) -> None:
+        for subscribers in self._event_websockets.values():
+            for websocket in list(subscribers):
+                await websocket.close()
+
+    def __enter__(self) -> "RyuStandIn":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="Ryu stand-in",
+                                         description="Serve a generated topology over the Ryu REST APIs")
+    arg_parser.add_argument('--switches', type=int, default=5, help="Number of switches in the topology")
+    arg_parser.add_argument('--hosts-per-switch', type=int, default=1, help="Number of hosts on every switch")
+    arg_parser.add_argument('--topology', default="ring", choices=["ring", "linear"])
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+
+    args = arg_parser.parse_args()
+
+    stand_in = RyuStandIn(SyntheticFabric(args.switches, args.hosts_per_switch, args.topology),
+                          port=args.port, latency=args.latency).start()
+
+    print(f"Ryu stand-in serving {args.switches} switches on {stand_in.url}")
+
+    try:
+        stand_in._thread.join()
+    except KeyboardInterrupt:
+        stand_in.stop()
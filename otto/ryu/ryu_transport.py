@@ -0,0 +1,147 @@
+import os
+from threading import Lock
+from typing import Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_RYU_URL = "http://127.0.0.1:8080"
+DEFAULT_POOL_SIZE = 32
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10.0
+
+
+class RyuTransport:
+    """
+    HTTP transport used for every call Otto makes to the Ryu REST API. Calls share one
+    requests Session, so TCP connections to the controller are kept alive and reused from
+    a pool instead of being opened and torn down for each call.
+
+    The transport is configured either through its constructor or through the following
+    environment variables:
+        OTTO_RYU_URL: base URL of the Ryu REST API (default: http://127.0.0.1:8080)
+        OTTO_RYU_POOL_SIZE: maximum number of kept-alive connections to the controller
+        OTTO_RYU_CONNECT_TIMEOUT: seconds to wait when opening a connection
+        OTTO_RYU_READ_TIMEOUT: seconds to wait for the controller to answer a call
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, base_url: Optional[str] = None, pool_size: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+
+        self.base_url = (base_url or os.getenv("OTTO_RYU_URL", DEFAULT_RYU_URL)).rstrip("/")
+        self.pool_size = pool_size or int(os.getenv("OTTO_RYU_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.connect_timeout = connect_timeout or float(os.getenv("OTTO_RYU_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+        self.read_timeout = read_timeout or float(os.getenv("OTTO_RYU_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+
+        self._owner_pid = os.getpid()
+        self._session = self._create_session()
+
+    @classmethod
+    def get_instance(cls) -> "RyuTransport":
+        """
+        Returns the transport shared by the NetworkStateFinder and the IntentProcessor tools.
+        A process which was forked after the transport was created (e.g. a Gunicorn worker) gets
+        its own transport, as pooled sockets must not be shared between processes.
+        """
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._owner_pid != os.getpid():
+                cls._instance = cls()
+
+            return cls._instance
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        return self.request("GET", path, timeout=timeout, **kwargs)
+
+    def post(self, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        return self.request("POST", path, timeout=timeout, **kwargs)
+
+    def request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Sends a request to the Ryu REST API over the pooled session.
+        Args:
+            method: HTTP method
+            path: path of the Ryu API, e.g. /stats/switches
+            timeout: read deadline in seconds for this call. Defaults to the configured read timeout.
+        """
+        return self._session.request(method, self.url(path), timeout=self._timeout(timeout), **kwargs)
+
+    def _timeout(self, timeout: Optional[float]) -> tuple[float, float]:
+        return self.connect_timeout, timeout if timeout is not None else self.read_timeout
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class AsyncRyuTransport:
+    """
+    asyncio counterpart of the RyuTransport, backed by an aiohttp ClientSession. Calls issued on the
+    event loop share a pool of kept-alive connections, so many calls can be in flight without a thread
+    per call. Configured with the same arguments and OTTO_RYU_* environment variables as RyuTransport.
+
+    The aiohttp session is bound to the event loop on which the first call is made, so a transport
+    must only be used from a single event loop.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, pool_size: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+
+        self.base_url = (base_url or os.getenv("OTTO_RYU_URL", DEFAULT_RYU_URL)).rstrip("/")
+        self.pool_size = pool_size or int(os.getenv("OTTO_RYU_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.connect_timeout = connect_timeout or float(os.getenv("OTTO_RYU_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+        self.read_timeout = read_timeout or float(os.getenv("OTTO_RYU_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            )
+
+        return self._session
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    async def get_json(self, path: str, timeout: Optional[float] = None):
+        return await self.request_json("GET", path, timeout=timeout)
+
+    async def post_json(self, path: str, timeout: Optional[float] = None, **kwargs):
+        return await self.request_json("POST", path, timeout=timeout, **kwargs)
+
+    async def request_json(self, method: str, path: str, timeout: Optional[float] = None, **kwargs):
+        """
+        Sends a request to the Ryu REST API and returns the decoded JSON body. Raises
+        aiohttp.ClientResponseError for a non 2xx response.
+        Args:
+            method: HTTP method
+            path: path of the Ryu API, e.g. /stats/switches
+            timeout: read deadline in seconds for this call. Defaults to the configured read timeout.
+        """
+        request_timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout,
+                                                sock_read=timeout if timeout is not None else self.read_timeout)
+
+        async with self._get_session().request(method, self.url(path), timeout=request_timeout, **kwargs) as resp:
+            resp.raise_for_status()
+
+            return await resp.json(content_type=None)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
@@ -112,11 +112,12 @@ class OttoShell(cmd.Cmd):
             if args.pool_size:
                 self._otto_api.intent_processor_pool.pool_size = int(args.pool_size)
             if args.models:
-                self._otto_api.intent_processor_pool.models = args.pool_models
+                self._otto_api.intent_processor_pool.models = args.models
 
-            self._gm = GunicornManager(self._otto_api.app)
+            # the pool is created in each Gunicorn worker, as processors are never shared across processes
+            self._gm = GunicornManager(self._otto_api.app,
+                                       on_worker_start=self._otto_api.intent_processor_pool.create_pool)
 
-            self._otto_api.intent_processor_pool.create_pool()
             self._api_endpoints = True
 
             self._gm.start_in_background()
@@ -197,7 +198,7 @@ class OttoShell(cmd.Cmd):
         from langchain_core.runnables.config import RunnableConfig
         config = RunnableConfig(recursion_limit=100)
 
-        for output in self._agent.graph.stream({"messages": intent}, config):
+        for output in self._agent.stream({"messages": intent}, config):
             if 'save_intent' in output:
                 continue
             for key, value in output.items():
@@ -210,7 +211,7 @@ class OttoShell(cmd.Cmd):
 
     def non_verbose_output(self, intent):
         with yaspin(text="Attempting to fulfill intent..", color="cyan") as sp:
-            result = self._agent.graph.invoke({"messages": intent})
+            result = self._agent.invoke({"messages": intent})
             sp.ok()
         self._console.print(Markdown(f"**Operations completed:**\n{result['operations']}"))
 
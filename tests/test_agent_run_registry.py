@@ -0,0 +1,70 @@
+import unittest
+
+from otto.ryu.network_state_db.agent_run_registry import AgentRunRegistry
+from otto.ryu.network_state_db.network_snapshot import NetworkSnapshot
+
+
+def create_snapshot(state_id: str, switch_digests: dict) -> NetworkSnapshot:
+    return NetworkSnapshot(network_state={state_id: {switch: {} for switch in switch_digests}},
+                           flow_counters={},
+                           switch_digests=switch_digests)
+
+
+class TestAgentRunRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = AgentRunRegistry()
+        self.registry.register("agent-run-1", create_snapshot("state-1", {"s1": "a", "s2": "b", "s3": "c"}))
+
+        self.notifications = []
+        self.state_changed = self.registry.subscribe(
+            "agent-run-1", lambda agent_run_id, changed: self.notifications.append((agent_run_id, changed))
+        )
+
+    def test_notify__same_state_id(self):
+        self.registry.notify(create_snapshot("state-1", {"s1": "a", "s2": "b", "s3": "c"}))
+
+        self.assertFalse(self.state_changed.is_set())
+        self.assertEqual(self.notifications, [])
+
+    def test_notify__changed_added_and_removed_switches(self):
+        self.registry.notify(create_snapshot("state-2", {"s1": "a", "s2": "x", "s4": "d"}))
+
+        self.assertTrue(self.state_changed.is_set())
+        self.assertEqual(self.notifications, [("agent-run-1", {"s2", "s3", "s4"})])
+        self.assertEqual(self.registry.changed_switches("agent-run-1"), {"s2", "s3", "s4"})
+
+    def test_notify__only_new_changes_notified(self):
+        self.registry.notify(create_snapshot("state-2", {"s1": "a", "s2": "x", "s3": "c"}))
+        self.registry.notify(create_snapshot("state-3", {"s1": "a", "s2": "y", "s3": "c"}))
+        self.registry.notify(create_snapshot("state-4", {"s1": "z", "s2": "y", "s3": "c"}))
+
+        self.assertEqual(self.notifications, [("agent-run-1", {"s2"}), ("agent-run-1", {"s1", "s2"})])
+
+    def test_notify__own_writes_not_notified(self):
+        self.registry.register("agent-run-2", create_snapshot("state-1", {"s1": "a", "s2": "b", "s3": "c"}))
+        self.registry.record_writes("agent-run-1", {"s2"})
+
+        self.registry.notify(create_snapshot("state-2", {"s1": "a", "s2": "x", "s3": "c"}))
+
+        self.assertFalse(self.state_changed.is_set())
+        self.assertEqual(self.registry.changed_switches("agent-run-2"), {"s2"})
+
+        # the next change of the switch is not the agent run's own any more
+        self.registry.notify(create_snapshot("state-3", {"s1": "a", "s2": "y", "s3": "c"}))
+
+        self.assertEqual(self.notifications, [("agent-run-1", {"s2"})])
+
+    def test_unregister(self):
+        self.registry.unregister("agent-run-1")
+
+        self.assertEqual(len(self.registry), 0)
+        self.assertEqual(self.registry.changed_switches("agent-run-1"), set())
+
+        with self.assertRaises(KeyError):
+            self.registry.unregister("agent-run-1")
+
+    def test_given_state_ids(self):
+        self.registry.register("agent-run-2", create_snapshot("state-2", {"s1": "a"}))
+
+        self.assertEqual(self.registry.given_state_ids(), {"agent-run-1": "state-1", "agent-run-2": "state-2"})
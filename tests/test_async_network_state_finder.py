@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from otto.exceptions import FlowRetrievalException, SwitchRetrievalException
+from otto.ryu.network_state_db.async_network_state_finder import AsyncNetworkStateFinder
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import AsyncRyuTransport, RyuTransport
+
+
+class TestAsyncNetworkStateFinder(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = RyuStandIn(SyntheticFabric(12, hosts_per_switch=2)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stand_in.stop()
+
+    def _run(self, coroutine_function, base_url=None):
+        async def run():
+            finder = AsyncNetworkStateFinder(max_concurrency=8,
+                                             transport=AsyncRyuTransport(base_url=base_url or self.stand_in.url))
+            try:
+                return await coroutine_function(finder)
+            finally:
+                await finder.close()
+
+        return asyncio.run(run())
+
+    def test_get_network_state__matches_sync_finder(self):
+        sync_state = NetworkStateFinder(transport=RyuTransport(base_url=self.stand_in.url)).get_network_state()
+        async_state = self._run(lambda finder: finder.get_network_state())
+
+        self.assertEqual(async_state, sync_state)
+        self.assertEqual(next(iter(async_state)), next(iter(sync_state)))
+
+    def test_get_network_state__bulk_matches_per_switch(self):
+        async def collect(finder):
+            return await finder.get_network_state(), await AsyncNetworkStateFinder(
+                transport=finder._transport, bulk_topology=False).get_network_state()
+
+        bulk_state, per_switch_state = self._run(collect)
+
+        self.assertEqual(bulk_state, per_switch_state)
+
+    def test_get_network_state__sync_wrapper(self):
+        transport = RyuTransport(base_url=self.stand_in.url)
+
+        with NetworkStateFinder(transport=transport, use_asyncio=True) as wrapping_finder:
+            wrapped_state = wrapping_finder.get_network_state()
+
+        threaded_state = NetworkStateFinder(transport=transport).get_network_state()
+
+        self.assertEqual(wrapped_state, threaded_state)
+
+    def test_refresh_and_probe__sync_wrapper(self):
+        transport = RyuTransport(base_url=self.stand_in.url)
+        threaded_finder = NetworkStateFinder(transport=transport)
+        network_snapshot = threaded_finder.get_network_snapshot()
+
+        with NetworkStateFinder(transport=transport, use_asyncio=True) as wrapping_finder:
+            self.assertEqual(wrapping_finder.probe_network(), threaded_finder.probe_network())
+            self.assertEqual(wrapping_finder.refresh_network_snapshot(network_snapshot, {"0000000000000003"},
+                                                                      {"000000000000000c"}),
+                             threaded_finder.refresh_network_snapshot(network_snapshot, {"0000000000000003"},
+                                                                      {"000000000000000c"}))
+
+            event_loop_thread = wrapping_finder._event_loop_thread
+
+        self.assertFalse(event_loop_thread._thread.is_alive())
+
+    def test_get_switches__connection_error(self):
+        with self.assertRaises(SwitchRetrievalException):
+            self._run(lambda finder: finder.get_switches(), base_url="http://127.0.0.1:1")
+
+    def test_get_switches__non_200(self):
+        with self.assertRaises(SwitchRetrievalException):
+            self._run(lambda finder: finder.get_switches(), base_url=f"{self.stand_in.url}/missing")
+
+    def test_get_installed_flows__non_200(self):
+        with self.assertRaises(FlowRetrievalException):
+            self._run(lambda finder: finder.get_installed_flows("1"), base_url=f"{self.stand_in.url}/missing")
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from otto.ryu.intent_engine.flow_batch import apply_operations, validate_operation
+from otto.ryu.intent_engine.intent_processor_agent_tools import apply_flow_batch
+from otto.ryu.intent_engine.run_state_overlay import RunStateOverlay
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def dpid(switch_id: int) -> str:
+    return format(switch_id, '016x')
+
+
+def create_rule(operation: str, switch_id: str, destination: str, port: int) -> dict:
+    return {"operation": operation, "switch_id": switch_id, "table_id": 0, "priority": 100,
+            "match": {"dl_type": 2048, "nw_dst": destination}, "actions": [{"type": "OUTPUT", "port": port}]}
+
+
+class TestFlowBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.fabric = SyntheticFabric(4)
+        self.stand_in = RyuStandIn(self.fabric).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+
+        self.network_elements = {dpid(switch_id): {} for switch_id in range(1, 6)}  # switch 5 is not in Ryu
+
+    def tearDown(self):
+        self.transport.close()
+        self.stand_in.stop()
+
+    def test_validate_operation(self):
+        self.assertEqual(validate_operation(create_rule("add_rule", "2", "10.0.0.2", 2), self.network_elements),
+                         (dpid(2), None))
+        self.assertEqual(validate_operation(create_rule("add_rule", "7", "10.0.0.2", 2), self.network_elements),
+                         (None, "switch 7 is not in the network"))
+        self.assertEqual(validate_operation({"operation": "delete_group", "switch_id": dpid(3)},
+                                            self.network_elements),
+                         (dpid(3), "missing group_id"))
+        self.assertEqual(validate_operation({**create_rule("add_rule", "1", "10.0.0.2", 2), "priority": "high"},
+                                            self.network_elements),
+                         (dpid(1), "priority must be of type int"))
+        self.assertEqual(validate_operation({**create_rule("add_rule", "1", "10.0.0.2", 2), "cookie": 5},
+                                            self.network_elements),
+                         (dpid(1), "unexpected cookie"))
+        self.assertIn("unknown operation", validate_operation({"operation": "add_flow"}, self.network_elements)[1])
+
+    def test_apply_operations(self):
+        operations = [create_rule("add_rule", str(switch_id), "10.0.0.2", 2) for switch_id in range(1, 5)] + \
+                     [create_rule("modify_rule_strict", "1", "10.0.0.2", 3),
+                      {"operation": "add_group", "switch_id": "2", "group_id": 1, "bucket_type": "ALL",
+                       "buckets": [{"actions": [{"type": "OUTPUT", "port": 1}]}]}]
+
+        results = apply_operations(operations, self.network_elements, self.transport)
+
+        self.assertEqual([result["status"] for result in results], [200] * 6)
+        self.assertEqual([result["switch"] for result in results], [dpid(1), dpid(2), dpid(3), dpid(4), dpid(1),
+                                                                    dpid(2)])
+        self.assertEqual(len(self.fabric.flows[3]), 2)
+        self.assertEqual(self.fabric.flows[1][-1]["actions"], ["OUTPUT:3"])
+        self.assertEqual(len(self.fabric.groups[2]), 1)
+
+    def test_apply_operations__invalid_batch_not_applied(self):
+        operations = [create_rule("add_rule", "1", "10.0.0.2", 2),
+                      {**create_rule("add_rule", "1", "10.0.0.3", 3), "table_id": "0"}]
+
+        results = apply_operations(operations, self.network_elements, self.transport)
+
+        self.assertEqual([result["status"] for result in results],
+                         ["not applied", "invalid: table_id must be of type int"])
+        self.assertEqual(self.stand_in.requests_served, 0)
+        self.assertEqual(len(self.fabric.flows[1]), 1)
+
+    def test_apply_operations__failed_switch_skipped(self):
+        operations = [create_rule("add_rule", "5", "10.0.0.2", 2), create_rule("add_rule", "5", "10.0.0.3", 3),
+                      create_rule("add_rule", "1", "10.0.0.2", 2)]
+
+        results = apply_operations(operations, self.network_elements, self.transport)
+
+        self.assertEqual([result["status"] for result in results], [404, "skipped", 200])
+
+    def test_apply_flow_batch(self):
+        tool_node = ToolNode([apply_flow_batch])
+        operations = [create_rule("add_rule", str(switch_id), "10.0.0.2", 2) for switch_id in range(1, 4)]
+
+        tool_calls = AIMessage(content="", tool_calls=[
+            {"name": "apply_flow_batch", "args": {"operations": operations}, "id": "1"}
+        ])
+
+        with patch.object(RyuTransport, "get_instance", return_value=self.transport):
+            status_table, = tool_node.invoke({"messages": [tool_calls], "agent_run_id": "run-1",
+                                              "network_state": {"state-1": self.network_elements}})["messages"]
+
+        switch_view = RunStateOverlay.get_instance().view_switch("run-1", {"state-1": self.network_elements}, dpid(3))
+        RunStateOverlay.get_instance().discard("run-1")
+
+        self.assertTrue(status_table.content.startswith("3 of 3 operations applied"))
+        self.assertIn(f"2|add_rule|{dpid(3)}|200", status_table.content)
+        self.assertEqual(len(switch_view["installedFlows"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from otto.ryu.intent_engine.flow_batch import apply_operations
+from otto.ryu.intent_engine.flow_verification import normalise_expected_flow, verify_flows
+from otto.ryu.intent_engine.intent_processor_agent_tools import verify_flows as verify_flows_tool
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def create_flow(switch_id: str, destination: str, port: int, **fields) -> dict:
+    return {"switch_id": switch_id, "table_id": 0, "priority": 100,
+            "match": {"dl_type": 2048, "nw_dst": destination}, "actions": [{"type": "OUTPUT", "port": port}],
+            **fields}
+
+
+class TestFlowVerification(unittest.TestCase):
+
+    def setUp(self):
+        self.fabric = SyntheticFabric(3)
+        self.stand_in = RyuStandIn(self.fabric).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+
+        network_elements = {format(switch_id, '016x'): {} for switch_id in range(1, 4)}
+        operations = [{"operation": "add_rule", **create_flow(str(switch_id), "10.0.0.2", 2)}
+                      for switch_id in range(1, 4)]
+
+        apply_operations(operations, network_elements, self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.stand_in.stop()
+
+    def test_get_matching_flows(self):
+        nw_state_finder = NetworkStateFinder(transport=self.transport)
+
+        self.assertEqual(len(nw_state_finder.get_installed_flows("1")), 2)
+        self.assertEqual(len(nw_state_finder.get_matching_flows("1", {"priority": 100})), 1)
+        self.assertEqual(len(nw_state_finder.get_matching_flows("1", {"match": {"nw_dst": "10.0.0.2"}})), 1)
+        self.assertEqual(len(nw_state_finder.get_matching_flows("1", {"table_id": 1})), 0)
+
+    def test_normalise_expected_flow(self):
+        flow, error = normalise_expected_flow({"switch_id": "0000000000000002", "match": {"in_port": 1}})
+
+        self.assertIsNone(error)
+        self.assertEqual(flow, {"switch_id": "2", "table_id": 0, "priority": 32768, "match": {"in_port": 1},
+                                "actions": [], "absent": False})
+        self.assertTrue(normalise_expected_flow({"operation": "delete_rule_strict",
+                                                 **create_flow("1", "10.0.0.2", 2)})[0]["absent"])
+        self.assertEqual(normalise_expected_flow({"operation": "add_group", "switch_id": "1"}),
+                         (None, "cannot verify operation add_group"))
+        self.assertEqual(normalise_expected_flow({"switch_id": "s1"}), (None, "unknown switch s1"))
+
+    def test_verify_flows(self):
+        expected_flows = [create_flow("1", "10.0.0.2", 2), create_flow("2", "10.0.0.2", 3),
+                          create_flow("3", "10.0.0.3", 2), create_flow("3", "10.0.0.2", 2, absent=True),
+                          create_flow("1", "10.0.0.3", 2, absent=True), create_flow("1", "10.0.0.2", 2, priority="1")]
+
+        results = verify_flows(expected_flows, self.transport)
+
+        self.assertEqual([result["status"] for result in results],
+                         ["pass", "actions differ: OUTPUT:2", "missing", "still installed", "pass",
+                          "invalid: table_id and priority must be of type int"])
+        self.assertEqual(results[0], {"switch": "1", "priority": 100, "match": {"dl_type": 2048, "nw_dst": "10.0.0.2"},
+                                      "status": "pass"})
+
+    def test_verify_flows__openflow_13_match_fields(self):
+        # the stand-in, as ofctl_v1_3, reports the flow with the legacy names of its match fields
+        flow = {**create_flow("2", "10.0.0.4", 3), "match": {"eth_type": "0x0800", "ipv4_dst": "10.0.0.4",
+                                                             "ip_proto": 6, "tcp_dst": 80}}
+
+        apply_operations([{"operation": "add_rule", **flow}], {format(2, '016x'): {}}, self.transport)
+
+        self.assertEqual(self.fabric.flows[2][-1]["match"], {"dl_type": 2048, "nw_dst": "10.0.0.4", "nw_proto": 6,
+                                                             "tp_dst": 80})
+        self.assertEqual([result["status"] for result in verify_flows([flow, {**flow, "actions": []}],
+                                                                      self.transport)],
+                         ["pass", "actions differ: OUTPUT:3"])
+
+    def test_verify_flows__switch_not_in_ryu(self):
+        status, = [result["status"] for result in verify_flows([create_flow("9", "10.0.0.2", 2)], self.transport)]
+
+        self.assertEqual(status, "missing")
+
+    def test_verify_flows_tool(self):
+        tool_calls = AIMessage(content="", tool_calls=[
+            {"name": "verify_flows", "args": {"flows": [create_flow("1", "10.0.0.2", 2),
+                                                        create_flow("2", "10.0.0.3", 2)]}, "id": "1"}
+        ])
+
+        with patch.object(RyuTransport, "get_instance", return_value=self.transport):
+            verification_table, = ToolNode([verify_flows_tool]).invoke({"messages": [tool_calls]})["messages"]
+
+        self.assertTrue(verification_table.content.startswith("1 of 2 flows verified"))
+        self.assertIn("1|2|100|dl_type=2048,nw_dst=10.0.0.3|missing", verification_table.content)
+
+
+if __name__ == '__main__':
+    unittest.main()
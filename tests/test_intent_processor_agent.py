@@ -0,0 +1,214 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from otto.intent_utils.agent_state import add_token_usage
+from otto.ryu.intent_engine.intent_processor_agent import IntentProcessor
+from otto.ryu.intent_engine.intent_processor_agent_tools import create_tool_list
+from otto.ryu.intent_engine.run_cookie import run_cookie
+from otto.ryu.intent_engine.run_state_overlay import RunStateOverlay
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+from tests.test_network_state_encoder import create_network_state
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """Answers with the messages given to it, and records the prompts it receives"""
+    model_name: str = "fake-model"
+    prompts: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+class FakeNetworkStateBroker:
+    def __init__(self):
+        self.changed = set()
+        self.agent_runs = set()
+        self.written_switches = {}
+
+    def provide_network_state(self, agent_run_id: str) -> dict:
+        self.agent_runs.add(agent_run_id)
+        return {"state-1": {}}
+
+    def subscribe(self, agent_run_id: str, callback=None):
+        pass
+
+    def changed_switches(self, agent_run_id: str) -> set[str]:
+        return set(self.changed)
+
+    def record_writes(self, agent_run_id: str, switches: set[str]):
+        self.written_switches.setdefault(agent_run_id, set()).update(switches)
+
+    def terminate_agent_run(self, agent_run_id: str):
+        self.agent_runs.remove(agent_run_id)
+
+
+class FakeProcessedIntentsDb:
+    def __init__(self):
+        self.saved_intents = []
+
+    def save_intent(self, **intent):
+        self.saved_intents.append(intent)
+
+
+def create_response(input_tokens: int, cache_read: int) -> AIMessage:
+    return AIMessage(content="done", usage_metadata={"input_tokens": input_tokens, "output_tokens": 10,
+                                                     "total_tokens": input_tokens + 10,
+                                                     "input_token_details": {"cache_read": cache_read}})
+
+
+class TestIntentProcessorPromptLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.model = FakeChatModel(messages=iter([create_response(1000, 0), create_response(1100, 900)]),
+                                   prompts=[])
+        self.network_state_broker = FakeNetworkStateBroker()
+
+        self.processor = IntentProcessor(self.model, create_tool_list(), "system prompt",
+                                         network_state_broker=self.network_state_broker)
+
+        self.state = {
+            "agent_run_id": "agent-run-1",
+            "messages": [HumanMessage(content="host-1-1 should reach host-2-1")],
+            "encoded_network_state": "network state 3f1c9a2e"
+        }
+
+    def test_reason_intent__stable_prefix(self):
+        first_update = self.processor.reason_intent(self.state)
+
+        self.state["messages"] += first_update["messages"] + [ToolMessage(content="200", tool_call_id="call-1")]
+        self.processor.reason_intent(self.state)
+
+        first_prompt, second_prompt = self.model.prompts
+
+        self.assertIsInstance(first_prompt[0], SystemMessage)
+        self.assertEqual(first_prompt[0].content, "system prompt")
+        self.assertEqual(first_prompt[1].content, "host-1-1 should reach host-2-1")
+        self.assertEqual(first_prompt[2].content, "Current Network State:\nnetwork state 3f1c9a2e")
+
+        self.assertEqual(len(first_prompt), 3)
+        self.assertEqual(second_prompt[:3], first_prompt)
+        self.assertEqual(len(second_prompt), 5)
+
+    def test_reason_intent__state_delta(self):
+        self.network_state_broker.changed = {"0000000000000002"}
+
+        first_update = self.processor.reason_intent(self.state)
+
+        state_delta, response = first_update["messages"]
+
+        self.assertIn("0000000000000002", state_delta.content)
+        self.assertEqual(first_update["notified_switches"], ["0000000000000002"])
+
+        self.state["messages"] += first_update["messages"]
+        self.state["notified_switches"] = first_update["notified_switches"]
+
+        second_update = self.processor.reason_intent(self.state)
+
+        self.assertEqual(len(second_update["messages"]), 1)
+        self.assertEqual(self.model.prompts[1][:len(self.model.prompts[0])], self.model.prompts[0])
+
+    def test_reason_intent__token_usage(self):
+        first_update = self.processor.reason_intent(self.state)
+        self.state["messages"] += first_update["messages"]
+        second_update = self.processor.reason_intent(self.state)
+
+        token_usage = add_token_usage(add_token_usage({}, first_update["token_usage"]), second_update["token_usage"])
+
+        self.assertEqual(token_usage, {"calls": 2, "input_tokens": 2100, "output_tokens": 20,
+                                       "cache_read_tokens": 900, "cache_creation_tokens": 0})
+
+    def test_save_intent__every_tool_call(self):
+        self.processor.processed_intents_db_conn = FakeProcessedIntentsDb()
+
+        self.state["messages"] += [
+            AIMessage(content="", tool_calls=[
+                {"name": "add_rule", "args": {"switch_id": "1", "match": {"in_port": 1}}, "id": "call-1"},
+                {"name": "add_rule", "args": {"switch_id": "2", "match": {"in_port": 2}}, "id": "call-2"}
+            ]),
+            ToolMessage(content="200", tool_call_id="call-1"),
+            ToolMessage(content="200", tool_call_id="call-2"),
+            AIMessage(content="", tool_calls=[
+                {"name": "delete_rule_strict", "args": {"switch_id": "1"}, "id": "call-3"}
+            ]),
+            AIMessage(content="done")
+        ]
+
+        operations = self.processor.save_intent(self.state)["operations"]
+
+        self.assertEqual(operations, [{"add_rule": {"switch_id": "1", "match": {"in_port": 1}}},
+                                      {"add_rule": {"switch_id": "2", "match": {"in_port": 2}}},
+                                      {"delete_rule_strict": {"switch_id": "1"}}])
+        self.assertEqual(self.processor.processed_intents_db_conn.saved_intents[0]["called_tools"], operations)
+        self.assertEqual(self.processor.processed_intents_db_conn.saved_intents[0]["cookie"],
+                         run_cookie(self.state["agent_run_id"]))
+
+    def test_invoke__agent_run_terminated_on_error(self):
+        self.processor.graph = Mock(invoke=Mock(side_effect=RuntimeError("model unavailable")))
+
+        with self.assertRaises(RuntimeError):
+            self.processor.invoke({"messages": [HumanMessage(content="host-1-1 should reach host-2-1")]})
+
+        agent_run_input = self.processor.graph.invoke.call_args.args[0]
+
+        self.assertEqual(agent_run_input["network_state"], {"state-1": {}})
+        self.assertNotIn(agent_run_input["agent_run_id"], self.network_state_broker.agent_runs)
+
+    def test_stream__agent_run_terminated_when_abandoned(self):
+        self.processor.graph = Mock(stream=Mock(return_value=iter([{"construct_network_state": {}},
+                                                                   {"reason_intent": {}}])))
+
+        steps = self.processor.stream({"messages": [HumanMessage(content="host-1-1 should reach host-2-1")]})
+        next(steps)
+
+        self.assertEqual(len(self.network_state_broker.agent_runs), 1)
+
+        steps.close()
+
+        self.assertEqual(self.network_state_broker.agent_runs, set())
+
+    def test_execute_action__records_accepted_writes(self):
+        stand_in = RyuStandIn(SyntheticFabric(3)).start()
+        transport = RyuTransport(base_url=stand_in.url)
+        self.addCleanup(stand_in.stop)
+        self.addCleanup(transport.close)
+        self.addCleanup(RunStateOverlay.get_instance().discard, "agent-run-1")
+
+        rule = {"table_id": 0, "priority": 100, "match": {"in_port": 1}, "actions": []}
+
+        self.state["network_state"] = create_network_state()
+        self.state["messages"] += [AIMessage(content="", tool_calls=[
+            {"name": "add_rule", "args": {"switch_id": "2", **rule}, "id": "call-1"},
+            {"name": "add_rule", "args": {"switch_id": "9", **rule}, "id": "call-2"},
+            {"name": "get_flows", "args": {"switch_id": "3"}, "id": "call-3"}
+        ])]
+
+        with patch.object(RyuTransport, "get_instance", return_value=transport):
+            result = self.processor.execute_action(self.state, {})
+
+        # Ryu refused the rule on switch 9, which is not connected to it
+        self.assertEqual([message.content for message in result["messages"]][:2], ["200", "404"])
+        self.assertEqual(self.network_state_broker.written_switches, {"agent-run-1": {"0000000000000002"}})
+
+    def test_cacheable__anthropic(self):
+        anthropic_processor = IntentProcessor(ChatAnthropic(model="claude-3-5-sonnet-latest", api_key="test"),
+                                              create_tool_list(), "system prompt",
+                                              network_state_broker=self.network_state_broker)
+
+        system_message = anthropic_processor.cacheable(SystemMessage(content="system prompt"))
+
+        self.assertEqual(system_message.content, [{"type": "text", "text": "system prompt",
+                                                   "cache_control": {"type": "ephemeral"}}])
+        self.assertEqual(self.processor.cacheable(SystemMessage(content="system prompt")).content, "system prompt")
+
+
+if __name__ == '__main__':
+    unittest.main()
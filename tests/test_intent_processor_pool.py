@@ -0,0 +1,92 @@
+import unittest
+
+from otto.ryu.intent_engine.intent_processor_pool import IntentProcessorPool
+
+
+class FakeProcessor:
+    def __init__(self, model: str):
+        self.model = model
+
+
+class TestIntentProcessorPool(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def processor_factory(model: str) -> FakeProcessor:
+            processor = FakeProcessor(model)
+            self.created.append(processor)
+            return processor
+
+        self.pool = IntentProcessorPool(models=["gpt-4o", "deepseek-chat"], pool_size=4,
+                                        processor_factory=processor_factory)
+
+    def test_create_pool(self):
+        self.pool.create_pool()
+
+        self.assertEqual(self.pool.processors_per_model, 2)
+        self.assertEqual(self.pool.idle_count("gpt-4o"), 2)
+        self.assertEqual(self.pool.idle_count("deepseek-chat"), 2)
+        self.assertEqual(len(self.created), 4)
+
+        self.pool.create_pool()
+
+        self.assertEqual(len(self.created), 4)
+
+    def test_processor__reused(self):
+        with self.pool.processor("gpt-4o") as first:
+            pass
+
+        with self.pool.processor("gpt-4o") as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+
+    def test_processor__separate_models(self):
+        with self.pool.processor("gpt-4o") as gpt_processor, \
+                self.pool.processor("deepseek-chat") as deepseek_processor:
+            self.assertEqual(gpt_processor.model, "gpt-4o")
+            self.assertEqual(deepseek_processor.model, "deepseek-chat")
+
+    def test_checkout__empty_pool(self):
+        self.pool.create_pool()
+
+        processors = [self.pool.checkout("gpt-4o") for _ in range(3)]
+
+        self.assertEqual(len(set(map(id, processors))), 3)
+        self.assertEqual(len(self.created), 5)
+        self.assertEqual(self.pool.idle_count("gpt-4o"), 0)
+
+        for processor in processors:
+            self.pool.checkin("gpt-4o", processor)
+
+        self.assertEqual(self.pool.idle_count("gpt-4o"), 2)
+
+    def test_checkin__processor_raised(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.processor("gpt-4o"):
+                raise RuntimeError("agent run failed")
+
+        self.assertEqual(self.pool.idle_count("gpt-4o"), 1)
+
+    def test_processors_per_model__defaults(self):
+        pool = IntentProcessorPool()
+
+        self.assertEqual(pool.processors_per_model, 1)
+
+    def test_forked_process(self):
+        self.pool.create_pool()
+
+        self.pool._owner_pid = -1  # as seen from a process forked after the pool was created
+
+        self.assertEqual(self.pool.idle_count("gpt-4o"), 0)
+
+        with self.pool.processor("gpt-4o"):
+            pass
+
+        self.assertEqual(len(self.created), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from otto.intent_utils.network_state_encoder import encode_topology_summary
+from otto.ryu.intent_engine.intent_processor_agent_tools import (find_host, find_switch, get_flows, get_groups,
+                                                                 list_hosts)
+from tests.test_network_state_encoder import create_network_state
+
+
+class TestIntentProcessorReadTools(unittest.TestCase):
+
+    def setUp(self):
+        self.network_state = create_network_state()
+
+    def test_find_switch(self):
+        self.assertEqual(find_switch(self.network_state, "1")[0], "0000000000000001")
+        self.assertEqual(find_switch(self.network_state, "0000000000000002")[0], "0000000000000002")
+
+        with self.assertRaises(ValueError):
+            find_switch(self.network_state, "3")
+
+    def test_list_hosts(self):
+        self.assertEqual(list_hosts.func(network_state=self.network_state), "\n".join([
+            " hosts[switch|port|id|mac|ipv4|ipv6]",
+            "  0000000000000001|s1-eth1|host-1-1|00:00:00:00:00:01|10.0.0.1|-"
+        ]))
+
+    def test_find_host(self):
+        for address in ["10.0.0.1", "00:00:00:00:00:01", "00:00:00:00:00:01".upper()]:
+            self.assertIn("|host-1-1|", find_host.func(address, network_state=self.network_state))
+
+        self.assertEqual(find_host.func("10.0.0.9", network_state=self.network_state),
+                         "No host found with address 10.0.0.9")
+
+    def test_get_flows(self):
+        all_flows = get_flows.func("1", network_state=self.network_state)
+
+        self.assertEqual(len(all_flows.splitlines()), 4)
+
+        matching_flows = get_flows.func("1", network_state=self.network_state, table_id=0,
+                                        match={"ipv4_dst": "10.0.0.2"})
+
+        self.assertEqual(matching_flows.splitlines()[-1],
+                         "  9a8b7c6d|0|100|0|0|0|eth_type=2048,ipv4_dst=10.0.0.2|OUTPUT:2")
+
+        # the legacy names reported by Ryu select the same flows as the OpenFlow 1.3 names
+        self.assertEqual(get_flows.func("1", network_state=self.network_state, match={"nw_dst": "10.0.0.2",
+                                                                                      "dl_type": "0x0800"}),
+                         matching_flows)
+
+        self.assertEqual(get_flows.func("2", network_state=self.network_state),
+                         "No matching flows found on switch 0000000000000002")
+
+    def test_get_groups(self):
+        self.assertEqual(get_groups.func("1", network_state=self.network_state).splitlines()[-1],
+                         "  1|SELECT|w50:OUTPUT:2")
+
+    def test_encode_topology_summary(self):
+        self.assertEqual(encode_topology_summary(self.network_state), "\n".join([
+            "topology summary of network state 3f1c9a2e",
+            " switches[dpid|hosts|flows|groups|links]",
+            "  0000000000000001|1|2|1|s1-eth2>s2-eth2",
+            "  0000000000000002|0|0|0|s2-eth2>s1-eth2"
+        ]))
+
+
+if __name__ == '__main__':
+    unittest.main()
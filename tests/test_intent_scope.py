@@ -0,0 +1,76 @@
+import unittest
+
+from otto.intent_utils.intent_scope import find_scope, resolve_intent_nodes, scope_network_state
+from otto.ryu.intent_engine.path_index import PathIndex
+from otto.ryu.intent_engine.topology_cache import build_topology
+
+
+def dpid(switch_id: int) -> str:
+    return format(switch_id, '016x')
+
+
+def create_line_network(switch_count: int) -> tuple[dict, PathIndex]:
+    """Switches s1 - s2 - ... - sN in a line, with host-N-1 connected to port 1 of every switch"""
+    network_elements = {}
+
+    for switch_id in range(1, switch_count + 1):
+        host_id = f"host-{switch_id}-1"
+
+        network_elements[dpid(switch_id)] = {
+            "name": dpid(switch_id),
+            "connectedHosts": {f"s{switch_id}-eth1": {"id": host_id, "mac": f"00:00:00:00:00:{switch_id:02x}",
+                                                      "ipv4": [f"10.0.0.{switch_id}"], "ipv6": []}},
+            "portMappings": {}
+        }
+
+        if switch_id > 1:
+            network_elements[dpid(switch_id)]["portMappings"][f"s{switch_id}-eth3"] = f"s{switch_id - 1}-eth2"
+            network_elements[dpid(switch_id - 1)]["portMappings"][f"s{switch_id - 1}-eth2"] = f"s{switch_id}-eth3"
+
+    return {"state-1": network_elements}, build_topology(network_elements).path_index
+
+
+class TestIntentScope(unittest.TestCase):
+
+    def setUp(self):
+        self.network_state, self.path_index = create_line_network(10)
+
+    def test_resolve_intent_nodes(self):
+        network_elements = self.network_state["state-1"]
+
+        self.assertEqual(resolve_intent_nodes("host-1-1 should reach host-2-1 via ssh", network_elements),
+                         {"host-1-1", "host-2-1"})
+        self.assertEqual(resolve_intent_nodes("Block 10.0.0.3 from reaching 00:00:00:00:00:04", network_elements),
+                         {"host-3-1", "host-4-1"})
+        self.assertEqual(resolve_intent_nodes("Mirror s5-eth1 traffic on switch 6 and 0000000000000007",
+                                              network_elements),
+                         {dpid(5), dpid(6), dpid(7)})
+        self.assertEqual(resolve_intent_nodes("Allow host-42-1 to reach 192.168.1.1", network_elements), set())
+
+    def test_find_scope(self):
+        self.assertEqual(find_scope({"host-3-1", "host-5-1"}, self.path_index),
+                         {"host-3-1", "host-4-1", "host-5-1"} |
+                         {dpid(switch_id) for switch_id in range(2, 7)})
+
+    def test_scope_network_state(self):
+        scoped_state = scope_network_state("host-3-1 should reach host-5-1 via ssh", self.network_state,
+                                           self.path_index)
+
+        self.assertEqual(list(scoped_state), ["state-1"])
+        self.assertEqual(set(scoped_state["state-1"]), {dpid(switch_id) for switch_id in range(2, 7)})
+
+    def test_scope_network_state__single_switch(self):
+        scoped_state = scope_network_state("Drop all UDP traffic on s1", self.network_state, self.path_index)
+
+        self.assertEqual(set(scoped_state["state-1"]), {dpid(1), dpid(2)})
+
+    def test_scope_network_state__fallback(self):
+        self.assertIsNone(scope_network_state("Make sure the web servers are reachable", self.network_state,
+                                              self.path_index))
+        self.assertIsNone(scope_network_state("Allow every host to reach host-1-1", self.network_state,
+                                              self.path_index))
+        self.assertIsNone(scope_network_state("host-1-1 should reach host-2-1", {}, self.path_index))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,324 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from otto.exceptions import SwitchRetrievalException
+from otto.ryu.network_state_db.network_state_broker import NetworkStateBroker
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.ryu_event_listener import FLOW_EVENTS_PATH, TOPOLOGY_EVENTS_PATH, switches_affected_by
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+
+    return False
+
+
+class TestSwitchesAffectedBy(unittest.TestCase):
+
+    def test_switch_events(self):
+        self.assertEqual(switches_affected_by("event_switch_enter", {"dpid": "0000000000000004", "ports": []}),
+                         ({"0000000000000004"}, set()))
+        self.assertEqual(switches_affected_by("event_switch_leave", {"dpid": "0000000000000004", "ports": []}),
+                         (set(), {"0000000000000004"}))
+
+    def test_link_events(self):
+        link = {"src": {"dpid": "0000000000000001", "name": "s1-eth2"},
+                "dst": {"dpid": "000000000000000a", "name": "s10-eth3"}}
+
+        self.assertEqual(switches_affected_by("event_link_delete", link),
+                         ({"0000000000000001", "000000000000000a"}, set()))
+
+    def test_host_and_flow_events(self):
+        self.assertEqual(switches_affected_by("event_host_add", {"mac": "00:00:00:00:00:01",
+                                                                 "port": {"dpid": "0000000000000002"}}),
+                         ({"0000000000000002"}, set()))
+
+        # the flow event relay sends the DPID as an integer
+        self.assertEqual(switches_affected_by("event_flow_removed", {"dpid": 11, "cookie": 0}),
+                         ({"000000000000000b"}, set()))
+
+    def test_unknown_event(self):
+        self.assertEqual(switches_affected_by("event_unknown", {}), (set(), set()))
+
+
+class TestNetworkStateBrokerSnapshotCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = RyuStandIn(SyntheticFabric(10), latency=0.02).start()
+        cls.transport = RyuTransport(base_url=cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.transport.close()
+        cls.stand_in.stop()
+
+    def _create_broker(self, max_staleness=60.0, transport=None):
+        return NetworkStateBroker(event_driven=False, max_staleness=max_staleness,
+                                  network_state_finder=NetworkStateFinder(transport=transport or self.transport))
+
+    def test_provide_network_state__fresh_snapshot_reused(self):
+        broker = self._create_broker()
+        requests_before = self.stand_in.requests_served
+
+        first_network_state = broker.provide_network_state("agent-run-1")
+        second_network_state = broker.provide_network_state("agent-run-2")
+
+        # a single sweep: /stats/switches, three topology calls, then flows and groups of each switch
+        self.assertEqual(self.stand_in.requests_served - requests_before, 1 + 3 + 2 * 10)
+        self.assertIs(first_network_state, second_network_state)
+        self.assertEqual(broker.snapshot_version, 1)
+        self.assertLess(broker.snapshot_age, 60.0)
+
+    def test_provide_network_state__stale_snapshot_collected_again(self):
+        broker = self._create_broker()
+
+        broker.provide_network_state("agent-run-1")
+        broker.provide_network_state("agent-run-2", max_staleness=0)
+
+        self.assertEqual(broker.snapshot_version, 2)
+
+    def test_provide_network_state__concurrent_runs_share_one_collection(self):
+        broker = self._create_broker()
+        run_count = 10
+        barrier = Barrier(run_count)
+
+        def provide(run_number):
+            barrier.wait()
+            return broker.provide_network_state(f"agent-run-{run_number}")
+
+        requests_before = self.stand_in.requests_served
+
+        with ThreadPoolExecutor(max_workers=run_count) as executor:
+            network_states = list(executor.map(provide, range(run_count)))
+
+        self.assertEqual(self.stand_in.requests_served - requests_before, 1 + 3 + 2 * 10)
+        self.assertEqual(broker.snapshot_version, 1)
+        self.assertTrue(all(network_state is network_states[0] for network_state in network_states))
+        self.assertEqual(len(broker.agent_run_network_state_given), run_count)
+
+    def test_subscribe__notified_of_changed_switches(self):
+        broker = self._create_broker(max_staleness=0)
+        notifications = []
+
+        broker.provide_network_state("agent-run-1")
+        state_changed = broker.subscribe("agent-run-1", lambda agent_run_id, changed: notifications.append(changed))
+
+        broker.get_network_snapshot()
+
+        self.assertFalse(state_changed.is_set())
+
+        self.stand_in.fabric.add_host(4)
+        broker.get_network_snapshot()
+
+        self.assertTrue(state_changed.is_set())
+        self.assertEqual(notifications, [{"0000000000000004"}])
+        self.assertEqual(broker.changed_switches("agent-run-1"), {"0000000000000004"})
+
+        broker.terminate_agent_run("agent-run-1")
+
+        self.assertEqual(broker.agent_run_network_state_given, {})
+        self.assertEqual(broker.changed_switches("agent-run-1"), set())
+
+        with self.assertRaises(Exception):
+            broker.terminate_agent_run("agent-run-1")
+
+    def test_provide_network_state__collection_error_raised_to_all_runs(self):
+        unreachable_transport = RyuTransport(base_url="http://127.0.0.1:1", connect_timeout=0.5)
+        broker = self._create_broker(transport=unreachable_transport)
+        barrier = Barrier(4)
+
+        def provide(run_number):
+            barrier.wait()
+            try:
+                broker.provide_network_state(f"agent-run-{run_number}")
+            except SwitchRetrievalException:
+                return True
+
+            return False
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertTrue(all(executor.map(provide, range(4))))
+
+        self.assertIsNone(broker.current_network_snapshot())
+        unreachable_transport.close()
+
+
+class TestNetworkStateBrokerPolling(unittest.TestCase):
+
+    def setUp(self):
+        self.stand_in = RyuStandIn(SyntheticFabric(6)).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+
+        self.broker = NetworkStateBroker(event_driven=False, max_staleness=30,
+                                         network_state_finder=NetworkStateFinder(transport=self.transport),
+                                         min_poll_interval=0.05, max_poll_interval=0.4, full_sweep_interval=30)
+        self.broker.start()
+
+    def tearDown(self):
+        self.broker.stop()
+        self.transport.close()
+        self.stand_in.stop()
+
+    def test_poll__idle_without_agent_runs(self):
+        time.sleep(0.3)
+
+        self.assertEqual(self.stand_in.requests_served, 0)
+        self.assertEqual(self.broker.get_metrics()["probes"], 0)
+
+    def test_poll__backs_off_when_quiet(self):
+        self.broker.provide_network_state("agent-run-1")
+
+        self.assertTrue(wait_until(lambda: self.broker.get_metrics()["poll_interval"] == 0.4))
+
+        metrics = self.broker.get_metrics()
+
+        # the probes found no change, so the network state was only collected for the agent run
+        self.assertGreaterEqual(metrics["probes"], 3)
+        self.assertEqual(metrics["full_sweeps"], 1)
+        self.assertEqual(metrics["agent_runs"], 1)
+        self.assertIsNotNone(metrics["last_probe_seconds"])
+
+    def test_poll__flow_change_notifies_agent_run(self):
+        notifications = []
+
+        self.broker.provide_network_state("agent-run-1")
+        self.broker.subscribe("agent-run-1", lambda agent_run_id, changed: notifications.append(changed))
+
+        self.assertTrue(wait_until(lambda: self.broker.get_metrics()["probes"] >= 2))
+
+        self.stand_in.fabric.add_flow({"dpid": 3, "priority": 100, "match": {"in_port": 1},
+                                       "actions": [{"type": "OUTPUT", "port": 2}]})
+
+        self.assertTrue(wait_until(lambda: notifications == [{"0000000000000003"}]))
+        self.assertEqual(self.broker.get_metrics()["full_sweeps"], 2)
+
+        self.broker.terminate_agent_run("agent-run-1")
+        time.sleep(0.1)
+        probes = self.broker.get_metrics()["probes"]
+        time.sleep(0.5)
+
+        self.assertEqual(self.broker.get_metrics()["probes"], probes)
+
+
+class TestNetworkStateBrokerEventDriven(unittest.TestCase):
+
+    def setUp(self):
+        self.stand_in = RyuStandIn(SyntheticFabric(10)).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+
+        self.broker = NetworkStateBroker(event_driven=True, reconciliation_interval=60,
+                                         network_state_finder=NetworkStateFinder(transport=self.transport))
+        self.broker.start()
+
+        self.assertTrue(wait_until(lambda: self.stand_in.subscriber_count(TOPOLOGY_EVENTS_PATH) == 1 and
+                                   self.stand_in.subscriber_count(FLOW_EVENTS_PATH) == 1))
+        self.assertTrue(wait_until(lambda: self.broker.current_network_snapshot() is not None))
+
+        self._wait_until_idle()
+
+    def tearDown(self):
+        self.broker.stop()
+        self.transport.close()
+        self.stand_in.stop()
+
+    def _wait_until_idle(self):
+        """Waits for the reconciliations requested when the event websockets connected to complete"""
+        requests_served = -1
+
+        while requests_served != self.stand_in.requests_served:
+            requests_served = self.stand_in.requests_served
+            time.sleep(0.2)
+
+    def _state_id(self):
+        return next(iter(self.broker.current_network_snapshot()["network_state"]))
+
+    def test_host_add_event__refreshes_switch(self):
+        previous_state_id = self._state_id()
+        requests_before = self.stand_in.requests_served
+
+        self.stand_in.push_event("event_host_add", self.stand_in.fabric.add_host(2))
+
+        self.assertTrue(wait_until(lambda: self._state_id() != previous_state_id))
+
+        # only switch 2 is collected again
+        self.assertEqual(self.stand_in.requests_served - requests_before, 5)
+
+        network_state = self.broker.current_network_snapshot()["network_state"]
+
+        self.assertEqual(network_state, NetworkStateFinder(transport=self.transport).get_network_state())
+        self.assertEqual(len(network_state[self._state_id()]["0000000000000002"]["connectedHosts"]), 2)
+
+    def test_link_add_event__refreshes_both_switches(self):
+        previous_state_id = self._state_id()
+
+        self.stand_in.push_event("event_link_add", self.stand_in.fabric.add_link(1, 6))
+
+        self.assertTrue(wait_until(lambda: self._state_id() != previous_state_id))
+
+        switches = self.broker.current_network_snapshot()["network_state"][self._state_id()]
+
+        self.assertIn("s1-eth4", switches["0000000000000001"]["portMappings"])
+        self.assertIn("s6-eth4", switches["0000000000000006"]["portMappings"])
+
+    def test_flow_removed_event__refreshes_switch(self):
+        previous_state_id = self._state_id()
+
+        self.stand_in.fabric.flows[7] = []
+        self.stand_in.push_event("event_flow_removed", {"dpid": 7, "cookie": 0}, path=FLOW_EVENTS_PATH)
+
+        self.assertTrue(wait_until(lambda: self._state_id() != previous_state_id))
+
+        switches = self.broker.current_network_snapshot()["network_state"][self._state_id()]
+
+        self.assertEqual(switches["0000000000000007"]["installedFlows"], {})
+
+    def test_record_writes__refreshes_switch(self):
+        previous_state_id = self._state_id()
+
+        self.broker.provide_network_state("agent-run-1")
+
+        # Ryu raises no event for the flows changed through its REST API
+        self.stand_in.fabric.flows[7] = []
+        self.broker.record_writes("agent-run-1", {"0000000000000007"})
+
+        self.assertTrue(wait_until(lambda: self._state_id() != previous_state_id))
+
+        switches = self.broker.current_network_snapshot()["network_state"][self._state_id()]
+
+        self.assertEqual(switches["0000000000000007"]["installedFlows"], {})
+        self.assertEqual(self.broker.changed_switches("agent-run-1"), set())
+
+    def test_get_network_snapshot__staleness_bound_while_writes_pending(self):
+        self.broker.stop()
+        time.sleep(0.05)
+
+        network_snapshot = self.broker.current_network_snapshot()
+
+        self.assertIs(self.broker.get_network_snapshot(max_staleness=0.01), network_snapshot)
+
+        self.stand_in.fabric.flows[7] = []
+        self.broker.record_writes("agent-run-1", {"0000000000000007"})
+
+        network_snapshot = self.broker.get_network_snapshot(max_staleness=0.01)
+        switches = network_snapshot["network_state"][next(iter(network_snapshot["network_state"]))]
+
+        self.assertEqual(switches["0000000000000007"]["installedFlows"], {})
+        self.assertIs(self.broker.get_network_snapshot(max_staleness=0.01), network_snapshot)
+
+    def test_provide_network_state__served_from_memory(self):
+        requests_before = self.stand_in.requests_served
+
+        network_state = self.broker.provide_network_state("agent-run-1")
+
+        self.assertEqual(self.stand_in.requests_served, requests_before)
+        self.assertEqual(self.broker.agent_run_network_state_given["agent-run-1"], next(iter(network_state)))
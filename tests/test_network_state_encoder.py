@@ -0,0 +1,102 @@
+import unittest
+
+from otto.intent_utils.network_state_encoder import (count_tokens, encode_network_state, measure_encodings,
+                                                     shorten_flow_ids)
+
+
+def create_network_state() -> dict:
+    return {
+        "3f1c9a2e5b7d4c6a8e0f1a2b3c4d5e6f": {
+            "0000000000000002": {
+                "name": "0000000000000002",
+                "ports": [{"port_no": "00000002", "hw_addr": "02:00:00:00:02:02", "name": "s2-eth2"},
+                          {"port_no": "00000001", "hw_addr": "02:00:00:00:02:01", "name": "s2-eth1"}],
+                "portMappings": {"s2-eth2": "s1-eth2"},
+                "connectedHosts": {},
+                "installedFlows": {},
+                "installedGroups": []
+            },
+            "0000000000000001": {
+                "name": "0000000000000001",
+                "ports": [{"port_no": "00000001", "hw_addr": "02:00:00:00:01:01", "name": "s1-eth1"},
+                          {"port_no": "00000002", "hw_addr": "02:00:00:00:01:02", "name": "s1-eth2"}],
+                "portMappings": {"s1-eth2": "s2-eth2"},
+                "connectedHosts": {"s1-eth1": {"id": "host-1-1", "mac": "00:00:00:00:00:01",
+                                               "ipv4": ["10.0.0.1"], "ipv6": []}},
+                "installedFlows": {
+                    "0e61a5f4c2b1d3e5f7a9b8c6d4e2f0a1": {
+                        "priority": 65535, "cookie": 0, "idle_timeout": 0, "hard_timeout": 0, "flags": 0,
+                        "length": 96, "table_id": 0, "actions": ["OUTPUT:CONTROLLER"],
+                        "match": {"dl_type": 35020, "dl_dst": "01:80:c2:00:00:0e"}
+                    },
+                    "9a8b7c6d5e4f3a2b1c0d9e8f7a6b5c4d": {
+                        "priority": 100, "cookie": 0, "idle_timeout": 0, "hard_timeout": 0, "flags": 0,
+                        "length": 104, "table_id": 0, "actions": ["OUTPUT:2"],
+                        "match": {"ipv4_dst": "10.0.0.2", "eth_type": 2048}
+                    }
+                },
+                "installedGroups": [{"type": "SELECT", "group_id": 1,
+                                     "buckets": [{"weight": 50, "watch_port": 4294967295, "watch_group": 4294967295,
+                                                  "actions": ["OUTPUT:2"]}]}]
+            }
+        }
+    }
+
+
+class TestNetworkStateEncoder(unittest.TestCase):
+
+    def test_encode_network_state(self):
+        self.assertEqual(encode_network_state(create_network_state()), "\n".join([
+            "network state 3f1c9a2e (flow counters omitted)",
+            "switch 0000000000000001",
+            " ports[no|name|mac]",
+            "  1|s1-eth1|02:00:00:00:01:01",
+            "  2|s1-eth2|02:00:00:00:01:02",
+            " links[port|remote port]",
+            "  s1-eth2|s2-eth2",
+            " hosts[port|id|mac|ipv4|ipv6]",
+            "  s1-eth1|host-1-1|00:00:00:00:00:01|10.0.0.1|-",
+            " flows[id|table|priority|cookie|idle|hard|match|actions]",
+            "  0e61a5f4|0|65535|0|0|0|dl_dst=01:80:c2:00:00:0e,dl_type=35020|OUTPUT:CONTROLLER",
+            "  9a8b7c6d|0|100|0|0|0|eth_type=2048,ipv4_dst=10.0.0.2|OUTPUT:2",
+            " groups[id|type|buckets]",
+            "  1|SELECT|w50:OUTPUT:2",
+            "switch 0000000000000002",
+            " ports[no|name|mac]",
+            "  1|s2-eth1|02:00:00:00:02:01",
+            "  2|s2-eth2|02:00:00:00:02:02",
+            " links[port|remote port]",
+            "  s2-eth2|s1-eth2"
+        ]))
+
+    def test_encode_network_state__deterministic(self):
+        network_state = create_network_state()
+        state_id, = network_state
+
+        reordered_state = {state_id: dict(reversed(network_state[state_id].items()))}
+        reordered_state[state_id]["0000000000000001"]["installedFlows"] = dict(
+            reversed(network_state[state_id]["0000000000000001"]["installedFlows"].items())
+        )
+
+        self.assertEqual(encode_network_state(network_state), encode_network_state(reordered_state))
+
+    def test_encode_network_state__empty(self):
+        self.assertEqual(encode_network_state({}), "network state unavailable")
+
+    def test_shorten_flow_ids__colliding_prefixes(self):
+        flow_ids = shorten_flow_ids({"0e61a5f4" + "a" * 24: {}, "0e61a5f4" + "b" * 24: {}, "1" * 32: {}})
+
+        self.assertEqual(set(flow_ids.values()), {"0e61a5f4" + "a" * 8, "0e61a5f4" + "b" * 8, "1" * 16})
+
+    def test_measure_encodings(self):
+        measured_tokens = measure_encodings(create_network_state())
+
+        self.assertLess(measured_tokens["compact"], measured_tokens["repr"])
+
+    def test_count_tokens(self):
+        self.assertEqual(count_tokens(""), 0)
+        self.assertGreater(count_tokens("switch 0000000000000001", "gpt-4o"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,8 @@ from otto.exceptions import (FlowRetrievalException, HostRetrievalException,
                              PortMappingException, PortRetrievalException,
                              SwitchRetrievalException)
 from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
 
 
 class TestNetworkStateFinder(unittest.TestCase):
@@ -463,3 +465,170 @@ class TestNetworkStateFinder(unittest.TestCase):
         result = db_creator.get_installed_flows(switch_dpid)
 
         self.assertEqual(result, expected_result)
+
+    @staticmethod
+    def _add_switch_responses(switch_id: int, remote_switch_id: int):
+        switch_dpid = format(switch_id, '016x')
+        remote_dpid = format(remote_switch_id, '016x')
+
+        responses.add(
+            responses.GET,
+            f'http://127.0.0.1:8080/v1.0/topology/switches/{switch_dpid}',
+            json=[{"dpid": switch_dpid, "ports": [
+                {"dpid": switch_dpid, "port_no": "00000001", "hw_addr": "ae:b9:44:bc:5d:27",
+                 "name": f"s{switch_id}-eth1"},
+                {"dpid": switch_dpid, "port_no": "00000002", "hw_addr": "2e:2c:a8:da:77:10",
+                 "name": f"s{switch_id}-eth2"}
+            ]}]
+        )
+        responses.add(
+            responses.GET,
+            f'http://127.0.0.1:8080/v1.0/topology/links/{switch_dpid}',
+            json=[{"src": {"dpid": switch_dpid, "port_no": "00000002", "name": f"s{switch_id}-eth2"},
+                   "dst": {"dpid": remote_dpid, "port_no": "00000002", "name": f"s{remote_switch_id}-eth2"}}]
+        )
+        responses.add(
+            responses.GET,
+            f'http://127.0.0.1:8080/v1.0/topology/hosts/{switch_dpid}',
+            json=[{"mac": f"00:00:aa:bb:cc:0{switch_id}", "ipv4": [f"10.0.0.{switch_id}"], "ipv6": [],
+                   "port": {"dpid": switch_dpid, "port_no": "00000001", "name": f"s{switch_id}-eth1"}}]
+        )
+        responses.add(
+            responses.GET,
+            f'http://127.0.0.1:8080/stats/flow/{switch_id}',
+            json={str(switch_id): [{"priority": 65535, "cookie": 0, "idle_timeout": 0, "hard_timeout": 0,
+                                    "actions": ["OUTPUT:CONTROLLER"],
+                                    "match": {"dl_dst": "01:80:c2:00:00:0e", "dl_type": 35020},
+                                    "byte_count": 236520, "duration_sec": 1966, "duration_nsec": 107000000,
+                                    "packet_count": 3942, "table_id": 0}]}
+        )
+        responses.add(
+            responses.GET,
+            f'http://127.0.0.1:8080/stats/groupdesc/{switch_id}',
+            json={str(switch_id): []}
+        )
+
+    @responses.activate
+    def test_get_network_state__concurrent_matches_serial(self):
+        responses.add(responses.GET, 'http://127.0.0.1:8080/stats/switches', json=[3, 1, 2])
+
+        for switch_id, remote_switch_id in [(1, 2), (2, 3), (3, 1)]:
+            self._add_switch_responses(switch_id, remote_switch_id)
+
+        serial_state = NetworkStateFinder(max_workers=1, bulk_topology=False).get_network_state()
+        concurrent_state = NetworkStateFinder(max_workers=8, bulk_topology=False).get_network_state()
+
+        self.assertEqual(concurrent_state, serial_state)
+        self.assertEqual(next(iter(concurrent_state)), next(iter(serial_state)))
+        self.assertEqual(list(next(iter(concurrent_state.values()))),
+                         ["0000000000000003", "0000000000000001", "0000000000000002"])
+
+    @responses.activate
+    def test_get_network_state__concurrent_raises_call_exception(self):
+        responses.add(responses.GET, 'http://127.0.0.1:8080/stats/switches', json=[1, 2])
+
+        self._add_switch_responses(1, 2)
+        self._add_switch_responses(2, 1)
+
+        responses.replace(
+            responses.GET,
+            'http://127.0.0.1:8080/stats/flow/2',
+            json={'error': 'not found'},
+            status=400
+        )
+
+        with self.assertRaises(FlowRetrievalException):
+            NetworkStateFinder(max_workers=8, bulk_topology=False).get_network_state()
+
+
+class TestNetworkStateFinderBulkTopology(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = RyuStandIn(SyntheticFabric(10, hosts_per_switch=2)).start()
+        cls.transport = RyuTransport(base_url=cls.stand_in.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.transport.close()
+        cls.stand_in.stop()
+
+    def test_get_network_state__bulk_matches_per_switch(self):
+        per_switch_state = NetworkStateFinder(transport=self.transport, bulk_topology=False).get_network_state()
+        bulk_state = NetworkStateFinder(transport=self.transport).get_network_state()
+        serial_bulk_state = NetworkStateFinder(max_workers=1, transport=self.transport).get_network_state()
+
+        self.assertEqual(bulk_state, per_switch_state)
+        self.assertEqual(serial_bulk_state, per_switch_state)
+
+    def test_get_network_state__bulk_call_count(self):
+        requests_before = self.stand_in.requests_served
+
+        NetworkStateFinder(transport=self.transport).get_network_state()
+
+        # /stats/switches, three topology calls, then flows and groups of each switch
+        self.assertEqual(self.stand_in.requests_served - requests_before, 1 + 3 + 2 * 10)
+
+    def test_get_all_connected_hosts(self):
+        all_connected_hosts = NetworkStateFinder(transport=self.transport).get_all_connected_hosts()
+
+        self.assertEqual(len(all_connected_hosts), 10)
+        self.assertEqual([host['id'] for host in all_connected_hosts["000000000000000a"].values()],
+                         ["host-10-1", "host-10-2"])
+
+    def test_get_network_snapshot__counters_split_from_state_id(self):
+        finder = NetworkStateFinder(transport=self.transport)
+
+        first_snapshot = finder.get_network_snapshot()
+
+        for flow in self.stand_in.fabric.flows[1]:
+            flow["packet_count"] += 10
+            flow["byte_count"] += 1500
+
+        second_snapshot = finder.get_network_snapshot()
+
+        self.assertEqual(first_snapshot["network_state"], second_snapshot["network_state"])
+        self.assertNotEqual(first_snapshot["flow_counters"], second_snapshot["flow_counters"])
+
+        state_id = next(iter(second_snapshot["network_state"]))
+        switch_flows = second_snapshot["network_state"][state_id]["0000000000000001"]["installedFlows"]
+        flow_hash = next(iter(switch_flows))
+
+        self.assertNotIn("packet_count", switch_flows[flow_hash])
+        self.assertEqual(second_snapshot["flow_counters"]["0000000000000001"][flow_hash]["byte_count"],
+                         first_snapshot["flow_counters"]["0000000000000001"][flow_hash]["byte_count"] + 1500)
+
+    def test_refresh_network_snapshot(self):
+        finder = NetworkStateFinder(transport=self.transport)
+
+        previous_snapshot = finder.get_network_snapshot()
+
+        self.stand_in.fabric.add_host(3)
+
+        requests_before = self.stand_in.requests_served
+
+        refreshed_snapshot = finder.refresh_network_snapshot(previous_snapshot, {"0000000000000003"})
+
+        # the five calls of get_switch_details, for switch 3 only
+        self.assertEqual(self.stand_in.requests_served - requests_before, 5)
+        self.assertEqual(finder._state_hasher.rehashed_switches, {"0000000000000003"})
+
+        self.assertEqual(refreshed_snapshot["network_state"],
+                         NetworkStateFinder(transport=self.transport).get_network_state())
+        self.assertEqual(refreshed_snapshot["flow_counters"].keys(), previous_snapshot["flow_counters"].keys())
+
+        removed_snapshot = finder.refresh_network_snapshot(refreshed_snapshot, set(), {"0000000000000003"})
+        state_id = next(iter(removed_snapshot["network_state"]))
+
+        self.assertNotIn("0000000000000003", removed_snapshot["network_state"][state_id])
+        self.assertNotIn("0000000000000003", removed_snapshot["flow_counters"])
+
+    def test_probe_network(self):
+        requests_before = self.stand_in.requests_served
+
+        probe = NetworkStateFinder(transport=self.transport).probe_network()
+
+        # /stats/switches, then /stats/aggregateflow of each switch
+        self.assertEqual(self.stand_in.requests_served - requests_before, 1 + 10)
+        self.assertEqual(probe["0000000000000005"], len(self.stand_in.fabric.flows[5]))
+        self.assertEqual(len(probe), 10)
@@ -0,0 +1,62 @@
+import copy
+import unittest
+
+from otto.ryu.network_state_db.network_state_hasher import NetworkStateHasher
+
+
+class TestNetworkStateHasher(unittest.TestCase):
+
+    def setUp(self):
+        self.network_elements = {
+            format(switch_id, '016x'): {
+                "name": format(switch_id, '016x'),
+                "ports": [{"port_no": "00000001", "hw_addr": "ae:b9:44:bc:5d:27", "name": f"s{switch_id}-eth1"}],
+                "portMappings": {},
+                "connectedHosts": {},
+                "installedFlows": {
+                    f"flow-{switch_id}": {"priority": 65535, "cookie": 0, "idle_timeout": 0, "hard_timeout": 0,
+                                          "actions": ["OUTPUT:CONTROLLER"], "match": {"dl_type": 35020},
+                                          "table_id": 0}
+                },
+                "installedGroups": []
+            } for switch_id in range(1, 4)
+        }
+
+    def test_hash_network__deterministic(self):
+        state_id, switch_digests = NetworkStateHasher().hash_network(self.network_elements)
+        other_state_id, other_switch_digests = NetworkStateHasher().hash_network(
+            copy.deepcopy(self.network_elements))
+
+        self.assertEqual(state_id, other_state_id)
+        self.assertEqual(switch_digests, other_switch_digests)
+        self.assertEqual(state_id, NetworkStateHasher.hash_switch_digests(switch_digests))
+
+    def test_hash_network__only_changed_switch_rehashed(self):
+        hasher = NetworkStateHasher()
+
+        state_id, switch_digests = hasher.hash_network(self.network_elements)
+        self.assertEqual(hasher.rehashed_switches, set(self.network_elements))
+
+        changed_elements = copy.deepcopy(self.network_elements)
+        changed_elements["0000000000000002"]["installedFlows"]["flow-2"]["actions"] = ["OUTPUT:2"]
+
+        changed_state_id, changed_switch_digests = hasher.hash_network(changed_elements)
+
+        self.assertEqual(hasher.rehashed_switches, {"0000000000000002"})
+        self.assertNotEqual(changed_state_id, state_id)
+        self.assertEqual({switch for switch in switch_digests
+                          if switch_digests[switch] != changed_switch_digests[switch]}, {"0000000000000002"})
+
+        self.assertEqual(changed_state_id, NetworkStateHasher().hash_network(changed_elements)[0])
+
+    def test_hash_network__removed_switch(self):
+        hasher = NetworkStateHasher()
+
+        state_id, _ = hasher.hash_network(self.network_elements)
+
+        del self.network_elements["0000000000000003"]
+        reduced_state_id, switch_digests = hasher.hash_network(self.network_elements)
+
+        self.assertNotEqual(reduced_state_id, state_id)
+        self.assertNotIn("0000000000000003", switch_digests)
+        self.assertEqual(hasher.rehashed_switches, set())
@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from threading import Lock
+from unittest.mock import patch
+
+from otto.exceptions import NetworkStatePublisherException
+from otto.ryu.network_state_db.network_state_broker import NetworkStateBroker
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.network_state_publisher import NetworkStatePublisher, RemoteNetworkStateBroker
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def provide_from_forked_process(address: str, agent_run_id: str, results: multiprocessing.Queue) -> None:
+    remote_broker = RemoteNetworkStateBroker.get_instance(address)
+
+    network_state = remote_broker.provide_network_state(agent_run_id)
+    remote_broker.terminate_agent_run(agent_run_id)
+
+    results.put(next(iter(network_state)))
+
+
+class UnpicklableError(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.lock = Lock()
+
+
+class TestNetworkStatePublisher(unittest.TestCase):
+
+    def setUp(self):
+        self.stand_in = RyuStandIn(SyntheticFabric(5)).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+
+        self.broker = NetworkStateBroker(event_driven=False, max_staleness=60,
+                                         network_state_finder=NetworkStateFinder(transport=self.transport))
+
+        self.address = os.path.join(tempfile.mkdtemp(), "otto-state.sock")
+        self.publisher = NetworkStatePublisher(self.broker, address=self.address).start()
+
+    def tearDown(self):
+        self.publisher.stop()
+        self.transport.close()
+        self.stand_in.stop()
+
+    def test_publisher__exports_socket_address(self):
+        self.assertEqual(os.environ["OTTO_STATE_SOCKET"], self.address)
+
+        self.publisher.stop()
+
+        self.assertNotIn("OTTO_STATE_SOCKET", os.environ)
+        self.assertFalse(os.path.exists(self.address))
+
+    def test_provide_network_state__served_by_publishing_broker(self):
+        remote_broker = RemoteNetworkStateBroker(self.address)
+
+        network_state = remote_broker.provide_network_state("agent-run-1")
+
+        self.assertEqual(network_state, self.broker.current_network_snapshot()["network_state"])
+        self.assertEqual(self.broker.agent_run_network_state_given, {"agent-run-1": next(iter(network_state))})
+
+        # the same network state is not sent again
+        self.assertIs(remote_broker.provide_network_state("agent-run-2"), network_state)
+
+        remote_broker.terminate_agent_run("agent-run-1")
+        remote_broker.terminate_agent_run("agent-run-2")
+
+        self.assertEqual(self.broker.agent_run_network_state_given, {})
+        self.assertEqual(remote_broker.get_metrics()["full_sweeps"], 1)
+
+        remote_broker.close()
+
+    def test_changed_switches__notifies_subscribers(self):
+        remote_broker = RemoteNetworkStateBroker(self.address)
+        notifications = []
+
+        remote_broker.provide_network_state("agent-run-1")
+        state_changed = remote_broker.subscribe("agent-run-1",
+                                                lambda agent_run_id, changed: notifications.append(changed))
+
+        self.stand_in.fabric.add_host(2)
+        self.broker.get_network_snapshot(max_staleness=0)
+
+        self.assertEqual(remote_broker.changed_switches("agent-run-1"), {"0000000000000002"})
+        self.assertEqual(remote_broker.changed_switches("agent-run-1"), {"0000000000000002"})
+
+        self.assertTrue(state_changed.is_set())
+        self.assertEqual(notifications, [{"0000000000000002"}])
+
+        remote_broker.close()
+
+    def test_record_writes__own_changes_not_notified(self):
+        remote_broker = RemoteNetworkStateBroker(self.address)
+
+        remote_broker.provide_network_state("agent-run-1")
+        remote_broker.record_writes("agent-run-1", {"0000000000000002"})
+
+        self.stand_in.fabric.add_host(2)
+        self.broker.get_network_snapshot(max_staleness=0)
+
+        self.assertEqual(remote_broker.changed_switches("agent-run-1"), set())
+
+        remote_broker.close()
+
+    def test_terminate_agent_run__error_raised_in_subscriber(self):
+        remote_broker = RemoteNetworkStateBroker(self.address)
+
+        with self.assertRaises(NetworkStatePublisherException):
+            remote_broker.terminate_agent_run("unknown-agent-run")
+
+        remote_broker.close()
+
+    def test_request__unpicklable_error_sent_as_message(self):
+        remote_broker = RemoteNetworkStateBroker(self.address)
+
+        with patch.object(self.broker, "get_metrics", side_effect=UnpicklableError("metrics unavailable")):
+            with self.assertRaisesRegex(NetworkStatePublisherException, "UnpicklableError: metrics unavailable"):
+                remote_broker.get_metrics()
+
+        # the connection is still served
+        self.assertEqual(remote_broker.get_metrics()["agent_runs"], 0)
+
+        remote_broker.close()
+
+    def test_request__connects_again_when_connection_lost(self):
+        remote_broker = RemoteNetworkStateBroker(self.address, reconnect_backoff=0.01)
+
+        remote_broker._connection.close()
+
+        self.assertEqual(remote_broker.get_metrics()["agent_runs"], 0)
+
+        self.publisher.stop()
+        remote_broker._connection.close()
+
+        with self.assertRaises(NetworkStatePublisherException):
+            remote_broker.get_metrics()
+
+        remote_broker.close()
+
+    def test_forked_processes__share_one_collection(self):
+        self.broker.provide_network_state("agent-run-0")
+        requests_before = self.stand_in.requests_served
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+
+        processes = [context.Process(target=provide_from_forked_process, args=(self.address, f"agent-run-{n}", results))
+                     for n in range(1, 5)]
+
+        for process in processes:
+            process.start()
+
+        state_ids = {results.get(timeout=10) for _ in processes}
+
+        for process in processes:
+            process.join()
+
+        self.assertEqual(state_ids, set(self.broker.agent_run_network_state_given.values()))
+        self.assertEqual(self.stand_in.requests_served, requests_before)
@@ -0,0 +1,143 @@
+import unittest
+
+import networkx as nx
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from otto.ryu.intent_engine.intent_processor_agent_tools import get_alternative_paths, get_path_between_nodes
+from otto.ryu.intent_engine.path_index import NetworkxPathIndex, PathIndex, SparsePathIndex
+from otto.ryu.intent_engine.topology_cache import build_topology
+
+
+def dpid(switch_id: int) -> str:
+    return format(switch_id, '016x')
+
+
+def create_ring_network(switch_count: int) -> dict:
+    """Switches s1 ... sN in a ring, linked on ports 2 (clockwise) and 3, with host-N-1 on port 1 of every switch"""
+    network_elements = {}
+
+    for switch_id in range(1, switch_count + 1):
+        next_switch = switch_id % switch_count + 1
+        previous_switch = (switch_id - 2) % switch_count + 1
+
+        network_elements[dpid(switch_id)] = {
+            "portMappings": {f"s{switch_id}-eth2": f"s{next_switch}-eth3",
+                             f"s{switch_id}-eth3": f"s{previous_switch}-eth2"},
+            "connectedHosts": {f"s{switch_id}-eth1": {"id": f"host-{switch_id}-1"}}
+        }
+
+    return network_elements
+
+
+class TestPathIndex(unittest.TestCase):
+    backend = "networkx"
+
+    def setUp(self):
+        self.topology = build_topology(create_ring_network(6), backend=self.backend)
+        self.path_index = self.topology.path_index
+
+    def test_distance(self):
+        for source in self.topology.network_graph.nodes:
+            for destination in self.topology.network_graph.nodes:
+                self.assertEqual(self.path_index.distance(source, destination),
+                                 nx.shortest_path_length(self.topology.network_graph, source, destination))
+
+    def test_shortest_path(self):
+        self.assertEqual(self.path_index.shortest_path("host-1-1", "host-3-1"),
+                         ["host-1-1", dpid(1), dpid(2), dpid(3), "host-3-1"])
+        self.assertEqual(self.path_index.shortest_path(dpid(1), "host-1-1"), [dpid(1), "host-1-1"])
+        self.assertEqual(self.path_index.shortest_path("host-2-1", "host-2-1"), ["host-2-1"])
+
+    def test_port_path(self):
+        expected_path = [("host-1-1", "s1-eth1"), ("s1-eth2", "s2-eth3"), ("s2-eth1", "host-2-1")]
+
+        self.assertEqual(self.path_index.port_path("host-1-1", "host-2-1"), expected_path)
+        self.assertEqual(self.path_index.port_path("host-1-1", "host-2-1"), expected_path)
+
+    def test_equal_cost_paths(self):
+        paths = self.path_index.equal_cost_paths("host-1-1", "host-4-1")
+
+        self.assertEqual(sorted(paths), [["host-1-1", dpid(1), dpid(2), dpid(3), dpid(4), "host-4-1"],
+                                         ["host-1-1", dpid(1), dpid(6), dpid(5), dpid(4), "host-4-1"]])
+
+    def test_k_shortest_paths(self):
+        paths = self.path_index.k_shortest_paths("host-1-1", "host-2-1", k=3)
+
+        self.assertEqual(paths, [["host-1-1", dpid(1), dpid(2), "host-2-1"],
+                                 ["host-1-1", dpid(1), dpid(6), dpid(5), dpid(4), dpid(3), dpid(2), "host-2-1"]])
+
+    def test_unknown_nodes(self):
+        with self.assertRaises(nx.NodeNotFound):
+            self.path_index.shortest_path("host-1-1", "host-9-1")
+
+        disconnected_topology = build_topology({dpid(1): {"connectedHosts": {"s1-eth1": {"id": "host-1-1"}}},
+                                                dpid(2): {"connectedHosts": {"s2-eth1": {"id": "host-2-1"}}}},
+                                               backend=self.backend)
+
+        self.assertFalse(disconnected_topology.path_index.is_reachable("host-1-1", "host-2-1"))
+
+        with self.assertRaises(nx.NetworkXNoPath):
+            disconnected_topology.path_index.port_path("host-1-1", "host-2-1")
+
+    def test_path_tools(self):
+        tool_node = ToolNode([get_path_between_nodes, get_alternative_paths])
+
+        tool_calls = AIMessage(content="", tool_calls=[
+            {"name": "get_path_between_nodes", "args": {"source": "host-1-1", "destination": "host-2-1"}, "id": "1"},
+            {"name": "get_alternative_paths", "args": {"source": "host-1-1", "destination": "host-4-1",
+                                                       "equal_cost_only": True}, "id": "2"}
+        ])
+
+        path, alternative_paths = tool_node.invoke({"messages": [tool_calls],
+                                                    "path_index": self.path_index})["messages"]
+
+        self.assertEqual(path.content, '[["host-1-1", "s1-eth1"], ["s1-eth2", "s2-eth3"], ["s2-eth1", "host-2-1"]]')
+        self.assertEqual(alternative_paths.content.count("host-4-1"), 2)
+
+
+class TestSparsePathIndex(TestPathIndex):
+    backend = "sparse"
+
+    def test_backend(self):
+        self.assertIsInstance(self.path_index, SparsePathIndex)
+        self.assertEqual(self.path_index.adjacency.nnz, 12)
+
+    def test_parity_with_networkx(self):
+        network_elements = create_ring_network(12)
+        network_elements[dpid(1)]["portMappings"]["s1-eth4"] = "s7-eth4"
+        network_elements[dpid(7)]["portMappings"]["s7-eth4"] = "s1-eth4"
+
+        networkx_index = build_topology(network_elements, backend="networkx").path_index
+        sparse_index = build_topology(network_elements, backend="sparse").path_index
+
+        self.assertIsInstance(networkx_index, NetworkxPathIndex)
+
+        for source in ["host-1-1", "host-4-1", dpid(9)]:
+            for destination in [f"host-{switch_id}-1" for switch_id in range(1, 13)]:
+                self.assertEqual(sparse_index.distance(source, destination),
+                                 networkx_index.distance(source, destination))
+                self.assertEqual(sorted(sparse_index.equal_cost_paths(source, destination, limit=8)),
+                                 sorted(networkx_index.equal_cost_paths(source, destination, limit=8)))
+
+    def test_distance_tables_evicted(self):
+        path_index = SparsePathIndex({dpid(1): [dpid(2)], dpid(2): [dpid(3)]}, {}, {}, max_destinations=1)
+
+        self.assertEqual(path_index.shortest_path(dpid(1), dpid(3)), [dpid(1), dpid(2), dpid(3)])
+        self.assertEqual(path_index.shortest_path(dpid(3), dpid(1)), [dpid(3), dpid(2), dpid(1)])
+        self.assertEqual(len(path_index._distance_tables), 1)
+
+
+class TestIncompletePathIndex(unittest.TestCase):
+
+    def test_create__missing_backend_methods(self):
+        class SwitchlessPathIndex(PathIndex):
+            def _has_switch(self, switch: str) -> bool:
+                return False
+
+        with self.assertRaises(TypeError):
+            SwitchlessPathIndex({}, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
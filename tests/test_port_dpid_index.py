@@ -0,0 +1,71 @@
+import unittest
+
+from otto.ryu.intent_engine.topology_cache import build_topology
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.network_state_db.port_dpid_index import PortDpidIndex
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def dpid(switch_id: int) -> str:
+    return format(switch_id, '016x')
+
+
+class TestPortDpidIndex(unittest.TestCase):
+
+    def test_remote_switch(self):
+        port_dpids = PortDpidIndex({
+            dpid(1): {"portMappings": {"s1-eth2": "s12-eth3"}},
+            dpid(12): {"portMappings": {"s12-eth3": "s1-eth2"}, "ports": [{"name": "s12-eth4"}]}
+        })
+
+        self.assertEqual(port_dpids.remote_switch("s1-eth2", "s12-eth3"), dpid(12))
+        self.assertEqual(port_dpids.remote_switch("s12-eth3", "s1-eth2"), dpid(1))
+        self.assertEqual(port_dpids.dpid_of("s12-eth4"), dpid(12))
+        self.assertIsNone(port_dpids.remote_switch("s1-eth9", "s99-eth1"))
+
+    def test_remote_switch__shared_port_names(self):
+        port_dpids = PortDpidIndex({
+            dpid(1): {"portMappings": {"eth1": "eth2"}},
+            dpid(2): {"portMappings": {"eth2": "eth1", "eth3": "eth1"}},
+            dpid(3): {"portMappings": {"eth1": "eth3"}}
+        })
+
+        self.assertEqual(port_dpids.remote_switch("eth1", "eth2"), dpid(2))
+        self.assertEqual(port_dpids.remote_switch("eth2", "eth1"), dpid(1))
+        self.assertEqual(port_dpids.remote_switch("eth3", "eth1"), dpid(3))
+        self.assertIsNone(port_dpids.dpid_of("eth1"))
+
+
+class TestLargeFabricTopology(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with RyuStandIn(SyntheticFabric(200)) as stand_in:
+            transport = RyuTransport(base_url=stand_in.url)
+            cls.network_state = NetworkStateFinder(max_workers=16, transport=transport).get_network_state()
+            transport.close()
+
+        cls.network_elements = next(iter(cls.network_state.values()))
+
+    def test_build_topology(self):
+        topology = build_topology(self.network_elements, backend="networkx")
+
+        self.assertEqual(len(self.network_elements), 200)
+        self.assertEqual(topology.network_graph.number_of_edges(), 400)
+        self.assertEqual(sorted(topology.path_index.neighbours(dpid(12))), [dpid(11), dpid(13), "host-12-1"])
+        self.assertEqual(topology.path_index.distance("host-1-1", "host-101-1"), 102)
+        self.assertEqual(topology.path_index.shortest_path(dpid(199), dpid(2)),
+                         [dpid(199), dpid(200), dpid(1), dpid(2)])
+
+    def test_build_topology__backends_agree(self):
+        networkx_index = build_topology(self.network_elements, backend="networkx").path_index
+        sparse_index = build_topology(self.network_elements, backend="sparse").path_index
+
+        for destination in ["host-10-1", "host-57-1", "host-150-1", "host-200-1"]:
+            self.assertEqual(sparse_index.port_path("host-3-1", destination),
+                             networkx_index.port_path("host-3-1", destination))
+
+
+if __name__ == '__main__':
+    unittest.main()
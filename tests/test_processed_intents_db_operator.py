@@ -0,0 +1,82 @@
+import unittest
+from datetime import datetime
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from otto.api.models.base import metadata
+from otto.api.models.called_tools import CalledTools
+from otto.api.models.entities import Entities, EntityType
+from otto.api.models.processed_intents import ProcessedIntents
+from otto.api.models.tool_calls import ToolCalls
+from otto.ryu.intent_engine.intent_processor_agent import IntentProcessor
+from otto.ryu.intent_engine.intent_processor_agent_tools import create_tool_list
+from otto.ryu.network_state_db.processed_intents_db_operator import ProcessedIntentsDbOperator
+from tests.test_intent_processor_agent import FakeChatModel, FakeNetworkStateBroker
+
+
+class TestProcessedIntentsDbOperator(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        metadata.create_all(self.engine)
+        ToolCalls.populate_tool_calls(self.engine)
+
+        self.db_operator = ProcessedIntentsDbOperator()
+        self.db_operator._engine = self.engine
+        self.db_operator._session = Session(self.engine)
+
+        for username in ["alice", "bob"]:
+            self.db_operator._session.add(Entities(username=username, password="", entity_type=EntityType.USER))
+
+        self.db_operator.save_intent(agent_run="run-1", username="alice", intent="allow ping",
+                                     timestamp=datetime.now(), called_tools=[], model="fake-model",
+                                     cookie=0x10000, cookie_mask=0x7fffffffffff0000)
+
+    def tearDown(self):
+        self.db_operator._session.close()
+
+    def test_get_intent_cookie(self):
+        self.assertEqual(self.db_operator.get_intent_cookie("run-1", "alice"), (0x10000, 0x7fffffffffff0000))
+        self.assertIsNone(self.db_operator.get_intent_cookie("run-2", "alice"))
+
+    def test_get_intent_cookie__intent_of_another_user(self):
+        self.assertIsNone(self.db_operator.get_intent_cookie("run-1", "bob"))
+
+    def test_save_intent__lazy_mode_read_tools(self):
+        processor = IntentProcessor(FakeChatModel(messages=iter([])), create_tool_list(), "system prompt",
+                                    username="bob", network_state_broker=FakeNetworkStateBroker(),
+                                    lazy_network_state=True)
+        processor.processed_intents_db_conn = self.db_operator
+
+        processor.save_intent({"agent_run_id": "run-2", "messages": [
+            HumanMessage(content="host-1-1 should reach host-2-1"),
+            AIMessage(content="", tool_calls=[{"name": "get_flows", "args": {"switch_id": "1"}, "id": "call-1"}]),
+            ToolMessage(content="no flows", tool_call_id="call-1"),
+            AIMessage(content="", tool_calls=[{"name": "add_rule", "args": {"switch_id": "1"}, "id": "call-2"}]),
+            ToolMessage(content="200", tool_call_id="call-2"),
+            AIMessage(content="done")
+        ]})
+
+        called_tools = (self.db_operator._session.query(ToolCalls.name)
+                        .join(CalledTools, CalledTools.tool_call_id == ToolCalls.id)
+                        .filter(CalledTools.agent_run == "run-2").order_by(CalledTools.run_order).all())
+
+        self.assertEqual([name for name, in called_tools], ["get_flows", "add_rule"])
+
+    def test_add_missing_columns(self):
+        engine = create_engine("sqlite://")
+
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE processed_intents (agent_run VARCHAR(255) PRIMARY KEY, "
+                                    "declared_by_id INTEGER NOT NULL, intent TEXT, timestamp DATETIME NOT NULL, "
+                                    "model VARCHAR(255) NOT NULL)"))
+
+        self.assertEqual(ProcessedIntents.add_missing_columns(engine), ["cookie", "cookie_mask"])
+        self.assertEqual(ProcessedIntents.add_missing_columns(engine), [])
+        self.assertIn("cookie_mask", {column["name"] for column in inspect(engine).get_columns("processed_intents")})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from otto.ryu.intent_engine.flow_batch import apply_operations
+from otto.ryu.intent_engine.intent_processor_agent_tools import add_rule, get_run_flows, rollback_run_flows
+from otto.ryu.intent_engine.run_cookie import RUN_COOKIE_MASK, find_run_flows, rollback_run, run_cookie
+from otto.ryu.intent_engine.run_state_overlay import RunStateOverlay
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+def create_rule(switch_id: int, destination: str, port: int) -> dict:
+    return {"operation": "add_rule", "switch_id": str(switch_id), "table_id": 0, "priority": 100,
+            "match": {"dl_type": 2048, "nw_dst": destination}, "actions": [{"type": "OUTPUT", "port": port}]}
+
+
+class TestRunCookie(unittest.TestCase):
+
+    def setUp(self):
+        self.fabric = SyntheticFabric(3)
+        self.stand_in = RyuStandIn(self.fabric).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+
+        self.network_elements = {format(switch_id, '016x'): {} for switch_id in range(1, 4)}
+
+    def tearDown(self):
+        self.transport.close()
+        self.stand_in.stop()
+
+    def test_run_cookie(self):
+        cookie = run_cookie("run-1")
+
+        self.assertEqual(cookie, run_cookie("run-1"))
+        self.assertNotEqual(cookie, run_cookie("run-2"))
+        self.assertEqual(cookie & RUN_COOKIE_MASK, cookie)
+        self.assertTrue(0 < cookie < 2 ** 63)
+        self.assertEqual(run_cookie(None), 0)
+
+        with self.assertRaises(ValueError):
+            find_run_flows(0, ["1"], self.transport)
+
+    def test_find_and_rollback_run(self):
+        apply_operations([create_rule(1, "10.0.0.2", 2), create_rule(2, "10.0.0.2", 2)], self.network_elements,
+                         self.transport, cookie=run_cookie("run-1"))
+        apply_operations([create_rule(2, "10.0.0.3", 3)], self.network_elements, self.transport,
+                         cookie=run_cookie("run-2"))
+
+        run_flows = find_run_flows(run_cookie("run-1"), transport=self.transport)
+
+        self.assertEqual({switch_id: len(flows) for switch_id, flows in run_flows.items()}, {"1": 1, "2": 1})
+
+        requests_served = self.stand_in.requests_served
+
+        self.assertEqual(rollback_run(run_cookie("run-1"), ["1", "2", "3"], self.transport),
+                         {"1": 200, "2": 200, "3": 200})
+        self.assertEqual(self.stand_in.requests_served, requests_served + 3)
+
+        # the flows of the other run and the flows installed outside of any run are left in place
+        self.assertEqual([len(self.fabric.flows[switch_id]) for switch_id in range(1, 4)], [1, 2, 1])
+        self.assertEqual(find_run_flows(run_cookie("run-1"), transport=self.transport), {})
+        self.assertEqual(len(find_run_flows(run_cookie("run-2"), transport=self.transport)["2"]), 1)
+
+
+class TestRunCookieTools(unittest.TestCase):
+
+    def setUp(self):
+        self.fabric = SyntheticFabric(3)
+        self.stand_in = RyuStandIn(self.fabric).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+        self.network_state = NetworkStateFinder(transport=self.transport).get_network_state()
+
+        self.tool_node = ToolNode([add_rule, get_run_flows, rollback_run_flows])
+        self.state = {"network_state": self.network_state, "agent_run_id": "run-1"}
+
+        self.transport_patch = patch.object(RyuTransport, "get_instance", return_value=self.transport)
+        self.transport_patch.start()
+
+    def tearDown(self):
+        self.transport_patch.stop()
+        RunStateOverlay.get_instance().discard("run-1")
+        self.transport.close()
+        self.stand_in.stop()
+
+    def invoke(self, name: str, args: dict) -> str:
+        tool_call = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "1"}])
+
+        return self.tool_node.invoke({"messages": [tool_call], **self.state})["messages"][0].content
+
+    def test_rollback_run_flows(self):
+        rule = {key: value for key, value in create_rule(1, "10.0.0.3", 2).items() if key != "operation"}
+
+        self.assertEqual(self.invoke("add_rule", rule), "200")
+        self.assertEqual(self.fabric.flows[1][-1]["cookie"], run_cookie("run-1"))
+        self.assertTrue(self.invoke("get_run_flows", {}).startswith("1 flows installed during this operation"))
+
+        self.assertTrue(self.invoke("rollback_run_flows", {}).startswith("Flows rolled back on 3 of 3 switches"))
+
+        switch_view = RunStateOverlay.get_instance().view_switch("run-1", self.network_state, "0000000000000001")
+
+        self.assertEqual(len(self.fabric.flows[1]), 1)
+        self.assertEqual(len(switch_view["installedFlows"]), 1)
+        self.assertTrue(self.invoke("get_run_flows", {}).startswith("0 flows installed"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from otto.ryu.intent_engine.intent_processor_agent_tools import add_rule, check_switch, delete_group_entry, get_flows
+from otto.ryu.intent_engine.run_state_overlay import RunStateOverlay
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+from tests.test_network_state_encoder import create_network_state
+
+FORWARD_RULE = {"dpid": 1, "cookie": 0, "table_id": 0, "priority": 200,
+                "match": {"eth_type": 2048, "ipv4_dst": "10.0.0.3"}, "actions": [{"type": "OUTPUT", "port": 2}]}
+
+
+class TestRunStateOverlay(unittest.TestCase):
+
+    def setUp(self):
+        self.overlay = RunStateOverlay()
+        self.network_state = create_network_state()
+        self.network_elements = self.network_state["3f1c9a2e5b7d4c6a8e0f1a2b3c4d5e6f"]
+
+    def test_record_change__flows(self):
+        self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/add", FORWARD_RULE)
+
+        flows = self.overlay.view_switch("run-1", self.network_state, "0000000000000001")["installedFlows"]
+
+        added_flow, = [flow for flow in flows.values() if flow["priority"] == 200]
+
+        self.assertEqual(len(flows), 3)
+        self.assertEqual((added_flow["match"], added_flow["actions"]),
+                         ({"dl_type": 2048, "nw_dst": "10.0.0.3"}, ["OUTPUT:2"]))
+
+        # the same flow given with the legacy names of its match fields replaces it
+        self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/add",
+                                   {**FORWARD_RULE, "match": {"dl_type": 2048, "nw_dst": "10.0.0.3"}})
+
+        self.assertEqual(len(self.overlay.view_switch("run-1", self.network_state,
+                                                      "0000000000000001")["installedFlows"]), 3)
+
+        self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/modify_strict",
+                                   {**FORWARD_RULE, "actions": [{"type": "OUTPUT", "port": 3}]})
+        self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/delete_strict",
+                                   {"dpid": "1", "table_id": 0, "priority": 100,
+                                    "match": {"ipv4_dst": "10.0.0.2", "eth_type": 2048}, "actions": []})
+
+        flows = self.overlay.view_switch("run-1", self.network_state, "0000000000000001")["installedFlows"]
+
+        self.assertEqual(sorted(flow["actions"] for flow in flows.values()), [["OUTPUT:3"], ["OUTPUT:CONTROLLER"]])
+
+    def test_record_change__flow_without_priority(self):
+        for priority in [0, 32768]:
+            self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/add",
+                                       {**FORWARD_RULE, "priority": priority})
+
+        # ofctl_rest gives priority 0 to a request without one
+        request = {field: value for field, value in FORWARD_RULE.items() if field != "priority"}
+        self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/modify_strict",
+                                   {**request, "actions": [{"type": "OUTPUT", "port": 3}]})
+
+        flows = self.overlay.view_switch("run-1", self.network_state, "0000000000000001")["installedFlows"]
+
+        self.assertEqual({flow["priority"]: flow["actions"] for flow in flows.values()
+                          if flow["match"] == {"dl_type": 2048, "nw_dst": "10.0.0.3"}},
+                         {0: ["OUTPUT:3"], 32768: ["OUTPUT:2"]})
+
+    def test_record_change__groups(self):
+        self.overlay.record_change("run-1", self.network_state, "/stats/groupentry/add",
+                                   {"dpid": 2, "type": "ALL", "group_id": 7, "buckets": []})
+        self.overlay.record_change("run-1", self.network_state, "/stats/groupentry/modify",
+                                   {"dpid": 2, "group_id": 7, "buckets": [{"actions": ["OUTPUT:1"]}]})
+        self.overlay.record_change("run-1", self.network_state, "/stats/groupentry/delete",
+                                   {"dpid": 1, "group_id": 1})
+
+        self.assertEqual(self.overlay.view_switch("run-1", self.network_state, "0000000000000002")["installedGroups"],
+                         [{"group_id": 7, "type": "ALL", "buckets": [{"actions": ["OUTPUT:1"]}]}])
+        self.assertEqual(self.overlay.view_switch("run-1", self.network_state, "0000000000000001")["installedGroups"],
+                         [])
+
+    def test_record_change__snapshot_and_other_runs_unchanged(self):
+        self.overlay.record_change("run-1", self.network_state, "/stats/flowentry/add", FORWARD_RULE)
+
+        self.assertEqual(len(self.network_elements["0000000000000001"]["installedFlows"]), 2)
+        self.assertEqual(len(self.overlay.view_switch("run-2", self.network_state,
+                                                      "0000000000000001")["installedFlows"]), 2)
+
+        self.overlay.discard("run-1")
+
+        self.assertEqual(len(self.overlay), 0)
+        self.assertEqual(len(self.overlay.view_switch("run-1", self.network_state,
+                                                      "0000000000000001")["installedFlows"]), 2)
+
+
+class TestRunStateOverlayTools(unittest.TestCase):
+
+    def setUp(self):
+        self.stand_in = RyuStandIn(SyntheticFabric(3)).start()
+        self.transport = RyuTransport(base_url=self.stand_in.url)
+        self.network_state = NetworkStateFinder(transport=self.transport).get_network_state()
+
+        self.tool_node = ToolNode([add_rule, check_switch, delete_group_entry, get_flows])
+        self.state = {"network_state": self.network_state, "agent_run_id": "run-1"}
+
+        self.transport_patch = patch.object(RyuTransport, "get_instance", return_value=self.transport)
+        self.transport_patch.start()
+
+    def tearDown(self):
+        self.transport_patch.stop()
+        RunStateOverlay.get_instance().discard("run-1")
+        self.transport.close()
+        self.stand_in.stop()
+
+    def invoke(self, name: str, args: dict) -> str:
+        tool_call = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "1"}])
+
+        return self.tool_node.invoke({"messages": [tool_call], **self.state})["messages"][0].content
+
+    def test_check_switch__read_your_writes(self):
+        rule = {key: value for key, value in FORWARD_RULE.items() if key not in ["dpid", "cookie"]}
+
+        self.assertEqual(self.invoke("add_rule", {"switch_id": "1", **rule}), "200")
+        self.assertEqual(self.invoke("add_rule", {"switch_id": "1", **rule}), "200")
+
+        requests_served = self.stand_in.requests_served
+        switch_view = self.invoke("check_switch", {"switch_id": "1"})
+
+        self.assertEqual(self.stand_in.requests_served, requests_served)
+        self.assertIn("10.0.0.3", switch_view)
+        self.assertIn("10.0.0.3", self.invoke("get_flows", {"switch_id": "1"}))
+
+        confirmed_view = self.invoke("check_switch", {"switch_id": "1", "confirmed": True})
+
+        self.assertEqual(self.stand_in.requests_served, requests_served + 2)
+        self.assertEqual(json.loads(confirmed_view), json.loads(switch_view))
+        self.assertTrue(RunStateOverlay.get_instance().is_confirmed("run-1", "0000000000000001"))
+
+    def test_check_switch__outside_agent_run(self):
+        self.assertEqual(check_switch.invoke({"switch_id": "2"})["name"], "0000000000000002")
+
+
+if __name__ == '__main__':
+    unittest.main()
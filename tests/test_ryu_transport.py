@@ -0,0 +1,61 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from otto.ryu.network_state_db.network_state_finder import NetworkStateFinder
+from otto.ryu.ryu_stand_in import RyuStandIn, SyntheticFabric
+from otto.ryu.ryu_transport import RyuTransport
+
+
+class TestRyuTransport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stand_in = RyuStandIn(SyntheticFabric(4)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stand_in.stop()
+
+    def test_configuration__environment(self):
+        with patch.dict(os.environ, {"OTTO_RYU_URL": "http://10.0.0.5:8181/", "OTTO_RYU_POOL_SIZE": "4",
+                                     "OTTO_RYU_READ_TIMEOUT": "2.5"}):
+            transport = RyuTransport()
+
+        self.assertEqual(transport.url("/stats/switches"), "http://10.0.0.5:8181/stats/switches")
+        self.assertEqual(transport.pool_size, 4)
+        self.assertEqual(transport.read_timeout, 2.5)
+
+    def test_get_instance__shared(self):
+        self.assertIs(RyuTransport.get_instance(), RyuTransport.get_instance())
+
+    def test_get_instance__new_after_fork(self):
+        transport = RyuTransport.get_instance()
+
+        with patch("otto.ryu.ryu_transport.os.getpid", return_value=transport._owner_pid + 1):
+            self.assertIsNot(RyuTransport.get_instance(), transport)
+
+    def test_connections_reused(self):
+        transport = RyuTransport(base_url=self.stand_in.url, pool_size=4)
+        finder = NetworkStateFinder(max_workers=4, transport=transport)
+
+        connections_before = self.stand_in.connections_opened
+
+        for _ in range(3):
+            finder.get_network_state()
+
+        self.assertLessEqual(self.stand_in.connections_opened - connections_before, 4)
+
+        transport.close()
+
+    def test_post(self):
+        transport = RyuTransport(base_url=self.stand_in.url)
+
+        resp = transport.post("/stats/flowentry/add", json={"dpid": 1, "priority": 10, "match": {"in_port": 1},
+                                                            "actions": [{"type": "OUTPUT", "port": 2}]})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("OUTPUT:2", [action for flow in transport.get("/stats/flow/1").json()["1"]
+                                   for action in flow["actions"]])
+
+        transport.close()
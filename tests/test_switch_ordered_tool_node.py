@@ -0,0 +1,140 @@
+import asyncio
+import operator
+import threading
+import time
+import unittest
+from typing import Annotated, TypedDict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from langgraph.graph import END, StateGraph
+
+from otto.ryu.intent_engine.switch_ordered_tool_node import SwitchOrderedToolNode, order_by_switch, switches_of
+
+calls_made = []
+calls_lock = threading.Lock()
+
+
+@tool
+def install_rule(switch_id: str, rule: str) -> str:
+    """Installs a rule on a switch"""
+    time.sleep(0.1)
+
+    with calls_lock:
+        calls_made.append((switch_id, rule))
+
+    return f"{rule} installed on {switch_id}"
+
+
+@tool
+def tag_rule(switch_id: str, config: RunnableConfig) -> str:
+    """Returns the intent a tool call was made for, taken from its config"""
+    return f"{switch_id}:{config['metadata'].get('intent')}"
+
+
+class ToolStartRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.tool_inputs = []
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.tool_inputs.append(input_str)
+
+
+class ToolState(TypedDict):
+    messages: Annotated[list[AnyMessage], operator.add]
+
+
+def create_tool_call(call_id: int, switch_id: str, rule: str) -> dict:
+    return {"name": "install_rule", "args": {"switch_id": switch_id, "rule": rule}, "id": str(call_id)}
+
+
+class TestSwitchOrderedToolNode(unittest.TestCase):
+
+    def setUp(self):
+        calls_made.clear()
+
+    def test_switches_of(self):
+        self.assertEqual(switches_of(create_tool_call(1, "12", "forward")), {"000000000000000c"})
+        self.assertEqual(switches_of({"name": "apply", "args": {"flows": [{"switch_id": 1}, {"switch_id": "2"}]}}),
+                         {"0000000000000001", "0000000000000002"})
+        self.assertEqual(switches_of({"name": "get_path_between_nodes", "args": {"source": "host-1-1"}}), set())
+
+    def test_order_by_switch(self):
+        tool_calls = [create_tool_call(0, "1", "a"), create_tool_call(1, "2", "b"),
+                      create_tool_call(2, "0000000000000001", "c"), create_tool_call(3, "3", "d"),
+                      {"name": "apply", "args": {"flows": [{"switch_id": "2"}, {"switch_id": "3"}]}, "id": "4"},
+                      {"name": "get_path_between_nodes", "args": {"source": "host-1-1"}, "id": "5"}]
+
+        self.assertEqual(order_by_switch(tool_calls), [[0, 2], [1, 3, 4], [5]])
+
+    def test_invoke__concurrent_across_switches(self):
+        tool_node = SwitchOrderedToolNode([install_rule], max_concurrency=4)
+        tool_calls = [create_tool_call(switch_id, str(switch_id), "forward") for switch_id in range(1, 5)]
+
+        start = time.perf_counter()
+        messages = tool_node.invoke({"messages": [AIMessage(content="", tool_calls=tool_calls)]})["messages"]
+
+        self.assertLess(time.perf_counter() - start, 0.3)
+        self.assertEqual([message.tool_call_id for message in messages], ["1", "2", "3", "4"])
+
+    def test_invoke__ordered_on_same_switch(self):
+        tool_node = SwitchOrderedToolNode([install_rule], max_concurrency=4)
+        tool_calls = [create_tool_call(0, "1", "delete"), create_tool_call(1, "2", "forward"),
+                      create_tool_call(2, "0000000000000001", "add"), create_tool_call(3, "1", "reverse")]
+
+        messages = tool_node.invoke({"messages": [AIMessage(content="", tool_calls=tool_calls)]})["messages"]
+
+        self.assertEqual([rule for switch_id, rule in calls_made if switch_id != "2"], ["delete", "add", "reverse"])
+        self.assertEqual([message.content for message in messages],
+                         ["delete installed on 1", "forward installed on 2", "add installed on 0000000000000001",
+                          "reverse installed on 1"])
+
+    def test_invoke__max_concurrency(self):
+        tool_node = SwitchOrderedToolNode([install_rule], max_concurrency=1)
+        tool_calls = [create_tool_call(switch_id, str(switch_id), "forward") for switch_id in range(1, 4)]
+
+        start = time.perf_counter()
+        tool_node.invoke({"messages": [AIMessage(content="", tool_calls=tool_calls)]})
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.3)
+
+    def test_ainvoke__ordered_on_same_switch(self):
+        tool_node = SwitchOrderedToolNode([install_rule], max_concurrency=4)
+        tool_calls = [create_tool_call(0, "1", "delete"), create_tool_call(1, "2", "forward"),
+                      create_tool_call(2, "1", "add")]
+
+        messages = asyncio.run(tool_node.ainvoke({"messages": [AIMessage(content="", tool_calls=tool_calls)]}))
+
+        self.assertEqual([rule for switch_id, rule in calls_made if switch_id == "1"], ["delete", "add"])
+        self.assertEqual([message.tool_call_id for message in messages["messages"]], ["0", "1", "2"])
+
+    def test_invoke__config_of_every_call(self):
+        tool_node = SwitchOrderedToolNode([tag_rule], max_concurrency=4)
+        tool_calls = [{"name": "tag_rule", "args": {"switch_id": str(switch_id)}, "id": str(switch_id)}
+                      for switch_id in range(1, 4)]
+        recorder = ToolStartRecorder()
+
+        messages = tool_node.invoke({"messages": [AIMessage(content="", tool_calls=tool_calls)]},
+                                    {"metadata": {"intent": "ping"}, "callbacks": [recorder]})["messages"]
+
+        self.assertEqual([message.content for message in messages], ["1:ping", "2:ping", "3:ping"])
+        self.assertEqual(len(recorder.tool_inputs), 3)
+
+    def test_invoke__graph_node(self):
+        graph = StateGraph(ToolState)
+        graph.add_node("execute_action", SwitchOrderedToolNode([install_rule]))
+        graph.set_entry_point("execute_action")
+        graph.add_edge("execute_action", END)
+
+        tool_calls = [create_tool_call(switch_id, str(switch_id), "forward") for switch_id in range(1, 3)]
+
+        messages = graph.compile().invoke({"messages": [AIMessage(content="", tool_calls=tool_calls)]})["messages"]
+
+        self.assertEqual([message.content for message in messages[1:]],
+                         ["forward installed on 1", "forward installed on 2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
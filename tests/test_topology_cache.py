@@ -0,0 +1,106 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import networkx as nx
+
+from otto.ryu.intent_engine.path_index import SparsePathIndex
+from otto.ryu.intent_engine.topology_cache import (SPARSE_TOPOLOGY_THRESHOLD, TopologyCache, build_topology,
+                                                    topology_backend)
+
+
+def create_network_state(state_id: str, hosts_on_s1: int = 1) -> dict:
+    return {state_id: {
+        "0000000000000001": {"portMappings": {"s1-eth2": "s2-eth2"},
+                             "connectedHosts": {f"s1-eth{port}": {"id": f"host-1-{port}"}
+                                                for port in [1] + list(range(3, hosts_on_s1 + 2))},
+                             "installedFlows": {f"flow-{state_id}": {}}},
+        "0000000000000002": {"portMappings": {"s2-eth2": "s1-eth2"},
+                             "connectedHosts": {"s2-eth1": {"id": "host-2-1"}}}
+    }}
+
+
+class TestTopologyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.topology_cache = TopologyCache(max_size=2)
+
+    def test_build_topology(self):
+        topology = build_topology(create_network_state("state-1")["state-1"])
+
+        self.assertEqual(nx.shortest_path(topology.network_graph, "host-1-1", "host-2-1"),
+                         ["host-1-1", "0000000000000001", "0000000000000002", "host-2-1"])
+        self.assertEqual(topology.switch_port_mappings[("0000000000000001", "0000000000000002")],
+                         ("s1-eth2", "s2-eth2"))
+        self.assertEqual(topology.switch_port_mappings[("host-2-1", "0000000000000002")], ("host-2-1", "s2-eth1"))
+
+    def test_build_topology__sparse_backend(self):
+        network_elements = create_network_state("state-1", hosts_on_s1=2)["state-1"]
+        topology = build_topology(network_elements, backend="sparse")
+
+        self.assertIsInstance(topology.path_index, SparsePathIndex)
+        self.assertNotIn("network_graph", vars(topology))
+        self.assertEqual(topology.path_index.shortest_path("host-1-3", "host-2-1"),
+                         ["host-1-3", "0000000000000001", "0000000000000002", "host-2-1"])
+        self.assertEqual(set(topology.network_graph.nodes), set(build_topology(network_elements).network_graph))
+
+    def test_topology_backend(self):
+        with patch.dict(os.environ, {"OTTO_TOPOLOGY_BACKEND": "auto"}):
+            self.assertEqual(topology_backend(10), "networkx")
+            self.assertEqual(topology_backend(SPARSE_TOPOLOGY_THRESHOLD), "sparse")
+
+        with patch.dict(os.environ, {"OTTO_TOPOLOGY_BACKEND": "networkx"}):
+            self.assertEqual(topology_backend(SPARSE_TOPOLOGY_THRESHOLD), "networkx")
+
+        with patch.dict(os.environ, {"OTTO_TOPOLOGY_BACKEND": "igraph"}):
+            with self.assertRaises(ValueError):
+                topology_backend(10)
+
+    def test_build_topology__immutable(self):
+        topology = build_topology(create_network_state("state-1")["state-1"])
+
+        with self.assertRaises(nx.NetworkXError):
+            topology.network_graph.add_edge("host-1-1", "host-2-1")
+
+        with self.assertRaises(TypeError):
+            topology.switch_port_mappings[("host-1-1", "host-2-1")] = ("host-1-1", "host-2-1")
+
+    def test_get_topology__shared_per_state_id(self):
+        first_topology = self.topology_cache.get_topology(create_network_state("state-1"))
+        second_topology = self.topology_cache.get_topology(create_network_state("state-1"))
+
+        self.assertIs(first_topology, second_topology)
+        self.assertEqual((self.topology_cache.hits, self.topology_cache.misses), (1, 1))
+
+    def test_get_topology__shared_per_topology(self):
+        first_topology = self.topology_cache.get_topology(create_network_state("state-1"))
+        second_topology = self.topology_cache.get_topology(create_network_state("state-2"))
+
+        self.assertIs(first_topology, second_topology)
+        self.assertEqual(len(self.topology_cache), 1)
+
+    def test_get_topology__least_recently_used_evicted(self):
+        first_topology = self.topology_cache.get_topology(create_network_state("state-1"))
+        self.topology_cache.get_topology(create_network_state("state-2", hosts_on_s1=2))
+        self.topology_cache.get_topology(create_network_state("state-1"))
+        self.topology_cache.get_topology(create_network_state("state-3", hosts_on_s1=3))
+
+        self.assertEqual(len(self.topology_cache), 2)
+        self.assertIs(self.topology_cache.get_topology(create_network_state("state-1")), first_topology)
+
+        self.topology_cache.get_topology(create_network_state("state-2", hosts_on_s1=2))
+
+        self.assertEqual(self.topology_cache.misses, 4)
+
+    def test_get_instance__forked_process(self):
+        topology_cache = TopologyCache.get_instance()
+
+        self.assertIs(TopologyCache.get_instance(), topology_cache)
+
+        topology_cache._owner_pid = -1  # as seen from a process forked after the cache was created
+
+        self.assertIsNot(TopologyCache.get_instance(), topology_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()